@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+# monitoring/alert_rules.py
+
+import re
+import time
+import operator
+from datetime import datetime
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Callable, Tuple
+
+from log_summary import LogHistogram
+
+# Rules look like:
+#   count(status>=500) over 1m by route > 50
+#   p99(request_time) over 5m > 2s
+#   avg(request_time) over 5m by route where method=POST > 800ms
+#   avg(suspicious) over 10m > 5%      (a percentage is compared as a fraction, 0.05)
+RULE_PATTERN = re.compile(
+    r'^\s*(?P<agg>count|sum|avg|min|max|rate|p\d{1,2}(?:\.\d+)?)\s*\((?P<arg>[^)]*)\)'
+    r'\s+over\s+(?P<window>\d+(?:\.\d+)?[smhd])'
+    r'(?:\s+by\s+(?P<group>\w+))?'
+    r'(?:\s+where\s+(?P<where>.+?))?'
+    r'\s*(?P<op>>=|<=|==|!=|>|<)\s*(?P<threshold>\d+(?:\.\d+)?)(?P<unit>ms|s|m|h|%)?\s*$',
+    re.IGNORECASE
+)
+CONDITION_PATTERN = re.compile(r'^\s*(\w+)\s*(>=|<=|==|!=|=|>|<|~)\s*(.+?)\s*$')
+
+COMPARATORS = {
+    '>': operator.gt,
+    '>=': operator.ge,
+    '<': operator.lt,
+    '<=': operator.le,
+    '==': operator.eq,
+    '=': operator.eq,
+    '!=': operator.ne
+}
+DURATION_UNITS = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+class RuleSyntaxError(ValueError):
+    """Raised when an alert rule cannot be parsed"""
+
+
+def parse_duration(text: str) -> float:
+    """Parse a duration such as 30s, 1m or 5m into seconds"""
+    match = re.match(r'^(\d+(?:\.\d+)?)(ms|s|m|h|d)$', text.strip())
+    if not match:
+        raise RuleSyntaxError(f"Invalid duration: {text}")
+    return float(match.group(1)) * DURATION_UNITS[match.group(2)]
+
+
+def _coerce(value: str) -> Any:
+    """Turn a literal from a rule into a number or bool where possible"""
+    lowered = value.strip('\'"').lower()
+    if lowered in ('true', 'false'):
+        return lowered == 'true'
+    try:
+        return float(lowered) if '.' in lowered else int(lowered)
+    except ValueError:
+        return value.strip('\'"')
+
+
+def compile_condition(text: str) -> Callable[[Dict[str, Any]], bool]:
+    """Compile `field op value [and field op value ...]` into a predicate"""
+    checks = []
+    for clause in re.split(r'\s+and\s+', text.strip(), flags=re.IGNORECASE):
+        match = CONDITION_PATTERN.match(clause)
+        if not match:
+            raise RuleSyntaxError(f"Invalid condition: {clause}")
+        field, op, raw_value = match.groups()
+        if op == '~':
+            pattern = re.compile(raw_value.strip('\'"'), re.IGNORECASE)
+            checks.append(lambda event, f=field, p=pattern: bool(p.search(str(event.get(f, '')))))
+            continue
+        value = _coerce(raw_value)
+        compare = COMPARATORS[op]
+
+        def check(event, f=field, v=value, c=compare):
+            actual = event.get(f)
+            if actual is None:
+                return False
+            try:
+                return c(actual, v)
+            except TypeError:
+                return c(str(actual), str(v))
+        checks.append(check)
+
+    return lambda event: all(check(event) for check in checks)
+
+
+class _Bucket:
+    """Aggregation state for one time slice of a window"""
+
+    __slots__ = ('start', 'count', 'sum', 'min', 'max', 'histogram')
+
+    def __init__(self, start: int, with_histogram: bool):
+        self.start = start
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+        self.histogram = LogHistogram() if with_histogram else None
+
+    def add(self, value: float):
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        if self.histogram is not None:
+            self.histogram.add(value)
+
+
+class AlertRule:
+    """One compiled continuous-query rule"""
+
+    def __init__(self, expression: str, name: Optional[str] = None, severity: str = 'medium',
+                 buckets: int = 12, max_groups: int = 1000, cooldown: float = 300):
+        match = RULE_PATTERN.match(expression)
+        if not match:
+            raise RuleSyntaxError(f"Invalid alert rule: {expression}")
+
+        self.expression = expression.strip()
+        self.name = name or self.expression
+        self.severity = severity
+        self.aggregation = match.group('agg').lower()
+        self.window = parse_duration(match.group('window'))
+        self.group_by = match.group('group')
+        self.comparator = COMPARATORS[match.group('op')]
+        self.op = match.group('op')
+        self.threshold = float(match.group('threshold'))
+        unit = (match.group('unit') or '').lower()
+        if unit in DURATION_UNITS:
+            self.threshold *= DURATION_UNITS[unit]
+        elif unit == '%':
+            self.threshold /= 100
+
+        arg = match.group('arg').strip()
+        where = match.group('where')
+        if self.aggregation in ('count', 'rate'):
+            # count(<condition>) counts matching events; the value is 1
+            self.field = None
+            conditions = [c for c in (arg, where) if c]
+        else:
+            if not re.match(r'^\w+$', arg):
+                raise RuleSyntaxError(f"{self.aggregation}() takes a field name: {expression}")
+            self.field = arg
+            conditions = [where] if where else []
+        self.matches = compile_condition(' and '.join(conditions)) if conditions else (lambda event: True)
+        self.quantile = float(self.aggregation[1:]) / 100 if self.aggregation.startswith('p') else None
+
+        self.bucket_count = buckets
+        self.bucket_width = self.window / buckets
+        self.max_groups = max_groups
+        self.cooldown = cooldown
+        self.groups = OrderedDict()
+        self.firing = {}
+        # Called with each group dropped by eviction or expiry
+        self.on_drop = None
+
+    def _drop(self, group: str):
+        self.firing.pop(group, None)
+        if self.on_drop is not None:
+            self.on_drop(group)
+
+    def _slot(self, now: float) -> int:
+        return int(now // self.bucket_width)
+
+    def observe(self, event: Dict[str, Any], now: float) -> Optional[str]:
+        """Fold an event into its group's window; return the group key if touched"""
+        if not self.matches(event):
+            return None
+        if self.field is None:
+            value = 1.0
+        else:
+            value = event.get(self.field)
+            if value is None:
+                return None
+            value = float(value)
+
+        group = str(event.get(self.group_by, '')) if self.group_by else ''
+        ring = self.groups.get(group)
+        if ring is None:
+            if len(self.groups) >= self.max_groups:
+                evicted, _ = self.groups.popitem(last=False)
+                self._drop(evicted)
+            ring = self.groups[group] = [None] * self.bucket_count
+        else:
+            self.groups.move_to_end(group)
+
+        slot = self._slot(now)
+        index = slot % self.bucket_count
+        bucket = ring[index]
+        if bucket is None or bucket.start != slot:
+            bucket = ring[index] = _Bucket(slot, self.quantile is not None)
+        bucket.add(value)
+        return group
+
+    def value(self, group: str, now: float) -> Optional[float]:
+        """Current aggregate for a group over the window"""
+        ring = self.groups.get(group)
+        if ring is None:
+            return None
+        oldest = self._slot(now) - self.bucket_count + 1
+        live = [bucket for bucket in ring if bucket is not None and bucket.start >= oldest]
+        count = sum(bucket.count for bucket in live)
+
+        if self.aggregation == 'count':
+            return float(count)
+        if self.aggregation == 'rate':
+            return count / self.window
+        if not count:
+            return None
+        if self.aggregation == 'sum':
+            return sum(bucket.sum for bucket in live)
+        if self.aggregation == 'avg':
+            return sum(bucket.sum for bucket in live) / count
+        if self.aggregation == 'min':
+            return min(bucket.min for bucket in live if bucket.min is not None)
+        if self.aggregation == 'max':
+            return max(bucket.max for bucket in live if bucket.max is not None)
+
+        histogram = LogHistogram()
+        for bucket in live:
+            histogram.merge(bucket.histogram)
+        return histogram.quantile(self.quantile)
+
+    def evaluate(self, group: str, now: float) -> Optional[Dict[str, Any]]:
+        """Check a group against the threshold, returning an alert on a new breach"""
+        value = self.value(group, now)
+        breached = value is not None and self.comparator(value, self.threshold)
+        last_fired = self.firing.get(group)
+
+        if not breached:
+            self.firing.pop(group, None)
+            return None
+        if last_fired is not None and now - last_fired < self.cooldown:
+            return None
+
+        self.firing[group] = now
+        return {
+            'type': 'rule_alert',
+            'rule': self.name,
+            'expression': self.expression,
+            'group': group or None,
+            'value': round(value, 4),
+            'threshold': self.threshold,
+            'severity': self.severity,
+            'timestamp': datetime.fromtimestamp(now).isoformat(),
+            'message': f"{self.name}{f' [{group}]' if group else ''}: {round(value, 4)} {self.op} {self.threshold}"
+        }
+
+    def expire(self, now: float):
+        """Drop groups whose whole window has aged out"""
+        oldest = self._slot(now) - self.bucket_count + 1
+        stale = [
+            group for group, ring in self.groups.items()
+            if all(bucket is None or bucket.start < oldest for bucket in ring)
+        ]
+        for group in stale:
+            del self.groups[group]
+            self._drop(group)
+
+
+class RuleEngine:
+    """Evaluate compiled rules continuously over a stream of parsed events"""
+
+    def __init__(self, rules: List[Dict[str, Any]], eval_interval: float = 1.0):
+        self.rules = []
+        for rule in rules:
+            if isinstance(rule, str):
+                rule = {'rule': rule}
+            self.rules.append(AlertRule(
+                rule['rule'],
+                name=rule.get('name'),
+                severity=rule.get('severity', 'medium'),
+                buckets=rule.get('buckets', 12),
+                max_groups=rule.get('max_groups', 1000),
+                cooldown=rule.get('cooldown', 300)
+            ))
+        self.eval_interval = eval_interval
+        # Per (rule, group), so bounded by the rules' max_groups
+        self._dirty = {}
+        self._last_eval = {}
+        for rule in self.rules:
+            rule.on_drop = lambda group, rule=rule: self._forget(rule, group)
+
+    def _forget(self, rule: AlertRule, group: str):
+        """Drop the evaluation state of a group its rule no longer tracks"""
+        key = (id(rule), group)
+        self._last_eval.pop(key, None)
+        self._dirty.pop(key, None)
+
+    def process(self, event: Dict[str, Any], now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Feed one event and return any alerts that fired"""
+        now = time.time() if now is None else now
+        alerts = []
+        for rule in self.rules:
+            group = rule.observe(event, now)
+            if group is None:
+                continue
+            key = (id(rule), group)
+            # Counting rules are cheap to evaluate on every event; quantiles
+            # are re-evaluated at most once per eval_interval per group
+            if rule.quantile is None or now - self._last_eval.get(key, 0) >= self.eval_interval:
+                self._last_eval[key] = now
+                self._dirty.pop(key, None)
+                alert = rule.evaluate(group, now)
+                if alert:
+                    alerts.append(alert)
+            else:
+                self._dirty[key] = (rule, group)
+        return alerts
+
+    def tick(self, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Evaluate deferred groups and expire idle ones; call when the stream is idle"""
+        now = time.time() if now is None else now
+        alerts = []
+        for key, (rule, group) in list(self._dirty.items()):
+            self._last_eval[key] = now
+            alert = rule.evaluate(group, now)
+            if alert:
+                alerts.append(alert)
+        self._dirty.clear()
+        for rule in self.rules:
+            rule.expire(now)
+        return alerts
+
+
+DEFAULT_ALERT_RULES = [
+    {'name': 'Route 5xx burst', 'rule': 'count(status>=500) over 1m by route > 50', 'severity': 'high'},
+    {'name': 'Slow responses', 'rule': 'p99(request_time) over 5m > 2s', 'severity': 'medium'},
+    {'name': 'Suspicious request burst', 'rule': 'count(suspicious=true) over 5m > 20', 'severity': 'high'},
+    {'name': 'Error request burst', 'rule': 'count(status>=400) over 5m > 100', 'severity': 'medium'}
+]
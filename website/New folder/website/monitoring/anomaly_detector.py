@@ -2,15 +2,38 @@
 # monitoring/anomaly_detector.py
 
 import os
+import sys
 import json
 import hashlib
 import time
-import requests
 import re
+import threading
+from contextlib import nullcontext
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Set, Tuple
 import logging
-from pathlib import Path
+from collections import deque
+
+from file_integrity import FileManifest
+from file_watcher import FileWatcher
+from tree_walker import TreeWalker, DEFAULT_PRUNE_DIRS, is_pruned
+from scan_cache import ScanCache, ruleset_version
+from byte_scanner import BytePatternSet, open_buffer, MMAP_THRESHOLD
+from detector_pool import DetectorPool
+from traffic_baseline import TrafficBaseline
+from log_follower import LogFollower, parse_access_line, parse_log_time
+from frequency_sketch import FrequencyTracker
+from anomaly_state import AnomalyStateStore
+from disk_growth import DirectorySizeIndex
+from shared_resources import fernet, http_session
+from event_bus import EventBus, Event, DROP_OLDEST
+from logging_setup import configure_logger
+
+DEFAULT_DETECTOR_DEADLINES = {'tree': 300.0, 'network': 60.0, 'performance': 10.0, 'disk': 120.0}
+# A first run streams the existing log through the baseline in chunks of this
+# size and keeps only its last events for reporting
+BOOTSTRAP_CHUNK_BYTES = 4 * 1024 * 1024
+BOOTSTRAP_REPORT_EVENTS = 1000
 
 class AnomalyDetector:
     def __init__(self, config: Dict[str, Any]):
@@ -20,81 +43,357 @@ class AnomalyDetector:
         self.telegram_chat_id = config.get('telegram_chat_id', '')
         self.website_path = config.get('website_path', '/usr/share/nginx/html')
         self.log_file = config.get('log_file', '/var/log/nginx/access.log')
+        self.state_dir = config.get('state_dir', '/app/data')
+        self.manifest = FileManifest(config.get('manifest_file', os.path.join(self.state_dir, 'file_manifest.json')))
+        # Held by the tree walk and by the file watcher thread while either uses the manifest
+        self.manifest_lock = threading.Lock()
         self.logger = self._setup_logger()
+        self.malware_patterns = self._setup_malware_patterns()
+        self.malware_ruleset = {'anomaly_detector.malware': ruleset_version(self.malware_patterns)}
+        self.malware_matcher = BytePatternSet(self.malware_patterns, re.IGNORECASE)
+        self.mmap_threshold = config.get('mmap_threshold', MMAP_THRESHOLD)
+        self.scan_cache = self._setup_scan_cache()
+        self.prune_dirs = config.get('prune_dirs', DEFAULT_PRUNE_DIRS)
+        self.last_walk_stats = {}
+        self.detector_deadlines = {**DEFAULT_DETECTOR_DEADLINES, **config.get('detector_deadlines', {})}
+        self.last_run = {}
+        # Kept across runs, so a detector still running past its deadline is not started twice
+        self.detector_pool = DetectorPool(
+            max_workers=config.get('detector_workers', 4),
+            deadlines=self.detector_deadlines,
+            logger=self.logger
+        )
+        self.baseline = self._setup_baseline()
+        self.frequency = self._setup_frequency()
+        self.state = self._setup_state()
+        self.disk_index = DirectorySizeIndex(
+            config.get('disk_index_file', os.path.join(self.state_dir, 'disk_growth.json')),
+            roots=config.get('disk_roots', [self.website_path, os.path.dirname(self.log_file), self.state_dir]),
+            max_depth=config.get('disk_index_depth', 3)
+        )
+        self.watcher = None
+        self.events = self._setup_events()
+        # Optional LineBuffer fed by a log follower shared with other components
+        self.log_source = None
         
     def _setup_logger(self) -> logging.Logger:
         """Setup logger for anomaly detection"""
-        logger = logging.getLogger('anomaly_detector')
-        logger.setLevel(logging.INFO)
+        return configure_logger('anomaly_detector', '/app/logs/anomaly_detector.log', console_level=None)
         
-        # Create logs directory if it doesn't exist
-        log_dir = Path('/app/logs')
-        log_dir.mkdir(exist_ok=True)
-        
-        handler = logging.FileHandler('/app/logs/anomaly_detector.log')
-        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-        handler.setFormatter(formatter)
-        logger.addHandler(handler)
+    def _setup_malware_patterns(self) -> List[str]:
+        """Malware patterns to detect in PHP files"""
+        return [
+            r'eval\s*\(',
+            r'base64_decode\s*\(',
+            r'shell_exec\s*\(',
+            r'exec\s*\(',
+            r'system\s*\(',
+            r'passthru\s*\(',
+            r'assert\s*\(',
+            r'create_function\s*\(',
+            r'preg_replace.*\/e',
+            r'include\s*\(\s*[\'"]https?:\/\/',
+            r'require\s*\(\s*[\'"]https?:\/\/',
+            r'fsockopen\s*\(',
+            r'popen\s*\(',
+            r'proc_open\s*\(',
+            r'file_get_contents\s*\(\s*[\'"]https?:\/\/',
+            r'curl_exec\s*\('
+        ]
         
-        return logger
+    def scan_website_tree(self, file_checks: bool = True, security_checks: bool = True,
+                          results: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+                          deadline: Optional[float] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """Run file-level checks as visitors of a single traversal of the website tree
         
-    def detect_file_changes(self) -> List[Dict[str, Any]]:
-        """Detect any file changes in the website"""
-        anomalies = []
+        Anomalies are collected into `results` as they are found, so a caller
+        can read what was found so far; with a deadline (a time.monotonic()
+        value) the walk stops early and reports what it checked.
+        """
+        if results is None:
+            results = {'file': [], 'security': []}
         
         if not os.path.exists(self.website_path):
             self.logger.warning(f"Website path {self.website_path} does not exist")
-            return anomalies
+            return results
             
+        walker = TreeWalker(self.website_path, self.prune_dirs, self.logger)
+        if file_checks:
+            walker.add_visitor(
+                lambda file_path, file_stat: results['file'].extend(
+                    self._check_file_metadata(file_path, file_stat.st_size)
+                )
+            )
+            walker.add_visitor(self.manifest.visit)
+        if security_checks:
+            walker.add_visitor(
+                lambda file_path, file_stat: results['security'].extend(
+                    self._scan_file_for_malware(file_path, file_stat)
+                ),
+                suffixes=('.php',)
+            )
+            
+        with self.manifest_lock if file_checks else nullcontext():
+            if file_checks:
+                self.manifest.begin_scan(self.website_path)
+            try:
+                self.last_walk_stats = walker.walk(deadline)
+            except Exception as e:
+                self.logger.error(f"Error walking directory {self.website_path}: {e}")
+                return results
+                
+            self.logger.info(
+                f"Walked {self.last_walk_stats['files']} files in {self.last_walk_stats['directories']} directories "
+                f"({self.last_walk_stats['pruned']} pruned) in {self.last_walk_stats['duration']}s"
+            )
+            if self.last_walk_stats['truncated']:
+                self.logger.warning("Website tree walk stopped at its deadline; results are partial")
+            
+            if file_checks:
+                diff = self.manifest.finish_scan(complete=not self.last_walk_stats['truncated'])
+                if diff['baseline_created'] and self.manifest.loaded:
+                    self.logger.info(f"File integrity baseline created with {len(self.manifest.entries)} files")
+                results['file'].extend(self._integrity_anomalies(diff))
+                self._forget_removed(diff)
+                
+            if self.scan_cache is not None:
+                if file_checks and security_checks and not self.last_walk_stats['truncated']:
+                    # Every live file was just seen; findings for content that is gone can go
+                    self.scan_cache.vacuum()
+                else:
+                    self.scan_cache.flush()
+            
+        return results
+        
+    def _setup_baseline(self) -> TrafficBaseline:
+        """Learned traffic profile replacing fixed traffic and load thresholds"""
+        baseline_config = self.config.get('baseline', {})
+        baseline = TrafficBaseline(
+            self.config.get('baseline_file', os.path.join(self.state_dir, 'traffic_baseline.json')),
+            bucket_seconds=baseline_config.get('bucket_seconds', 60),
+            alpha=baseline_config.get('alpha', 0.05),
+            seasonal_alpha=baseline_config.get('seasonal_alpha', 0.2),
+            warmup=baseline_config.get('warmup', 60),
+            z_threshold=baseline_config.get('z_threshold', 4.0),
+            max_routes=baseline_config.get('max_routes', 200)
+        )
+        # Loaded here, before the network and performance detectors share it
+        try:
+            baseline.load()
+        except Exception as e:
+            self.logger.warning(f"Could not load traffic baseline, starting empty: {e}")
+        return baseline
+        
+    def _setup_frequency(self) -> FrequencyTracker:
+        """Decayed per-IP and per-path request counts kept across runs"""
+        frequency_config = self.config.get('frequency', {})
+        tracker = FrequencyTracker(
+            self.config.get('frequency_file', os.path.join(self.state_dir, 'frequency_sketch.bin')),
+            width=frequency_config.get('width', 16384),
+            depth=frequency_config.get('depth', 4),
+            half_life=frequency_config.get('half_life', 60.0)
+        )
         try:
-            for root, dirs, files in os.walk(self.website_path):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    try:
-                        # Check file modification time
-                        mtime = os.path.getmtime(file_path)
-                        size = os.path.getsize(file_path)
-                        
-                        # Check for suspicious files
-                        if self._is_suspicious_file(file_path):
-                            anomalies.append({
-                                'type': 'suspicious_file',
-                                'file': file_path,
-                                'timestamp': datetime.now().isoformat(),
-                                'severity': 'high',
-                                'size': size
-                            })
-                            
-                        # Check for file size anomalies
-                        if size > 10 * 1024 * 1024:  # 10MB
-                            anomalies.append({
-                                'type': 'large_file',
-                                'file': file_path,
-                                'size': size,
-                                'timestamp': datetime.now().isoformat(),
-                                'severity': 'medium'
-                            })
-                            
-                        # Check for recently modified files (last hour)
-                        if time.time() - mtime < 3600:
-                            anomalies.append({
-                                'type': 'recent_file_change',
-                                'file': file_path,
-                                'modified_time': datetime.fromtimestamp(mtime).isoformat(),
-                                'timestamp': datetime.now().isoformat(),
-                                'severity': 'low'
-                            })
-                            
-                    except Exception as e:
-                        self.logger.error(f"Error checking file {file_path}: {e}")
-                        
+            tracker.load()
         except Exception as e:
-            self.logger.error(f"Error walking directory {self.website_path}: {e}")
+            self.logger.warning(f"Could not load frequency sketches, starting empty: {e}")
+        return tracker
+        
+    def _setup_state(self) -> Optional[AnomalyStateStore]:
+        """Anomaly dedup state, so only new or escalated anomalies are reported"""
+        if not self.config.get('dedup', True):
+            return None
+        try:
+            return AnomalyStateStore(
+                self.config.get('anomaly_state_file', os.path.join(self.state_dir, 'anomaly_state.sqlite')),
+                renotify_interval=self.config.get('renotify_interval', 6 * 3600),
+                resolve_after=self.config.get('resolve_after', 300)
+            )
+        except Exception as e:
+            self.logger.warning(f"Anomaly state unavailable, reporting every anomaly: {e}")
+            return None
+            
+    def _setup_events(self) -> EventBus:
+        """Event bus carrying anomalies to Telegram off the detection threads"""
+        events = EventBus(self.logger)
+        events.subscribe('telegram', self.deliver_alerts, capacity=self.config.get('alert_queue', 1000),
+                         policy=DROP_OLDEST, batch_size=20)
+        return events
+        
+    def publish_anomalies(self, anomalies: List[Dict[str, Any]]):
+        """Publish reported anomalies; alerting never holds up detection"""
+        for anomaly in anomalies:
+            self.events.publish('anomaly', anomaly, anomaly.get('severity', 'info'), 'anomaly_detector')
             
+    def deliver_alerts(self, events: List[Event]):
+        """Send queued anomalies to Telegram, a batch per message"""
+        self.send_telegram_alert([event.data for event in events])
+        
+    def filter_anomalies(self, scope: str, anomalies: List[Dict[str, Any]], complete: bool = True) -> List[Dict[str, Any]]:
+        """Pass on only new, escalated, reopened or reminder anomalies of a scope"""
+        if self.state is None:
+            return anomalies
+        try:
+            notify, resolved = self.state.observe(scope, anomalies, complete)
+        except Exception as e:
+            self.logger.error(f"Error updating anomaly state: {e}")
+            return anomalies
+        if resolved:
+            self.logger.info(f"{len(resolved)} {scope} anomalies resolved")
+        if self.config.get('notify_resolved', False):
+            notify.extend(resolved)
+        return notify
+        
+    def _setup_scan_cache(self) -> Optional[ScanCache]:
+        """Open the scan-result cache shared with the other scanners"""
+        if not self.config.get('use_cache', True):
+            return None
+        try:
+            return ScanCache(self.config.get('cache_file', os.path.join(self.state_dir, 'scan_cache.sqlite')))
+        except Exception as e:
+            self.logger.warning(f"Scan cache unavailable, scanning without it: {e}")
+            return None
+        
+    def detect_file_changes(self) -> List[Dict[str, Any]]:
+        """Detect file changes in the website against the integrity baseline"""
+        return self.scan_website_tree(security_checks=False)['file']
+        
+    def _check_file_metadata(self, file_path: str, size: int) -> List[Dict[str, Any]]:
+        """Check a file's name and size"""
+        anomalies = []
+        
+        # Check for suspicious files
+        if self._is_suspicious_file(file_path):
+            anomalies.append({
+                'type': 'suspicious_file',
+                'file': file_path,
+                'timestamp': datetime.now().isoformat(),
+                'severity': 'high',
+                'size': size
+            })
+            
+        # Check for file size anomalies
+        if size > 10 * 1024 * 1024:  # 10MB
+            anomalies.append({
+                'type': 'large_file',
+                'file': file_path,
+                'size': size,
+                'timestamp': datetime.now().isoformat(),
+                'severity': 'medium'
+            })
+            
+        return anomalies
+        
+    def _integrity_anomalies(self, diff: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Turn a manifest diff into file change anomalies"""
+        anomalies = []
+        for change, severity in (('added', 'medium'), ('modified', 'medium'), ('removed', 'low')):
+            for file_path in diff[change]:
+                entry = self.manifest.entries.get(file_path)
+                anomaly = {
+                    'type': f'file_{change}',
+                    'file': file_path,
+                    'timestamp': datetime.now().isoformat(),
+                    # Executable server-side code changing is always worth a look
+                    'severity': 'high' if file_path.endswith('.php') and change != 'removed' else severity
+                }
+                if entry:
+                    anomaly['size'] = entry[1]
+                    anomaly['modified_time'] = datetime.fromtimestamp(entry[2] / 1e9).isoformat()
+                    anomaly['sha256'] = entry[3]
+                anomalies.append(anomaly)
         return anomalies
         
+    def _forget_removed(self, diff: Dict[str, Any]):
+        """Drop scan cache entries of files a manifest diff reports as removed"""
+        if self.scan_cache is not None:
+            for file_path in diff['removed']:
+                self.scan_cache.forget(file_path)
+        
+    def _baseline_anomaly(self, deviation: Dict[str, Any]) -> Dict[str, Any]:
+        """Turn a baseline deviation into an anomaly"""
+        anomaly = {
+            'type': 'traffic_deviation',
+            **deviation,
+            'timestamp': datetime.now().isoformat(),
+            'severity': 'high' if abs(deviation['zscore']) >= 2 * self.baseline.z_threshold else 'medium'
+        }
+        if deviation['metric'].startswith('latency:'):
+            anomaly['metric'], anomaly['route'] = deviation['metric'].split(':', 1)
+        return anomaly
+        
+    def _read_new_events(self) -> Tuple[List[Dict[str, Any]], bool]:
+        """Parse access log lines appended since the previous run
+        
+        Returns the events and whether this is the first run, which reads
+        the whole log. That read is streamed: events older than the last
+        BOOTSTRAP_REPORT_EVENTS are learned by the baseline and frequency
+        sketches as they go by, and only the recent ones are returned. The
+        read position is persisted with the baseline.
+        """
+        bootstrap = self.baseline.log_position is None
+        if self.log_source is not None and not bootstrap:
+            events = [event for event in map(parse_access_line, self.log_source.drain()) if event]
+            self.baseline.log_position = self.log_source.position()
+            return events, False
+            
+        follower = LogFollower(self.log_file, from_start=bootstrap)
+        if not bootstrap:
+            follower.inode = self.baseline.log_position['inode']
+            follower.offset = self.baseline.log_position['offset']
+            
+        events = deque(maxlen=BOOTSTRAP_REPORT_EVENTS) if bootstrap else []
+        learned = 0
+        try:
+            while True:
+                lines = follower.read_new_lines(BOOTSTRAP_CHUNK_BYTES if bootstrap else None)
+                for line in lines:
+                    event = parse_access_line(line)
+                    if not event:
+                        continue
+                    if bootstrap and len(events) == events.maxlen:
+                        self._learn_history(events.popleft())
+                        learned += 1
+                    events.append(event)
+                if not bootstrap or not lines:
+                    break
+        finally:
+            follower.close()
+        if learned:
+            self.logger.info(f"Traffic baseline learned {learned} older log events while bootstrapping")
+        if self.log_source is not None:
+            # Lines the shared follower delivered meanwhile were part of this read
+            self.log_source.drain()
+            
+        # Resume before a trailing partial line, so it is read whole next run
+        self.baseline.log_position = {
+            'inode': follower.inode,
+            'offset': follower.offset - len(follower._partial.encode('utf-8'))
+        }
+        return list(events), bootstrap
+        
+    def _learn_history(self, event: Dict[str, Any]):
+        """Fold an event of a bootstrap read into the baseline and sketches without reporting it"""
+        when = parse_log_time(event['timestamp'])
+        self.baseline.add_event(event)
+        self.frequency.add_event(event, when.timestamp() if when else time.time())
+        
+    def detect_traffic_deviations(self, events: List[Dict[str, Any]], bootstrap: bool = False) -> List[Dict[str, Any]]:
+        """Score new access log traffic against the learned baseline"""
+        deviations = []
+        for event in events:
+            deviations.extend(self.baseline.add_event(event))
+        deviations.extend(self.baseline.advance(time.time()))
+        self.baseline.save()
+        
+        if bootstrap:
+            # The first run learns from the existing log; its deviations are history
+            self.logger.info(f"Traffic baseline bootstrapped from the existing log; reporting on its last {len(events)} events")
+            return []
+        return [self._baseline_anomaly(deviation) for deviation in deviations]
+        
     def detect_network_anomalies(self) -> List[Dict[str, Any]]:
-        """Detect network anomalies from access logs"""
+        """Detect network anomalies from access log lines added since the last run"""
         anomalies = []
         
         if not os.path.exists(self.log_file):
@@ -102,48 +401,77 @@ class AnomalyDetector:
             return anomalies
             
         try:
-            with open(self.log_file, 'r') as f:
-                lines = f.readlines()
-                recent_lines = lines[-1000:]  # Last 1000 lines
-                
-            # Analyze IP patterns
-            ip_counts = {}
+            events, bootstrap = self._read_new_events()
+        except Exception as e:
+            self.logger.error(f"Error reading network logs: {e}")
+            return anomalies
+            
+        try:
+            anomalies.extend(self.detect_traffic_deviations(events, bootstrap))
+        except Exception as e:
+            self.logger.error(f"Error scoring traffic against baseline: {e}")
+            
+        frequency_config = self.config.get('frequency', {})
+        ip_threshold = frequency_config.get('ip_threshold', 100)
+        pair_threshold = frequency_config.get('ip_path_threshold', 50)
+        try:
+            hot_ips = {}
+            hot_pairs = {}
             suspicious_requests = []
+            now = time.time()
             
-            for line in recent_lines:
-                parts = line.split()
-                if len(parts) >= 7:
-                    ip = parts[0]
-                    method = parts[5].strip('"')
-                    uri = parts[6]
-                    status = parts[8]
-                    user_agent = ' '.join(parts[11:]) if len(parts) > 11 else ''
-                    
-                    # Count requests per IP
-                    ip_counts[ip] = ip_counts.get(ip, 0) + 1
+            for event in events:
+                when = parse_log_time(event['timestamp'])
+                estimates = self.frequency.add_event(event, when.timestamp() if when else now)
+                
+                # Hot right now, by decayed request count
+                ip = event['ip']
+                if estimates['ip'] >= ip_threshold:
+                    hot_ips[ip] = max(hot_ips.get(ip, 0.0), estimates['ip'])
+                if estimates['ip_path'] >= pair_threshold:
+                    pair = (ip, event['route'])
+                    hot_pairs[pair] = max(hot_pairs.get(pair, 0.0), estimates['ip_path'])
                     
-                    # Check for suspicious requests
-                    if self._is_suspicious_request(uri, method, status, user_agent):
-                        suspicious_requests.append({
-                            'ip': ip,
-                            'uri': uri,
-                            'method': method,
-                            'status': status,
-                            'user_agent': user_agent,
-                            'timestamp': datetime.now().isoformat()
-                        })
-                        
-            # Detect high-frequency IPs
-            for ip, count in ip_counts.items():
-                if count > 100:  # More than 100 requests
-                    anomalies.append({
-                        'type': 'high_frequency_ip',
+                # Check for suspicious requests
+                status = str(event['status'])
+                if self._is_suspicious_request(event['uri'], event['method'], status, event['user_agent']):
+                    suspicious_requests.append({
                         'ip': ip,
-                        'request_count': count,
-                        'timestamp': datetime.now().isoformat(),
-                        'severity': 'medium'
+                        'uri': event['uri'],
+                        'method': event['method'],
+                        'status': status,
+                        'user_agent': event['user_agent'],
+                        'timestamp': datetime.now().isoformat()
                     })
                     
+            self.frequency.save()
+            
+            # Detect high-frequency IPs
+            for ip, estimate in hot_ips.items():
+                anomalies.append({
+                    'type': 'high_frequency_ip',
+                    'ip': ip,
+                    'request_count': int(round(estimate)),
+                    'half_life': self.frequency.half_life,
+                    'timestamp': datetime.now().isoformat(),
+                    'severity': 'medium'
+                })
+            for (ip, route), estimate in hot_pairs.items():
+                if ip in hot_ips:
+                    continue
+                anomalies.append({
+                    'type': 'high_frequency_ip_path',
+                    'ip': ip,
+                    'uri': route,
+                    'request_count': int(round(estimate)),
+                    'half_life': self.frequency.half_life,
+                    'timestamp': datetime.now().isoformat(),
+                    'severity': 'medium'
+                })
+                    
+            # Per-IP behaviour outliers over this run's window
+            anomalies.extend(self.detect_ip_outliers(events))
+            
             # Add suspicious requests
             for request in suspicious_requests:
                 anomalies.append({
@@ -162,57 +490,81 @@ class AnomalyDetector:
             
         return anomalies
         
+    def detect_ip_outliers(self, events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Score per-IP behaviour over a window of events and flag outliers"""
+        outlier_config = self.config.get('outliers', {})
+        if not outlier_config.get('enabled', True) or len(events) < outlier_config.get('min_events', 500):
+            return []
+            
+        try:
+            from ip_outliers import score_ips
+        except ImportError:
+            self.logger.warning("numpy not available, IP outlier scoring disabled")
+            return []
+            
+        start_time = time.perf_counter()
+        outliers = score_ips(
+            events,
+            min_requests=outlier_config.get('min_requests', 10),
+            cutoff=outlier_config.get('cutoff', 5.0),
+            max_results=outlier_config.get('max_results', 20)
+        )
+        self.logger.info(
+            f"Scored IP behaviour over {len(events)} events in {time.perf_counter() - start_time:.3f}s, "
+            f"{len(outliers)} outliers"
+        )
+        return [
+            {
+                'type': 'ip_outlier',
+                **outlier,
+                'timestamp': datetime.now().isoformat(),
+                'severity': 'high' if outlier['score'] >= 4 * outlier['threshold'] else 'medium'
+            }
+            for outlier in outliers
+        ]
+        
+    def score_log_window(self, max_lines: int = 100000) -> List[Dict[str, Any]]:
+        """Batch mode: score IP behaviour over the last lines of the access log"""
+        with open(self.log_file, 'r', encoding='utf-8', errors='ignore') as f:
+            lines = deque(f, maxlen=max_lines)
+        events = [event for event in map(parse_access_line, lines) if event]
+        return self.detect_ip_outliers(events)
+        
+    def is_hot(self, kind: str, key: str) -> bool:
+        """Whether an IP, path or 'IP path' pair is hot right now"""
+        frequency_config = self.config.get('frequency', {})
+        threshold = frequency_config.get(f'{kind}_threshold', {'ip': 100, 'path': 500, 'ip_path': 50}[kind])
+        return self.frequency.is_hot(kind, key, threshold, time.time())
+        
     def detect_security_anomalies(self) -> List[Dict[str, Any]]:
         """Detect security-related anomalies"""
+        return self.scan_website_tree(file_checks=False)['security']
+        
+    def _scan_file_for_malware(self, file_path: str, file_stat: Optional[os.stat_result] = None) -> List[Dict[str, Any]]:
+        """Scan one PHP file for malware patterns, skipping unchanged files via the scan cache"""
         anomalies = []
         
-        if not os.path.exists(self.website_path):
-            return anomalies
+        def scan_missing(names: List[str]) -> Dict[str, List[str]]:
+            with open_buffer(file_path, self.mmap_threshold) as buffer:
+                return {'anomaly_detector.malware': self.malware_matcher.search(buffer)}
             
-        # Malware patterns to detect
-        malware_patterns = [
-            r'eval\s*\(',
-            r'base64_decode\s*\(',
-            r'shell_exec\s*\(',
-            r'exec\s*\(',
-            r'system\s*\(',
-            r'passthru\s*\(',
-            r'assert\s*\(',
-            r'create_function\s*\(',
-            r'preg_replace.*\/e',
-            r'include\s*\(\s*[\'"]https?:\/\/',
-            r'require\s*\(\s*[\'"]https?:\/\/',
-            r'fsockopen\s*\(',
-            r'popen\s*\(',
-            r'proc_open\s*\(',
-            r'file_get_contents\s*\(\s*[\'"]https?:\/\/',
-            r'curl_exec\s*\('
-        ]
-        
         try:
-            for root, dirs, files in os.walk(self.website_path):
-                for file in files:
-                    if file.endswith('.php'):
-                        file_path = os.path.join(root, file)
-                        try:
-                            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                                content = f.read()
-                                
-                            for pattern in malware_patterns:
-                                if re.search(pattern, content, re.IGNORECASE):
-                                    anomalies.append({
-                                        'type': 'malware_detected',
-                                        'file': file_path,
-                                        'pattern': pattern,
-                                        'timestamp': datetime.now().isoformat(),
-                                        'severity': 'critical'
-                                    })
-                                    
-                        except Exception as e:
-                            self.logger.error(f"Error scanning file {file_path}: {e}")
-                            
+            if self.scan_cache is not None:
+                _, findings = self.scan_cache.scan(file_path, self.malware_ruleset, scan_missing, file_stat)
+            else:
+                findings = scan_missing(list(self.malware_ruleset))
+                
+            for pattern in findings['anomaly_detector.malware']:
+                anomalies.append({
+                    'type': 'malware_detected',
+                    'file': file_path,
+                    'pattern': pattern,
+                    'timestamp': datetime.now().isoformat(),
+                    'severity': 'critical'
+                })
+                    
         except Exception as e:
-            self.logger.error(f"Error scanning for security anomalies: {e}")
+            self.logger.error(f"Error scanning file {file_path}: {e}")
             
         return anomalies
         
@@ -233,6 +585,8 @@ class AnomalyDetector:
                     'used_percent': round(used_percent, 2),
                     'free_space': free_space,
                     'total_space': total_space,
+                    # Where the space went, from the last directory index update
+                    'top_growth': self.disk_index.top_growth(),
                     'timestamp': datetime.now().isoformat(),
                     'severity': 'critical'
                 })
@@ -242,6 +596,7 @@ class AnomalyDetector:
                     'used_percent': round(used_percent, 2),
                     'free_space': free_space,
                     'total_space': total_space,
+                    'top_growth': self.disk_index.top_growth(),
                     'timestamp': datetime.now().isoformat(),
                     'severity': 'medium'
                 })
@@ -286,7 +641,20 @@ class AnomalyDetector:
                 load_5min = float(load_avg[1])
                 load_15min = float(load_avg[2])
                 
-                if load_1min > 2.0:
+                deviation = self.baseline.observe('load_1min', load_1min, time.time())
+                self.baseline.save()
+                warming_up = self.baseline.metrics['load_1min'].overall.count <= self.baseline.warmup
+                
+                if deviation:
+                    anomalies.append({
+                        **self._baseline_anomaly(deviation),
+                        'type': 'high_cpu_load',
+                        'load_1min': load_1min,
+                        'load_5min': load_5min,
+                        'load_15min': load_15min
+                    })
+                elif warming_up and load_1min > 2.0:
+                    # Fixed threshold until the load profile has been learned
                     anomalies.append({
                         'type': 'high_cpu_load',
                         'load_1min': load_1min,
@@ -304,6 +672,57 @@ class AnomalyDetector:
             
         return anomalies
         
+    def update_disk_index(self) -> Dict[str, Any]:
+        """Rescan directory sizes when due, otherwise only sample the filesystem"""
+        if self.disk_index.scanned is None:
+            self.disk_index.load()
+        rescan_interval = self.config.get('disk_rescan_interval', 3600)
+        stats = {}
+        if self.disk_index.scanned is None or time.time() - self.disk_index.scanned >= rescan_interval:
+            stats = self.disk_index.scan()
+            self.logger.info(
+                f"Indexed disk usage of {stats['files']} files in {stats['directories']} directories "
+                f"in {stats['duration']}s"
+            )
+        else:
+            self.disk_index.sample_filesystem()
+        self.disk_index.save()
+        return stats
+        
+    def detect_disk_anomalies(self) -> List[Dict[str, Any]]:
+        """Detect fast-growing directories and forecast when the disk fills up"""
+        anomalies = []
+        
+        try:
+            self.update_disk_index()
+            
+            horizon = self.config.get('disk_full_horizon', 24 * 3600)
+            forecast = self.disk_index.time_to_full()
+            if forecast and forecast['seconds_to_full'] is not None and forecast['seconds_to_full'] <= horizon:
+                anomalies.append({
+                    'type': 'disk_fill_forecast',
+                    'path': forecast['filesystem'],
+                    **forecast,
+                    'top_growth': self.disk_index.top_growth(),
+                    'timestamp': datetime.now().isoformat(),
+                    'severity': 'critical' if forecast['seconds_to_full'] <= horizon / 4 else 'high'
+                })
+                
+            growth_threshold = self.config.get('directory_growth_threshold', 1024 ** 3)
+            for growth in self.disk_index.top_growth(limit=10):
+                if growth['bytes_per_hour'] >= growth_threshold:
+                    anomalies.append({
+                        'type': 'directory_growth',
+                        **growth,
+                        'timestamp': datetime.now().isoformat(),
+                        'severity': 'medium'
+                    })
+                    
+        except Exception as e:
+            self.logger.error(f"Error detecting disk anomalies: {e}")
+            
+        return anomalies
+        
     def _is_suspicious_file(self, file_path: str) -> bool:
         """Check if file is suspicious"""
         suspicious_extensions = ['.php.suspected', '.bak', '.old', '.backup']
@@ -373,35 +792,129 @@ class AnomalyDetector:
         return False
         
     def run_detection(self) -> List[Dict[str, Any]]:
-        """Run all anomaly detection"""
+        """Run all anomaly detection, detectors concurrently within their deadlines"""
         all_anomalies = []
         
         self.logger.info("Starting anomaly detection...")
         
-        # File changes
-        file_anomalies = self.detect_file_changes()
-        all_anomalies.extend(file_anomalies)
-        self.logger.info(f"Detected {len(file_anomalies)} file anomalies")
+        pool = self.detector_pool
         
-        # Network anomalies
-        network_anomalies = self.detect_network_anomalies()
-        all_anomalies.extend(network_anomalies)
-        self.logger.info(f"Detected {len(network_anomalies)} network anomalies")
+        # File changes and security anomalies share one tree traversal
+        tree_anomalies = {'file': [], 'security': []}
+        tree_deadline = time.monotonic() + pool.deadline('tree')
+        reports = pool.run(
+            {
+                'tree': lambda: self.scan_website_tree(results=tree_anomalies, deadline=tree_deadline),
+                'network': self.detect_network_anomalies,
+                'performance': self.detect_performance_anomalies,
+                'disk': self.detect_disk_anomalies
+            },
+            partial={'tree': lambda: {kind: list(found) for kind, found in tree_anomalies.items()}}
+        )
         
-        # Security anomalies
-        security_anomalies = self.detect_security_anomalies()
-        all_anomalies.extend(security_anomalies)
-        self.logger.info(f"Detected {len(security_anomalies)} security anomalies")
-        
-        # Performance anomalies
-        performance_anomalies = self.detect_performance_anomalies()
-        all_anomalies.extend(performance_anomalies)
-        self.logger.info(f"Detected {len(performance_anomalies)} performance anomalies")
+        tree_result = reports['tree']['result'] or {'file': [], 'security': []}
+        detected = {
+            'file': tree_result['file'],
+            'network': reports['network']['result'] or [],
+            'security': tree_result['security'],
+            'performance': reports['performance']['result'] or [],
+            'disk': reports['disk']['result'] or []
+        }
+        tree_complete = reports['tree']['status'] == 'ok' and not self.last_walk_stats.get('truncated', False)
+        complete = {
+            'file': tree_complete,
+            'network': reports['network']['status'] == 'ok',
+            'security': tree_complete,
+            'performance': reports['performance']['status'] == 'ok',
+            'disk': reports['disk']['status'] == 'ok'
+        }
+        detected_count = 0
+        for kind, anomalies in detected.items():
+            detected_count += len(anomalies)
+            reported = self.filter_anomalies(kind, anomalies, complete[kind])
+            all_anomalies.extend(reported)
+            self.logger.info(f"Detected {len(anomalies)} {kind} anomalies, {len(reported)} new or changed")
+            
+        self.last_run = {
+            'timestamp': datetime.now().isoformat(),
+            'detectors': {
+                name: {
+                    'status': report['status'],
+                    'wall_time': report['wall_time'],
+                    'cpu_time': report['cpu_time']
+                }
+                for name, report in reports.items()
+            },
+            'partial': any(report['status'] != 'ok' for report in reports.values()),
+            'detected': detected_count,
+            'reported': len(all_anomalies)
+        }
+        if reports['tree']['status'] == 'ok':
+            self.last_run['detectors']['tree']['truncated'] = self.last_walk_stats.get('truncated', False)
+        for name, timing in self.last_run['detectors'].items():
+            self.logger.info(
+                f"Detector {name}: {timing['status']} in {timing['wall_time']}s wall, {timing['cpu_time']}s CPU"
+            )
         
-        self.logger.info(f"Total anomalies detected: {len(all_anomalies)}")
+        self.logger.info(f"Total anomalies detected: {detected_count}, reported: {len(all_anomalies)}")
         
         return all_anomalies
         
+    def handle_changed_paths(self, paths: Set[str]) -> List[Dict[str, Any]]:
+        """Run file-level checks on paths pushed by the file watcher"""
+        anomalies = []
+        # The tree walk never enters pruned directories, so neither does the manifest
+        paths = {file_path for file_path in paths if not is_pruned(file_path, self.website_path, self.prune_dirs)}
+        
+        with self.manifest_lock:
+            if not self.manifest.loaded and not self.manifest.load():
+                # Without a baseline every path would look new; build one first
+                self.manifest.scan(self.website_path, self.prune_dirs)
+                
+            diff = self.manifest.update_paths(paths)
+            self.manifest.save()
+            self._forget_removed(diff)
+            file_anomalies = self._integrity_anomalies(diff)
+            changed = {file_path: self.manifest.entries.get(file_path) for file_path in diff['added'] + diff['modified']}
+        security_anomalies = []
+        
+        for file_path in sorted(changed):
+            entry = changed[file_path]
+            file_anomalies.extend(self._check_file_metadata(file_path, entry[1] if entry else 0))
+            if file_path.endswith('.php'):
+                security_anomalies.extend(self._scan_file_for_malware(file_path))
+                
+        if self.scan_cache is not None:
+            self.scan_cache.flush()
+            
+        if self.disk_index.scanned is not None:
+            self.disk_index.refresh_paths(paths)
+            
+        # Only part of the tree was checked, so nothing can be resolved here
+        anomalies.extend(self.filter_anomalies('file', file_anomalies, complete=False))
+        anomalies.extend(self.filter_anomalies('security', security_anomalies, complete=False))
+            
+        if anomalies:
+            self.logger.info(f"Detected {len(anomalies)} anomalies in {len(paths)} changed paths")
+        return anomalies
+        
+    def watch(self, on_anomalies=None) -> bool:
+        """Push file changes to the detectors as they happen instead of polling"""
+        self.watcher = FileWatcher(
+            self.website_path,
+            debounce=self.config.get('watch_debounce', 0.5),
+            max_delay=self.config.get('watch_max_delay', 5.0),
+            logger=self.logger
+        )
+        
+        def on_change(paths: Set[str]):
+            anomalies = self.handle_changed_paths(paths)
+            if anomalies and on_anomalies:
+                on_anomalies(anomalies)
+                
+        self.watcher.subscribe(on_change)
+        return self.watcher.start()
+        
     def send_telegram_alert(self, anomalies: List[Dict[str, Any]]) -> bool:
         """Send encrypted anomaly alerts to Telegram"""
         if not self.telegram_bot_token or not self.telegram_chat_id:
@@ -423,7 +936,7 @@ class AnomalyDetector:
                 'parse_mode': 'HTML'
             }
             
-            response = requests.post(url, data=data, timeout=10)
+            response = http_session().post(url, data=data, timeout=10)
             return response.status_code == 200
             
         except Exception as e:
@@ -443,8 +956,16 @@ class AnomalyDetector:
             }
             
             emoji = severity_emoji.get(anomaly.get('severity', 'low'), '⚪')
-            message += f"{emoji} {anomaly.get('type', 'Unknown').upper()}\n"
+            reason = anomaly.get('notify_reason')
+            if reason == 'resolved':
+                emoji = '✅'
+            message += f"{emoji} {anomaly.get('type', 'Unknown').upper()}"
+            if reason and reason != 'new':
+                message += f" ({reason.upper()})"
+            message += "\n"
             message += f"Time: {anomaly.get('timestamp', 'Unknown')}\n"
+            if anomaly.get('occurrences', 1) > 1:
+                message += f"Seen: {anomaly['occurrences']} times since {anomaly['first_seen']}\n"
             
             if 'file' in anomaly:
                 message += f"File: {anomaly['file']}\n"
@@ -460,23 +981,10 @@ class AnomalyDetector:
     def _encrypt_message(self, message: str) -> str:
         """Encrypt message for security"""
         try:
-            from cryptography.fernet import Fernet
-            from cryptography.hazmat.primitives import hashes
-            from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
             import base64
             
-            # Derive key from encryption key
-            salt = b'kopma_ultimate_salt_2024'
-            kdf = PBKDF2HMAC(
-                algorithm=hashes.SHA256(),
-                length=32,
-                salt=salt,
-                iterations=100000,
-            )
-            key = base64.urlsafe_b64encode(kdf.derive(self.encryption_key.encode()))
-            
-            # Encrypt message
-            cipher = Fernet(key)
+            # The key is derived once per process and shared with other components
+            cipher = fernet(self.encryption_key, b'kopma_ultimate_salt_2024')
             encrypted = cipher.encrypt(message.encode())
             return base64.urlsafe_b64encode(encrypted).decode()
             
@@ -485,25 +993,70 @@ class AnomalyDetector:
             return message  # Return unencrypted if encryption fails
 
 if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Anomaly Detector for KOPMA UNNES Website')
+    parser.add_argument('--watch', action='store_true', help='Watch the website tree and check changes as they happen')
+    parser.add_argument('--outliers', action='store_true', help='Only score per-IP behaviour over recent log lines')
+    parser.add_argument('--window', type=int, default=100000, help='Log lines scored by --outliers')
+    parser.add_argument('--disk-growth', action='store_true', help='Show the fastest-growing directories and time to full')
+    parser.add_argument('--startup-profile', action='store_true', help='Report what starting this script spends on imports')
+    args = parser.parse_args()
+    
+    if args.startup_profile:
+        from startup_profile import print_startup_profile
+        print_startup_profile(__file__)
+        sys.exit(0)
+    
     # Configuration
     config = {
         'encryption_key': os.getenv('ENCRYPTION_KEY', 'default_key_change_me'),
         'telegram_bot_token': os.getenv('TELEGRAM_BOT_TOKEN', ''),
         'telegram_chat_id': os.getenv('TELEGRAM_CHAT_ID', ''),
         'website_path': os.getenv('WEBSITE_PATH', '/usr/share/nginx/html'),
-        'log_file': os.getenv('LOG_FILE', '/var/log/nginx/access.log')
+        'log_file': os.getenv('LOG_FILE', '/var/log/nginx/access.log'),
+        'state_dir': os.getenv('STATE_DIR', '/app/data'),
+        'detector_deadlines': json.loads(os.getenv('DETECTOR_DEADLINES', '{}'))
     }
     
     # Run anomaly detection
     detector = AnomalyDetector(config)
+    
+    if args.outliers:
+        print(json.dumps(detector.score_log_window(args.window), indent=2))
+        sys.exit(0)
+        
+    if args.disk_growth:
+        detector.update_disk_index()
+        print(json.dumps({
+            'top_growth': detector.disk_index.top_growth(),
+            'forecast': detector.disk_index.time_to_full()
+        }, indent=2))
+        sys.exit(0)
+        
     anomalies = detector.run_detection()
     
     if anomalies:
-        detector.send_telegram_alert(anomalies)
+        detector.publish_anomalies(anomalies)
         print(f"Detected {len(anomalies)} anomalies")
     else:
         print("No anomalies detected")
-
-
-
-
+    for name, timing in detector.last_run['detectors'].items():
+        print(f"  {name}: {timing['status']} ({timing['wall_time']}s wall, {timing['cpu_time']}s CPU)")
+        
+    if args.watch:
+        def report(changed_anomalies: List[Dict[str, Any]]):
+            detector.publish_anomalies(changed_anomalies)
+            print(f"Detected {len(changed_anomalies)} anomalies in changed files")
+            
+        if not detector.watch(on_anomalies=report):
+            detector.events.stop()
+            sys.exit(1)
+        print(f"Watching {detector.website_path} for changes. Press Ctrl+C to stop.")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            detector.watcher.stop()
+    # Deliver the alerts still queued before exiting
+    detector.events.stop()
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# monitoring/anomaly_state.py
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Iterable, Tuple
+
+# Fields that identify an anomaly; everything else (timestamps, sizes,
+# counts, scores) may change between runs without making it a new one
+IDENTITY_FIELDS = ('type', 'file', 'ip', 'uri', 'route', 'metric', 'pattern', 'category', 'path')
+SEVERITY_RANK = {'info': 0, 'low': 0, 'medium': 1, 'high': 2, 'critical': 3}
+
+
+def fingerprint(anomaly: Dict[str, Any]) -> str:
+    """Stable identity of an anomaly across runs"""
+    identity = {field: anomaly[field] for field in IDENTITY_FIELDS if anomaly.get(field) is not None}
+    return hashlib.sha1(json.dumps(identity, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class AnomalyStateStore:
+    """Persistent first-seen/last-seen state per anomaly fingerprint
+
+    Detectors keep reporting a condition for as long as it lasts; the store
+    lets only the transitions through: a new anomaly, one that escalated to
+    a higher severity, one that came back after being resolved, and a
+    reminder once `renotify_interval` has passed since the last
+    notification. Open anomalies a complete run of their scope no longer
+    reports are resolved once unseen for `resolve_after` seconds.
+    """
+
+    def __init__(self, db_path: str, renotify_interval: float = 6 * 3600, resolve_after: float = 300,
+                 retention: float = 30 * 86400):
+        self.db_path = db_path
+        self.renotify_interval = renotify_interval
+        self.resolve_after = resolve_after
+        self.retention = retention
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS anomalies ('
+            ' fingerprint TEXT PRIMARY KEY, scope TEXT, type TEXT, severity TEXT, status TEXT,'
+            ' first_seen REAL, last_seen REAL, last_notified REAL, notified_severity TEXT,'
+            ' occurrences INTEGER, data TEXT)'
+        )
+        self._db.execute('CREATE INDEX IF NOT EXISTS anomalies_scope ON anomalies (scope, status)')
+        self._db.commit()
+
+    def _notify_reason(self, row: Optional[Tuple], severity: str, now: float) -> Optional[str]:
+        """Why an observation should be passed downstream, or None to suppress it"""
+        if row is None:
+            return 'new'
+        status, last_notified, notified_severity = row
+        if status == 'resolved':
+            return 'reopened'
+        if SEVERITY_RANK.get(severity, 0) > SEVERITY_RANK.get(notified_severity, 0):
+            return 'escalated'
+        if self.renotify_interval and now - last_notified >= self.renotify_interval:
+            return 'reminder'
+        return None
+
+    def observe(self, scope: str, anomalies: Iterable[Dict[str, Any]], complete: bool = True,
+                now: Optional[float] = None) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Record one run of a detector scope
+
+        Returns (anomalies to notify, anomalies resolved). Anomalies to
+        notify carry 'notify_reason', 'occurrences' and 'first_seen'. Pass
+        complete=False when the run only covered part of the scope (for
+        example watcher-pushed paths or a run cut short by a deadline), so
+        that what it did not see is not resolved.
+        """
+        now = time.time() if now is None else now
+        notify = []
+        seen = set()
+
+        with self._lock:
+            for anomaly in anomalies:
+                key = fingerprint(anomaly)
+                if key in seen:
+                    continue
+                seen.add(key)
+                severity = anomaly.get('severity', 'low')
+                row = self._db.execute(
+                    'SELECT status, last_notified, notified_severity, first_seen, occurrences'
+                    ' FROM anomalies WHERE fingerprint = ?', (key,)
+                ).fetchone()
+                reason = self._notify_reason(row[:3] if row else None, severity, now)
+
+                if row is None or row[0] == 'resolved':
+                    first_seen, occurrences = now, 1
+                else:
+                    first_seen, occurrences = row[3], row[4] + 1
+                last_notified = now if reason else row[1]
+                notified_severity = severity if reason else row[2]
+
+                self._db.execute(
+                    'INSERT OR REPLACE INTO anomalies VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    (key, scope, anomaly.get('type'), severity, 'open', first_seen, now,
+                     last_notified, notified_severity, occurrences, json.dumps(anomaly, default=str))
+                )
+                if reason:
+                    notify.append({
+                        **anomaly,
+                        'notify_reason': reason,
+                        'occurrences': occurrences,
+                        'first_seen': datetime.fromtimestamp(first_seen).isoformat()
+                    })
+
+            resolved = []
+            if complete:
+                rows = self._db.execute(
+                    'SELECT fingerprint, last_seen, occurrences, data FROM anomalies'
+                    ' WHERE scope = ? AND status = ? AND last_seen <= ?',
+                    (scope, 'open', now - self.resolve_after)
+                ).fetchall()
+                for key, last_seen, occurrences, data in rows:
+                    if key in seen:
+                        continue
+                    self._db.execute('UPDATE anomalies SET status = ? WHERE fingerprint = ?', ('resolved', key))
+                    resolved.append({
+                        **json.loads(data),
+                        'notify_reason': 'resolved',
+                        'occurrences': occurrences,
+                        'last_seen': datetime.fromtimestamp(last_seen).isoformat()
+                    })
+
+            self._db.execute(
+                'DELETE FROM anomalies WHERE status = ? AND last_seen < ?',
+                ('resolved', now - self.retention)
+            )
+            self._db.commit()
+
+        return notify, resolved
+
+    def open_anomalies(self, scope: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Currently open anomalies with their state"""
+        query = 'SELECT scope, first_seen, last_seen, occurrences, data FROM anomalies WHERE status = ?'
+        params = ['open']
+        if scope is not None:
+            query += ' AND scope = ?'
+            params.append(scope)
+        with self._lock:
+            rows = self._db.execute(query, params).fetchall()
+        return [
+            {
+                **json.loads(data),
+                'scope': row_scope,
+                'first_seen': datetime.fromtimestamp(first_seen).isoformat(),
+                'last_seen': datetime.fromtimestamp(last_seen).isoformat(),
+                'occurrences': occurrences
+            }
+            for row_scope, first_seen, last_seen, occurrences, data in rows
+        ]
+
+    def get_statistics(self) -> Dict[str, int]:
+        """Count of tracked anomalies by status"""
+        with self._lock:
+            rows = self._db.execute('SELECT status, COUNT(*) FROM anomalies GROUP BY status').fetchall()
+        return {status: count for status, count in rows}
+
+    def close(self):
+        """Close the database"""
+        with self._lock:
+            self._db.commit()
+            self._db.close()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# monitoring/byte_scanner.py
+
+import os
+import re
+import mmap
+from contextlib import contextmanager
+from typing import Dict, List, Any, Iterator, Union
+
+Buffer = Union[bytes, mmap.mmap]
+
+MMAP_THRESHOLD = 1024 * 1024       # map files from 1MB up instead of reading them
+WINDOW_SIZE = 8 * 1024 * 1024      # scan mapped files in 8MB windows...
+WINDOW_OVERLAP = 64 * 1024         # ...overlapping so boundary-spanning matches are found
+
+
+@contextmanager
+def open_buffer(file_path: str, mmap_threshold: int = MMAP_THRESHOLD) -> Iterator[Buffer]:
+    """Yield file content as bytes, or as a read-only mmap for large files"""
+    with open(file_path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < mmap_threshold or size == 0:
+            yield f.read()
+            return
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            yield mapped
+        finally:
+            mapped.close()
+
+
+class BytePatternSet:
+    """Text patterns precompiled to bytes regexes, matched over bytes or mmap buffers"""
+
+    def __init__(self, patterns: List[str], flags: int = 0,
+                 window_size: int = WINDOW_SIZE, overlap: int = WINDOW_OVERLAP):
+        self.patterns = list(patterns)
+        self.compiled = [(pattern, re.compile(pattern.encode('utf-8'), flags)) for pattern in self.patterns]
+        self.window_size = window_size
+        self.overlap = overlap
+
+    def iter_matches(self, regex: 're.Pattern', buffer: Buffer) -> Iterator['re.Match']:
+        """Yield matches, windowing over buffers larger than one window"""
+        size = len(buffer)
+        if size <= self.window_size + self.overlap:
+            yield from regex.finditer(buffer)
+            return
+
+        for start in range(0, size, self.window_size):
+            owned_end = start + self.window_size
+            end = min(size, owned_end + self.overlap)
+            for match in regex.finditer(buffer, start, end):
+                # Matches starting in the overlap belong to the next window
+                if match.start() < owned_end:
+                    yield match
+
+    def search(self, buffer: Buffer) -> List[str]:
+        """Patterns with at least one match"""
+        matched = []
+        for pattern, regex in self.compiled:
+            for _ in self.iter_matches(regex, buffer):
+                matched.append(pattern)
+                break
+        return matched
+
+    def findall(self, buffer: Buffer) -> Dict[str, List[Any]]:
+        """All matches per pattern, decoded the way re.findall returns them"""
+        results = {}
+        for pattern, regex in self.compiled:
+            matches = []
+            for match in self.iter_matches(regex, buffer):
+                if regex.groups == 0:
+                    matches.append(match.group(0).decode('utf-8', 'ignore'))
+                elif regex.groups == 1:
+                    matches.append((match.group(1) or b'').decode('utf-8', 'ignore'))
+                else:
+                    matches.append(tuple((group or b'').decode('utf-8', 'ignore') for group in match.groups()))
+            if matches:
+                results[pattern] = matches
+        return results
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# monitoring/check_scheduler.py
+
+import heapq
+import random
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, Callable
+
+# Weight of the latest lag sample in the smoothed lag
+LAG_ALPHA = 0.2
+
+
+class ScheduledCheck:
+    """One periodic check and its schedule statistics"""
+
+    def __init__(self, name: str, func: Callable[[], Any], interval: float, jitter: float = 0.0,
+                 timeout: Optional[float] = None, offset: float = 0.0):
+        self.name = name
+        self.func = func
+        self.interval = max(0.001, interval)
+        self.jitter = jitter
+        self.timeout = timeout if timeout is not None else interval
+        self.offset = offset
+        # Jitter-free grid the check is held to, so delays never accumulate
+        self.base_due = 0.0
+        self.due = 0.0
+        self.future = None
+        self.started = None
+        self.timed_out = False
+        self.stats = {
+            'runs': 0,
+            'errors': 0,
+            'timeouts': 0,
+            'overruns': 0,
+            'skipped': 0,
+            'last_duration': None,
+            'last_lag': None,
+            'avg_lag': 0.0,
+            'max_lag': 0.0,
+            'last_run': None
+        }
+
+    def schedule(self, base_due: float):
+        """Set the next slot on the grid, delayed by this slot's jitter"""
+        self.base_due = base_due
+        self.due = base_due + random.uniform(0.0, self.jitter * self.interval)
+
+
+class CheckScheduler:
+    """Heap-based scheduler running checks on independent intervals
+
+    Each check has its own interval, jitter (a fraction of the interval,
+    added to every slot to keep checks from firing in lockstep) and
+    timeout. Checks run in a thread pool, so a slow check only delays
+    itself. Slots stay on a fixed grid from the start time, so the time a
+    check takes does not push its later runs back; a check still running
+    when its next slot comes, or a dispatcher that fell behind by whole
+    intervals, counts as an overrun and the missed slots are skipped
+    rather than run back to back. Lag is how late a check started
+    relative to its slot. An offset delays a check's first slot, to
+    stagger checks sharing an interval; `stretch` scales every interval,
+    so a caller can slow all checks down under load.
+    """
+
+    def __init__(self, max_workers: int = 4, logger: Optional[logging.Logger] = None):
+        self.max_workers = max_workers
+        self.logger = logger or logging.getLogger('check_scheduler')
+        self.checks = {}
+        self.stretch = 1.0
+        self._heap = []
+        self._stop = threading.Event()
+        self._executor = None
+
+    def add(self, name: str, func: Callable[[], Any], interval: float, jitter: float = 0.0,
+            timeout: Optional[float] = None, offset: float = 0.0):
+        """Register a check; it first runs `offset` seconds after start"""
+        self.checks[name] = ScheduledCheck(name, func, interval, jitter, timeout, offset)
+
+    def _push(self, check: ScheduledCheck):
+        heapq.heappush(self._heap, (check.due, check.name))
+
+    def _advance(self, check: ScheduledCheck, now: float):
+        """Move a check to its next slot on the grid, skipping slots already past"""
+        interval = check.interval * self.stretch
+        base_due = check.base_due + interval
+        if base_due <= now:
+            missed = int((now - base_due) // interval) + 1
+            check.stats['overruns'] += 1
+            check.stats['skipped'] += missed
+            base_due += missed * interval
+        check.schedule(base_due)
+        self._push(check)
+
+    def _dispatch(self, check: ScheduledCheck, now: float):
+        """Start a due check unless its previous run is still going"""
+        if check.future is not None and not check.future.done():
+            # Still running (possibly past its timeout): do not stack runs
+            check.stats['overruns'] += 1
+            check.stats['skipped'] += 1
+            return
+
+        lag = max(0.0, now - check.due)
+        stats = check.stats
+        stats['last_lag'] = round(lag, 4)
+        stats['avg_lag'] = round(lag if stats['runs'] == 0 else
+                                 (1 - LAG_ALPHA) * stats['avg_lag'] + LAG_ALPHA * lag, 4)
+        stats['max_lag'] = round(max(stats['max_lag'], lag), 4)
+        stats['runs'] += 1
+        stats['last_run'] = time.time()
+        check.started = now
+        check.timed_out = False
+        check.future = self._executor.submit(check.func)
+        check.future.add_done_callback(lambda future, check=check: self._finished(check, future))
+
+    def _finished(self, check: ScheduledCheck, future):
+        """Record the outcome of a run"""
+        check.stats['last_duration'] = round(time.monotonic() - check.started, 4)
+        error = future.exception()
+        if error is not None:
+            check.stats['errors'] += 1
+            self.logger.error(f"Check {check.name} failed: {error}")
+
+    def _reap_timeouts(self, now: float) -> Optional[float]:
+        """Flag running checks past their timeout; returns the next timeout instant"""
+        next_timeout = None
+        for check in self.checks.values():
+            if check.future is None or check.future.done() or check.timed_out:
+                continue
+            expires = check.started + check.timeout
+            if now >= expires:
+                # Threads cannot be killed; the run is abandoned and the
+                # check is not started again until it returns
+                check.timed_out = True
+                check.stats['timeouts'] += 1
+                self.logger.warning(f"Check {check.name} exceeded its {check.timeout}s timeout")
+            elif next_timeout is None or expires < next_timeout:
+                next_timeout = expires
+        return next_timeout
+
+    def run(self):
+        """Dispatch checks until stop() is called"""
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='check')
+        start = time.monotonic()
+        self._heap = []
+        for check in self.checks.values():
+            check.schedule(start + check.offset)
+            self._push(check)
+
+        try:
+            while not self._stop.is_set() and self._heap:
+                now = time.monotonic()
+                next_timeout = self._reap_timeouts(now)
+                due, name = self._heap[0]
+                if due <= now:
+                    heapq.heappop(self._heap)
+                    check = self.checks[name]
+                    self._dispatch(check, now)
+                    self._advance(check, now)
+                    continue
+                wake = due if next_timeout is None else min(due, next_timeout)
+                self._stop.wait(max(0.0, wake - now))
+        finally:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stop(self):
+        """Stop dispatching; running checks finish in the background"""
+        self._stop.set()
+
+    def get_statistics(self) -> Dict[str, Dict[str, Any]]:
+        """Schedule statistics per check, including current lag"""
+        now = time.monotonic()
+        statistics = {}
+        for name, check in self.checks.items():
+            running = check.future is not None and not check.future.done()
+            statistics[name] = {
+                **check.stats,
+                'interval': check.interval,
+                'timeout': check.timeout,
+                'running': running,
+                # How overdue the check is right now, if its slot has passed
+                'current_lag': round(max(0.0, now - check.due), 4) if self._heap else None
+            }
+        return statistics
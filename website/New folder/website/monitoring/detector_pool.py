@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# monitoring/detector_pool.py
+
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, Any, Optional, Callable
+
+DEFAULT_DEADLINE = 60.0
+
+
+class DetectorPool:
+    """Run independent checks concurrently, each against its own deadline
+
+    Every check reports a status ('ok', 'error', 'timeout' or 'skipped')
+    together with its wall and CPU time. Python threads cannot be killed,
+    so a check that misses its deadline is abandoned rather than stopped:
+    the run returns without it, and its partial result is reported if the
+    check exposes one. Until the abandoned run returns, later runs of the
+    same pool skip that check instead of starting a second one on the same
+    state. Checks that can stop early should watch their own deadline.
+    """
+
+    def __init__(self, max_workers: int = 4, deadlines: Optional[Dict[str, float]] = None,
+                 default_deadline: float = DEFAULT_DEADLINE, logger: Optional[logging.Logger] = None):
+        self.max_workers = max_workers
+        self.deadlines = deadlines or {}
+        self.default_deadline = default_deadline
+        self.logger = logger or logging.getLogger('detector_pool')
+        # Runs abandoned at their deadline, per check name
+        self._abandoned = {}
+
+    def deadline(self, name: str) -> float:
+        """Time budget of a check in seconds"""
+        return self.deadlines.get(name, self.default_deadline)
+
+    def busy(self, name: str) -> bool:
+        """Whether an abandoned run of a check is still going"""
+        future = self._abandoned.get(name)
+        return future is not None and not future.done()
+
+    def _timed(self, check: Callable[[], Any], timing: Dict[str, float]) -> Any:
+        """Run a check in a worker thread, recording its CPU time"""
+        cpu_start = time.thread_time()
+        try:
+            return check()
+        finally:
+            timing['cpu_time'] = time.thread_time() - cpu_start
+
+    def run(self, checks: Dict[str, Callable[[], Any]],
+            partial: Optional[Dict[str, Callable[[], Any]]] = None) -> Dict[str, Dict[str, Any]]:
+        """Run checks concurrently; returns a report per check name
+
+        `partial` optionally maps check names to callables returning what a
+        check has produced so far, used when the check times out.
+        """
+        partial = partial or {}
+        reports = {}
+        timings = {name: {} for name in checks}
+        start = time.monotonic()
+        executor = ThreadPoolExecutor(max_workers=min(self.max_workers, len(checks)) or 1,
+                                      thread_name_prefix='detector')
+        pending = {}
+        for name, check in checks.items():
+            if self.busy(name):
+                self.logger.warning(f"Detector {name} skipped: its previous run has not returned")
+                reports[name] = {'status': 'skipped', 'wall_time': 0.0, 'cpu_time': None, 'result': None}
+                continue
+            self._abandoned.pop(name, None)
+            pending[executor.submit(self._timed, check, timings[name])] = name
+
+        try:
+            while pending:
+                next_deadline = min(start + self.deadline(name) for name in pending.values())
+                done, _ = wait(pending, timeout=max(0.0, next_deadline - time.monotonic()),
+                               return_when=FIRST_COMPLETED)
+                now = time.monotonic()
+
+                for future in done:
+                    name = pending.pop(future)
+                    report = {
+                        'status': 'ok',
+                        'wall_time': round(now - start, 4),
+                        'cpu_time': round(timings[name].get('cpu_time', 0.0), 4)
+                    }
+                    try:
+                        report['result'] = future.result()
+                    except Exception as e:
+                        self.logger.error(f"Detector {name} failed: {e}")
+                        report['status'] = 'error'
+                        report['error'] = str(e)
+                        report['result'] = None
+                    reports[name] = report
+
+                for future, name in list(pending.items()):
+                    if now < start + self.deadline(name):
+                        continue
+                    del pending[future]
+                    if not future.cancel():
+                        self._abandoned[name] = future
+                    self.logger.warning(f"Detector {name} missed its {self.deadline(name)}s deadline")
+                    result = None
+                    if name in partial:
+                        try:
+                            result = partial[name]()
+                        except Exception as e:
+                            self.logger.error(f"Error collecting partial result of {name}: {e}")
+                    reports[name] = {
+                        'status': 'timeout',
+                        'wall_time': round(now - start, 4),
+                        # Still running, so its CPU time is not known yet
+                        'cpu_time': None,
+                        'result': result
+                    }
+        finally:
+            # Do not wait for abandoned checks; they finish in the background
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        return {name: reports[name] for name in checks}
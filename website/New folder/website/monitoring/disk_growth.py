@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+# monitoring/disk_growth.py
+
+import os
+import json
+import time
+import threading
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Iterable, Tuple
+
+from tree_walker import walk_files
+
+GROWTH_VERSION = 1
+DEFAULT_DISK_ROOTS = ['/usr/share/nginx/html', '/var/log', '/app', '/var/lib/docker/volumes', '/backups']
+FILESYSTEM_KEY = '__filesystem__'
+
+
+def disk_usage(file_stat: os.stat_result) -> int:
+    """Bytes a file occupies on disk, as du counts them"""
+    blocks = getattr(file_stat, 'st_blocks', None)
+    return blocks * 512 if blocks is not None else file_stat.st_size
+
+
+class DirectorySizeIndex:
+    """Per-directory disk usage with a size history, updated incrementally
+
+    Directories are tracked down to `max_depth` levels below each root;
+    anything deeper is counted in its tracked ancestor. Each tracked
+    directory keeps the bytes of its own files, and totals roll up to the
+    root, so refreshing one directory (for example after the file watcher
+    reports a change in it) only touches that directory and its
+    ancestors. Size samples are kept per directory to answer "what grew
+    the most in the last hour" and, for the filesystem, to forecast when
+    it fills up.
+    """
+
+    def __init__(self, state_file: str, roots: Optional[List[str]] = None, max_depth: int = 3,
+                 filesystem: str = '/', sample_interval: float = 300, history: float = 7 * 86400,
+                 max_samples: int = 500):
+        self.state_file = state_file
+        self.roots = [os.path.abspath(root) for root in (roots or DEFAULT_DISK_ROOTS)]
+        self.max_depth = max_depth
+        self.filesystem = filesystem
+        self.sample_interval = sample_interval
+        self.history = history
+        self.max_samples = max_samples
+        self.own = {}
+        self.totals = {}
+        self.samples = {}
+        self.scanned = None
+        self._lock = threading.Lock()
+
+    def _root_of(self, path: str) -> Optional[str]:
+        for root in self.roots:
+            if path == root or path.startswith(root.rstrip(os.sep) + os.sep):
+                return root
+        return None
+
+    def _key(self, directory: str, root: str) -> str:
+        """Tracked directory that content of `directory` is counted in"""
+        relative = os.path.relpath(directory, root)
+        if relative == '.':
+            return root
+        parts = relative.split(os.sep)[:self.max_depth]
+        return os.path.join(root, *parts)
+
+    def _ancestors(self, key: str, root: str) -> Iterable[str]:
+        """A tracked directory and every tracked directory above it"""
+        while True:
+            yield key
+            if key == root:
+                return
+            key = os.path.dirname(key)
+
+    def _apply(self, key: str, root: str, own_bytes: int):
+        """Set a directory's own bytes and roll the difference up to the root"""
+        delta = own_bytes - self.own.get(key, 0)
+        self.own[key] = own_bytes
+        if delta:
+            for ancestor in self._ancestors(key, root):
+                self.totals[ancestor] = self.totals.get(ancestor, 0) + delta
+
+    def scan(self) -> Dict[str, Any]:
+        """Rebuild the index of every root with one scandir walk each"""
+        stats = {'files': 0, 'directories': 0, 'pruned': 0, 'errors': 0}
+        start_time = time.perf_counter()
+        own = {}
+        for root in self.roots:
+            if not os.path.isdir(root):
+                continue
+            own[root] = 0
+            for file_path, file_stat in walk_files(root, stats=stats):
+                stats['files'] += 1
+                key = self._key(os.path.dirname(file_path), root)
+                own[key] = own.get(key, 0) + disk_usage(file_stat)
+
+        with self._lock:
+            self.own = {}
+            self.totals = {}
+            for key, own_bytes in own.items():
+                root = self._root_of(key)
+                # Every tracked directory gets a total, even without own files
+                for ancestor in self._ancestors(key, root):
+                    self.totals.setdefault(ancestor, 0)
+                self._apply(key, root, own_bytes)
+            self.scanned = time.time()
+            self._record(self.scanned)
+        stats['duration'] = round(time.perf_counter() - start_time, 4)
+        return stats
+
+    def _own_bytes(self, key: str) -> int:
+        """Bytes counted in a tracked directory, read from disk"""
+        depth = len(os.path.relpath(key, self._root_of(key)).split(os.sep))
+        if key != self._root_of(key) and depth >= self.max_depth:
+            # Deepest tracked level: everything below counts here
+            return sum(disk_usage(file_stat) for _, file_stat in walk_files(key))
+        total = 0
+        try:
+            with os.scandir(key) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_file(follow_symlinks=False):
+                            total += disk_usage(entry.stat(follow_symlinks=False))
+                    except OSError:
+                        continue
+        except OSError:
+            return 0
+        return total
+
+    def refresh_paths(self, paths: Iterable[str]) -> int:
+        """Re-measure only the directories containing changed paths"""
+        keys = set()
+        for path in paths:
+            root = self._root_of(os.path.abspath(path))
+            if root is not None:
+                keys.add((self._key(os.path.dirname(os.path.abspath(path)), root), root))
+
+        refreshed = 0
+        for key, root in keys:
+            own_bytes = self._own_bytes(key)
+            with self._lock:
+                for ancestor in self._ancestors(key, root):
+                    self.totals.setdefault(ancestor, 0)
+                self._apply(key, root, own_bytes)
+            refreshed += 1
+        if refreshed:
+            with self._lock:
+                self._record(time.time())
+        return refreshed
+
+    def _filesystem_used(self) -> Optional[Tuple[int, int]]:
+        """(used, free) bytes of the monitored filesystem"""
+        try:
+            usage = os.statvfs(self.filesystem)
+        except OSError:
+            return None
+        free = usage.f_frsize * usage.f_bavail
+        return usage.f_frsize * usage.f_blocks - free, free
+
+    def _record(self, now: float):
+        """Append a size sample per directory, at most one per sample_interval"""
+        sizes = dict(self.totals)
+        filesystem = self._filesystem_used()
+        if filesystem is not None:
+            sizes[FILESYSTEM_KEY] = filesystem[0]
+        previous = max((samples[-1][0] for samples in self.samples.values() if samples), default=None)
+        for key, size in sizes.items():
+            if key not in self.samples and previous is not None and key != FILESYSTEM_KEY:
+                # A directory that appeared since the last sample held nothing then
+                self.samples[key] = [[previous, 0]]
+            samples = self.samples.setdefault(key, [])
+            if samples and now - samples[-1][0] < self.sample_interval:
+                samples[-1] = [samples[-1][0], size]
+                continue
+            samples.append([now, size])
+            while samples and (now - samples[0][0] > self.history or len(samples) > self.max_samples):
+                samples.pop(0)
+        for key in [key for key in self.samples if key not in sizes]:
+            del self.samples[key]
+
+    def sample_filesystem(self):
+        """Record filesystem usage without rescanning directories"""
+        with self._lock:
+            self._record(time.time())
+
+    def growth(self, key: str, window: float = 3600, now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Bytes a directory grew over roughly the last `window` seconds"""
+        now = time.time() if now is None else now
+        with self._lock:
+            samples = list(self.samples.get(key, []))
+        if len(samples) < 2:
+            return None
+        current_time, current = samples[-1]
+        # Latest sample at least `window` old, or the oldest one there is
+        base_time, base = samples[0]
+        for sample_time, size in samples:
+            if sample_time > now - window:
+                break
+            base_time, base = sample_time, size
+        if current_time <= base_time:
+            return None
+        return {
+            'path': key,
+            'size': current,
+            'growth': current - base,
+            'covered_seconds': round(current_time - base_time),
+            'bytes_per_hour': round((current - base) * 3600 / (current_time - base_time))
+        }
+
+    def top_growth(self, window: float = 3600, limit: int = 5) -> List[Dict[str, Any]]:
+        """Directories that grew the most over the window, deepest first on ties"""
+        results = []
+        for key in list(self.samples):
+            if key == FILESYSTEM_KEY:
+                continue
+            growth = self.growth(key, window)
+            if growth and growth['growth'] > 0:
+                results.append(growth)
+        results.sort(key=lambda item: (item['growth'], item['path'].count(os.sep)), reverse=True)
+        return results[:limit]
+
+    def time_to_full(self, window: float = 6 * 3600) -> Optional[Dict[str, Any]]:
+        """Forecast when the filesystem fills up, by a linear fit over the window"""
+        filesystem = self._filesystem_used()
+        with self._lock:
+            samples = [sample for sample in self.samples.get(FILESYSTEM_KEY, [])
+                       if sample[0] >= time.time() - window]
+        if filesystem is None or len(samples) < 3:
+            return None
+
+        count = len(samples)
+        mean_time = sum(sample[0] for sample in samples) / count
+        mean_used = sum(sample[1] for sample in samples) / count
+        variance = sum((sample[0] - mean_time) ** 2 for sample in samples)
+        if variance == 0:
+            return None
+        slope = sum((sample[0] - mean_time) * (sample[1] - mean_used) for sample in samples) / variance
+
+        forecast = {
+            'filesystem': self.filesystem,
+            'free_bytes': filesystem[1],
+            'bytes_per_hour': round(slope * 3600),
+            'seconds_to_full': None,
+            'full_at': None
+        }
+        if slope > 0:
+            seconds = filesystem[1] / slope
+            forecast['seconds_to_full'] = round(seconds)
+            forecast['full_at'] = datetime.fromtimestamp(time.time() + seconds).isoformat()
+        return forecast
+
+    def load(self) -> bool:
+        """Load the persisted index; False if there is none for these roots"""
+        if not os.path.exists(self.state_file):
+            return False
+        with open(self.state_file, 'r') as f:
+            data = json.load(f)
+        if data.get('version') != GROWTH_VERSION or data.get('roots') != self.roots \
+                or data.get('max_depth') != self.max_depth:
+            return False
+        with self._lock:
+            self.own = {}
+            self.totals = {}
+            for key, own_bytes in data.get('own', {}).items():
+                root = self._root_of(key)
+                if root is None:
+                    continue
+                for ancestor in self._ancestors(key, root):
+                    self.totals.setdefault(ancestor, 0)
+                self._apply(key, root, own_bytes)
+            self.samples = data.get('samples', {})
+            self.scanned = data.get('scanned')
+        return True
+
+    def save(self):
+        """Write the index atomically"""
+        with self._lock:
+            data = {
+                'version': GROWTH_VERSION,
+                'roots': self.roots,
+                'max_depth': self.max_depth,
+                'scanned': self.scanned,
+                'own': self.own,
+                'samples': self.samples
+            }
+            os.makedirs(os.path.dirname(self.state_file) or '.', exist_ok=True)
+            temp_file = f"{self.state_file}.tmp"
+            with open(temp_file, 'w') as f:
+                json.dump(data, f, separators=(',', ':'))
+            os.replace(temp_file, self.state_file)
@@ -21,6 +21,8 @@ from cryptography.hazmat.primitives.asymmetric import rsa, padding
 from cryptography.hazmat.backends import default_backend
 import base64
 
+from logging_setup import configure_logger
+
 class AdvancedEncryption:
     def __init__(self, config: Dict[str, Any]):
         self.config = config
@@ -34,22 +36,7 @@ class AdvancedEncryption:
         
     def setup_logger(self) -> logging.Logger:
         """Setup logging configuration"""
-        logger = logging.getLogger('advanced_encryption')
-        logger.setLevel(logging.INFO)
-        
-        # Console handler
-        console_handler = logging.StreamHandler()
-        console_handler.setLevel(logging.INFO)
-        
-        # Formatter
-        formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-        )
-        console_handler.setFormatter(formatter)
-        
-        logger.addHandler(console_handler)
-        
-        return logger
+        return configure_logger('advanced_encryption')
     
     def initialize_keys(self):
         """Initialize encryption keys"""
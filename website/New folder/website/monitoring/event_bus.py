@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+# monitoring/event_bus.py
+
+import time
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Callable, Iterable
+
+# What a full consumer queue does with a new event
+DROP_OLDEST = 'drop_oldest'  # evict the oldest queued event (alerts: newest matter most)
+DROP_NEWEST = 'drop_newest'  # refuse the new event (keeps an ordered prefix)
+BLOCK = 'block'              # make the publisher wait up to block_timeout, then refuse it
+POLICIES = (DROP_OLDEST, DROP_NEWEST, BLOCK)
+
+# Weight of the latest sample in the smoothed handling time
+HANDLE_ALPHA = 0.2
+
+
+class Event:
+    """One published event: what happened (kind), how bad, who saw it, and its data"""
+
+    __slots__ = ('kind', 'severity', 'source', 'data', 'timestamp', 'sequence', 'published')
+
+    def __init__(self, kind: str, data: Dict[str, Any], severity: str = 'info', source: str = '',
+                 sequence: int = 0):
+        self.kind = kind
+        self.data = data
+        self.severity = severity
+        self.source = source
+        self.sequence = sequence
+        self.timestamp = datetime.now().isoformat()
+        self.published = time.monotonic()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'kind': self.kind,
+            'severity': self.severity,
+            'source': self.source,
+            'timestamp': self.timestamp,
+            'sequence': self.sequence,
+            'data': self.data
+        }
+
+
+class Consumer:
+    """A subscriber with its own bounded queue and worker thread
+
+    A slow consumer only fills its own queue; what happens once the queue
+    is full is its `policy`. Lag is how many accepted events wait to be
+    handled and how long the oldest has been waiting.
+    """
+
+    def __init__(self, name: str, handler: Callable[[List[Event]], Any], kinds: Optional[Iterable[str]] = None,
+                 capacity: int = 1000, policy: str = DROP_OLDEST, batch_size: int = 1,
+                 block_timeout: float = 1.0, logger: Optional[logging.Logger] = None):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown drop policy: {policy}")
+        self.name = name
+        self.handler = handler
+        self.kinds = set(kinds) if kinds is not None else None
+        self.capacity = max(1, capacity)
+        self.policy = policy
+        self.batch_size = max(1, batch_size)
+        self.block_timeout = block_timeout
+        self.logger = logger or logging.getLogger('event_bus')
+        self.queue = deque()
+        self.thread = None
+        self.stopping = False
+        self._condition = threading.Condition()
+        self.stats = {
+            'accepted': 0,
+            'handled': 0,
+            'dropped': 0,
+            'errors': 0,
+            'max_queued': 0,
+            'max_lag_seconds': 0.0,
+            'avg_handle_time': 0.0,
+            'last_error': None
+        }
+
+    def wants(self, event: Event) -> bool:
+        return self.kinds is None or event.kind in self.kinds
+
+    def offer(self, event: Event) -> bool:
+        """Queue an event under the drop policy; False if it was dropped"""
+        with self._condition:
+            if len(self.queue) >= self.capacity:
+                if self.policy == DROP_OLDEST:
+                    self.queue.popleft()
+                    self.stats['dropped'] += 1
+                elif self.policy == BLOCK:
+                    deadline = time.monotonic() + self.block_timeout
+                    while len(self.queue) >= self.capacity and not self.stopping:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._condition.wait(remaining)
+                if len(self.queue) >= self.capacity:
+                    self.stats['dropped'] += 1
+                    return False
+            self.queue.append(event)
+            self.stats['accepted'] += 1
+            self.stats['max_queued'] = max(self.stats['max_queued'], len(self.queue))
+            self._condition.notify_all()
+        return True
+
+    def _take(self) -> Optional[List[Event]]:
+        """Wait for the next batch; None once stopping with nothing left"""
+        with self._condition:
+            while not self.queue:
+                if self.stopping:
+                    return None
+                self._condition.wait()
+            batch = [self.queue.popleft() for _ in range(min(self.batch_size, len(self.queue)))]
+            # Room was made for publishers blocked on a full queue
+            self._condition.notify_all()
+            return batch
+
+    def run(self):
+        while True:
+            batch = self._take()
+            if batch is None:
+                return
+            started = time.monotonic()
+            lag = started - batch[0].published
+            try:
+                self.handler(batch)
+            except Exception as e:
+                self.stats['errors'] += 1
+                self.stats['last_error'] = str(e)
+                self.logger.error(f"Event consumer {self.name} failed: {e}")
+            duration = time.monotonic() - started
+            stats = self.stats
+            stats['handled'] += len(batch)
+            stats['max_lag_seconds'] = round(max(stats['max_lag_seconds'], lag), 4)
+            stats['avg_handle_time'] = round((1 - HANDLE_ALPHA) * stats['avg_handle_time'] + HANDLE_ALPHA * duration, 4)
+
+    def start(self):
+        self.stopping = False
+        self.thread = threading.Thread(target=self.run, name=f'events-{self.name}', daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Handle what is queued, then stop; gives up after `timeout` seconds"""
+        with self._condition:
+            self.stopping = True
+            self._condition.notify_all()
+        if self.thread is not None:
+            self.thread.join(timeout)
+            self.thread = None
+
+    def get_statistics(self) -> Dict[str, Any]:
+        with self._condition:
+            queued = len(self.queue)
+            oldest = self.queue[0].published if self.queue else None
+        return {
+            **self.stats,
+            'queued': queued,
+            'capacity': self.capacity,
+            'policy': self.policy,
+            'lag_seconds': round(time.monotonic() - oldest, 4) if oldest is not None else 0.0
+        }
+
+
+class EventBus:
+    """In-process publish/subscribe decoupling detectors from alert sinks
+
+    publish() only puts the event on each interested consumer's queue, so
+    a detector never waits on Telegram, the disk or SQLite (unless a
+    consumer chose the BLOCK policy, and then for at most its
+    block_timeout). Consumer threads start with the first publish.
+    """
+
+    def __init__(self, logger: Optional[logging.Logger] = None):
+        self.logger = logger or logging.getLogger('event_bus')
+        self.consumers = {}
+        self.published = 0
+        self.running = False
+        self._lock = threading.Lock()
+
+    def subscribe(self, name: str, handler: Callable[[List[Event]], Any], kinds: Optional[Iterable[str]] = None,
+                  capacity: int = 1000, policy: str = DROP_OLDEST, batch_size: int = 1,
+                  block_timeout: float = 1.0) -> Consumer:
+        """Add a consumer of events of the given kinds (all kinds if None)"""
+        consumer = Consumer(name, handler, kinds, capacity, policy, batch_size, block_timeout, self.logger)
+        with self._lock:
+            self.consumers[name] = consumer
+            if self.running:
+                consumer.start()
+        return consumer
+
+    def start(self):
+        with self._lock:
+            if self.running:
+                return
+            self.running = True
+            for consumer in self.consumers.values():
+                consumer.start()
+
+    def publish(self, kind: str, data: Dict[str, Any], severity: str = 'info', source: str = '') -> Event:
+        """Hand an event to every interested consumer without waiting for them"""
+        if not self.running:
+            self.start()
+        with self._lock:
+            self.published += 1
+            event = Event(kind, data, severity, source, self.published)
+            consumers = list(self.consumers.values())
+        for consumer in consumers:
+            if consumer.wants(event):
+                consumer.offer(event)
+        return event
+
+    def stop(self, timeout: float = 5.0):
+        """Drain and stop every consumer"""
+        with self._lock:
+            self.running = False
+            consumers = list(self.consumers.values())
+        for consumer in consumers:
+            consumer.stop(timeout)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Published count and per-consumer queue, drop and lag statistics"""
+        return {
+            'published': self.published,
+            'consumers': {name: consumer.get_statistics() for name, consumer in self.consumers.items()}
+        }
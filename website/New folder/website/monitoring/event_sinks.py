@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# monitoring/event_sinks.py
+
+import os
+import json
+import time
+import sqlite3
+import threading
+from collections import Counter, deque
+from typing import Dict, List, Any, Optional, Callable
+
+from event_bus import Event
+from history_log import SegmentLog
+from anomaly_state import SEVERITY_RANK
+
+
+class EventLogSink:
+    """Persist every event to a size- and age-bounded segment log on disk"""
+
+    def __init__(self, log: SegmentLog):
+        self.log = log
+
+    def __call__(self, events: List[Event]):
+        for event in events:
+            self.log.append(event.to_dict())
+
+
+class EventIndex:
+    """SQLite index of events, for querying recent alerts by kind, source and time"""
+
+    def __init__(self, db_path: str, retention: float = 30 * 86400):
+        self.db_path = db_path
+        self.retention = retention
+        self._lock = threading.Lock()
+        self._last_prune = 0.0
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS events ('
+            ' id INTEGER PRIMARY KEY, kind TEXT, severity TEXT, source TEXT,'
+            ' created REAL, timestamp TEXT, data TEXT)'
+        )
+        self._db.execute('CREATE INDEX IF NOT EXISTS events_kind ON events (kind, created)')
+        self._db.execute('CREATE INDEX IF NOT EXISTS events_source ON events (source, created)')
+        self._db.commit()
+
+    def __call__(self, events: List[Event]):
+        """Index a batch of events in one transaction"""
+        now = time.time()
+        with self._lock:
+            self._db.executemany(
+                'INSERT INTO events (kind, severity, source, created, timestamp, data) VALUES (?, ?, ?, ?, ?, ?)',
+                [(event.kind, event.severity, event.source, now, event.timestamp,
+                  json.dumps(event.data, default=str)) for event in events]
+            )
+            if now - self._last_prune >= 3600:
+                self._db.execute('DELETE FROM events WHERE created < ?', (now - self.retention,))
+                self._last_prune = now
+            self._db.commit()
+
+    def query(self, kind: Optional[str] = None, source: Optional[str] = None, since: Optional[float] = None,
+              limit: int = 100) -> List[Dict[str, Any]]:
+        """Newest matching events first; `since` is a Unix time"""
+        clauses, params = [], []
+        for column, value in (('kind', kind), ('source', source)):
+            if value is not None:
+                clauses.append(f'{column} = ?')
+                params.append(value)
+        if since is not None:
+            clauses.append('created >= ?')
+            params.append(since)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ''
+        with self._lock:
+            rows = self._db.execute(
+                f'SELECT kind, severity, source, timestamp, data FROM events{where} ORDER BY id DESC LIMIT ?',
+                params + [limit]
+            ).fetchall()
+        return [
+            {'kind': kind, 'severity': severity, 'source': source, 'timestamp': timestamp, 'data': json.loads(data)}
+            for kind, severity, source, timestamp, data in rows
+        ]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class EventMetrics:
+    """Running counts of events by kind, severity and source, and the newest events"""
+
+    def __init__(self, recent: int = 500):
+        self.recent_events = deque(maxlen=recent)
+        self.kinds = Counter()
+        self.severities = Counter()
+        self.sources = Counter()
+        self.last_event = None
+        self._lock = threading.Lock()
+
+    def __call__(self, events: List[Event]):
+        with self._lock:
+            for event in events:
+                self.kinds[event.kind] += 1
+                self.severities[event.severity] += 1
+                self.sources[event.source] += 1
+                self.last_event = event.timestamp
+            self.recent_events.extend(events)
+
+    def recent(self, limit: int = 20, kind: Optional[str] = None, source: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Newest events first, optionally of one kind or source"""
+        with self._lock:
+            events = list(self.recent_events)
+        matching = []
+        for event in reversed(events):
+            if (kind is None or event.kind == kind) and (source is None or event.source == source):
+                matching.append(event.to_dict())
+                if len(matching) >= limit:
+                    break
+        return matching
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'by_kind': dict(self.kinds),
+                'by_severity': dict(self.severities),
+                'by_source': dict(self.sources),
+                'last_event': self.last_event
+            }
+
+
+class TelegramRouter:
+    """Deliver each batch of events to the Telegram sender of the component that published them
+
+    Components format and encrypt their own alerts, so a sender is
+    registered per event source; events from a source without one are
+    counted as unrouted.
+    """
+
+    def __init__(self):
+        self.senders = {}
+        self.unrouted = 0
+
+    def route(self, source: str, send: Callable[[List[Event]], Any]):
+        self.senders[source] = send
+
+    def __call__(self, events: List[Event]):
+        by_source = {}
+        for event in events:
+            by_source.setdefault(event.source, []).append(event)
+        for source, batch in by_source.items():
+            send = self.senders.get(source)
+            if send is None:
+                self.unrouted += len(batch)
+                continue
+            send(batch)
+
+
+def highest_severity(events: List[Event]) -> str:
+    """Most severe level among events"""
+    return max((event.severity for event in events), key=lambda severity: SEVERITY_RANK.get(severity, 0))
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# monitoring/file_integrity.py
+
+import os
+import json
+import stat
+import hashlib
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Iterable
+
+from tree_walker import TreeWalker
+
+MANIFEST_VERSION = 1
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(file_path: str, algorithm: str = 'sha256') -> str:
+    """Hash file content in fixed-size chunks"""
+    digest = hashlib.new(algorithm)
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class FileManifest:
+    """Persisted (path, inode, size, mtime_ns, hash) baseline of a directory tree"""
+
+    def __init__(self, manifest_file: str, algorithm: str = 'sha256'):
+        self.manifest_file = manifest_file
+        self.algorithm = algorithm
+        self.entries = {}
+        self.root = None
+        self.created = None
+        self.loaded = False
+        self._seen = set()
+        self._diff = None
+
+    def load(self) -> bool:
+        """Load the manifest from disk; False if there is no usable baseline"""
+        if not os.path.exists(self.manifest_file):
+            return False
+        with open(self.manifest_file, 'r') as f:
+            data = json.load(f)
+        if data.get('version') != MANIFEST_VERSION or data.get('algorithm') != self.algorithm:
+            return False
+        self.root = data.get('root')
+        self.created = data.get('created')
+        self.entries = {path: tuple(entry) for path, entry in data.get('entries', {}).items()}
+        self.loaded = True
+        return True
+
+    def save(self):
+        """Write the manifest atomically"""
+        os.makedirs(os.path.dirname(self.manifest_file) or '.', exist_ok=True)
+        data = {
+            'version': MANIFEST_VERSION,
+            'algorithm': self.algorithm,
+            'root': self.root,
+            'created': self.created or datetime.now().isoformat(),
+            'updated': datetime.now().isoformat(),
+            'entries': self.entries
+        }
+        temp_file = f"{self.manifest_file}.tmp"
+        with open(temp_file, 'w') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(temp_file, self.manifest_file)
+
+    def check_file(self, file_path: str, file_stat: os.stat_result) -> Optional[str]:
+        """Update one entry from its stat; return 'added' or 'modified' on a content change
+
+        Content is re-hashed only when inode, size or mtime_ns differ from
+        the baseline, so an unchanged file costs nothing beyond its stat.
+        """
+        previous = self.entries.get(file_path)
+        inode, size, mtime_ns = file_stat.st_ino, file_stat.st_size, file_stat.st_mtime_ns
+        if previous and previous[:3] == (inode, size, mtime_ns):
+            return None
+
+        content_hash = hash_file(file_path, self.algorithm)
+        self.entries[file_path] = (inode, size, mtime_ns, content_hash)
+        if previous is None:
+            return 'added'
+        if previous[3] != content_hash:
+            return 'modified'
+        return None
+
+    def remove(self, file_path: str) -> bool:
+        """Drop an entry; True if it was tracked"""
+        return self.entries.pop(file_path, None) is not None
+
+    def begin_scan(self, root: str):
+        """Start a full-tree diff; feed files with visit() and close with finish_scan()"""
+        baseline_exists = self.loaded or self.load()
+        if self.root not in (None, root):
+            # Baseline belongs to a different tree; start over
+            self.entries = {}
+            baseline_exists = False
+        self.root = root
+        self._seen = set()
+        self._diff = {'added': [], 'removed': [], 'modified': [], 'baseline_created': not baseline_exists}
+
+    def visit(self, file_path: str, file_stat: os.stat_result):
+        """TreeWalker visitor recording one file of the current scan"""
+        self._seen.add(file_path)
+        try:
+            change = self.check_file(file_path, file_stat)
+        except OSError:
+            return
+        if change and not self._diff['baseline_created']:
+            self._diff[change].append(file_path)
+
+    def finish_scan(self, complete: bool = True) -> Dict[str, Any]:
+        """Finish a full-tree diff, persist the baseline and return the diff
+
+        When no baseline existed yet, the scan records one and reports no
+        changes. An incomplete scan (one cut short by a deadline) cannot
+        tell removed files from unvisited ones, so it reports none.
+        """
+        diff = self._diff
+        unseen = [path for path in self.entries if path not in self._seen] if complete else []
+        for file_path in unseen:
+            self.remove(file_path)
+            if not diff['baseline_created']:
+                diff['removed'].append(file_path)
+
+        if diff['baseline_created'] and not complete:
+            # A partial baseline would report every unvisited file as added
+            self.entries = {}
+            self.loaded = False
+            self._seen = set()
+            return diff
+        if diff['baseline_created']:
+            self.created = datetime.now().isoformat()
+        self.save()
+        self.loaded = True
+        self._seen = set()
+        return diff
+
+    def scan(self, root: str, prune_dirs: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Diff the tree against the baseline and update it"""
+        walker = TreeWalker(root, prune_dirs)
+        walker.add_visitor(self.visit)
+        self.begin_scan(root)
+        walker.walk()
+        return self.finish_scan()
+
+    def update_paths(self, paths: Iterable[str]) -> Dict[str, Any]:
+        """Diff only the given paths against the baseline and update it"""
+        diff = {'added': [], 'removed': [], 'modified': [], 'baseline_created': False}
+        for file_path in paths:
+            try:
+                file_stat = os.stat(file_path, follow_symlinks=False)
+            except FileNotFoundError:
+                if self.remove(file_path):
+                    diff['removed'].append(file_path)
+                continue
+            except OSError:
+                continue
+            if not stat.S_ISREG(file_stat.st_mode):
+                continue
+            try:
+                change = self.check_file(file_path, file_stat)
+            except OSError:
+                continue
+            if change:
+                diff[change].append(file_path)
+        return diff
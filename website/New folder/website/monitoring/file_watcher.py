@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# monitoring/file_watcher.py
+
+import os
+import time
+import logging
+import threading
+from typing import Dict, List, Any, Optional, Callable, Set
+
+from tree_walker import walk_files
+
+
+class FileWatcher:
+    """Inotify-backed watcher keeping an in-memory index of a directory tree
+
+    Filesystem events are coalesced: a burst (for example an Astro deploy
+    rewriting thousands of files) is delivered to subscribers as one set of
+    changed paths once the tree has been quiet for `debounce` seconds, or
+    after `max_delay` seconds at the latest.
+    """
+
+    def __init__(self, root: str, debounce: float = 0.5, max_delay: float = 5.0,
+                 logger: Optional[logging.Logger] = None):
+        self.root = root
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.logger = logger or logging.getLogger('file_watcher')
+        self.index = {}
+        self.subscribers = []
+        self.running = False
+        self.available = True
+        self._pending = set()
+        self._first_event = None
+        self._last_event = None
+        self._lock = threading.Lock()
+        # Guards self.index, which the flush thread updates while others read it
+        self._index_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._observer = None
+        self._flush_thread = None
+
+    def subscribe(self, callback: Callable[[Set[str]], None]):
+        """Register a callback receiving each coalesced set of changed paths"""
+        self.subscribers.append(callback)
+
+    def build_index(self):
+        """Index the whole tree once at startup"""
+        index = {
+            path: (file_stat.st_size, file_stat.st_mtime_ns)
+            for path, file_stat in walk_files(self.root)
+        }
+        with self._index_lock:
+            self.index = index
+        self.logger.info(f"File watcher indexed {len(self.index)} files under {self.root}")
+
+    def _queue(self, *paths: str):
+        """Record raw event paths for the next flush"""
+        now = time.monotonic()
+        with self._lock:
+            self._pending.update(path for path in paths if path)
+            if self._first_event is None:
+                self._first_event = now
+            self._last_event = now
+        self._wakeup.set()
+
+    def _on_event(self, event):
+        """watchdog callback"""
+        if event.is_directory and event.event_type == 'modified':
+            # Fired on the parent of every file created or deleted; the
+            # file's own event already covers the change
+            return
+        self._queue(event.src_path, getattr(event, 'dest_path', ''))
+
+    def _resolve(self, paths: Set[str]) -> Set[str]:
+        """Apply raw event paths to the index and return changed file paths"""
+        with self._index_lock:
+            return self._resolve_locked(paths)
+
+    def _resolve_locked(self, paths: Set[str]) -> Set[str]:
+        changed = set()
+        for path in paths:
+            if os.path.isdir(path):
+                # Directory created or moved in: index everything beneath it
+                for file_path, file_stat in walk_files(path):
+                    signature = (file_stat.st_size, file_stat.st_mtime_ns)
+                    if self.index.get(file_path) != signature:
+                        self.index[file_path] = signature
+                        changed.add(file_path)
+                continue
+
+            try:
+                file_stat = os.stat(path, follow_symlinks=False)
+            except OSError:
+                file_stat = None
+
+            if file_stat is not None:
+                signature = (file_stat.st_size, file_stat.st_mtime_ns)
+                if self.index.get(path) != signature:
+                    self.index[path] = signature
+                    changed.add(path)
+            elif path in self.index:
+                del self.index[path]
+                changed.add(path)
+            else:
+                # Directory removed or moved out: drop everything beneath it
+                prefix = path.rstrip(os.sep) + os.sep
+                for indexed in [p for p in self.index if p.startswith(prefix)]:
+                    del self.index[indexed]
+                    changed.add(indexed)
+        return changed
+
+    def _flush_loop(self):
+        """Deliver coalesced changes once bursts settle"""
+        while self.running:
+            self._wakeup.wait(self.debounce)
+            self._wakeup.clear()
+            now = time.monotonic()
+            with self._lock:
+                if not self._pending:
+                    continue
+                quiet = now - self._last_event >= self.debounce
+                overdue = now - self._first_event >= self.max_delay
+                if not (quiet or overdue):
+                    continue
+                paths = self._pending
+                self._pending = set()
+                self._first_event = self._last_event = None
+
+            changed = self._resolve(paths)
+            if not changed:
+                continue
+            for callback in self.subscribers:
+                try:
+                    callback(changed)
+                except Exception as e:
+                    self.logger.error(f"Error in file watcher subscriber: {e}")
+
+    def start(self) -> bool:
+        """Start watching; returns False if inotify watching is unavailable"""
+        try:
+            from watchdog.observers import Observer
+            from watchdog.events import FileSystemEventHandler
+        except ImportError:
+            self.logger.warning("watchdog not available, real-time file watching disabled")
+            self.available = False
+            return False
+
+        if not os.path.isdir(self.root):
+            self.logger.warning(f"Watch path {self.root} does not exist")
+            self.available = False
+            return False
+
+        watcher = self
+
+        class _Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                if event.event_type in ('created', 'modified', 'deleted', 'moved'):
+                    watcher._on_event(event)
+
+        self.build_index()
+        self.running = True
+        self._observer = Observer()
+        self._observer.schedule(_Handler(), self.root, recursive=True)
+        self._observer.start()
+        self._flush_thread = threading.Thread(target=self._flush_loop, daemon=True)
+        self._flush_thread.start()
+        self.logger.info(f"File watcher started on {self.root}")
+        return True
+
+    def stop(self):
+        """Stop watching"""
+        self.running = False
+        self._wakeup.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join(timeout=5)
+            self._observer = None
+        if self._flush_thread is not None:
+            self._flush_thread.join(timeout=5)
+            self._flush_thread = None
+
+    def files(self, suffix: Optional[str] = None) -> List[str]:
+        """List indexed files, optionally filtered by suffix"""
+        return list(self.signatures(suffix))
+
+    def signatures(self, suffix: Optional[str] = None) -> Dict[str, tuple]:
+        """Copy of the index, (size, mtime_ns) per file, optionally filtered by suffix"""
+        with self._index_lock:
+            if suffix is None:
+                return dict(self.index)
+            return {path: signature for path, signature in self.index.items() if path.endswith(suffix)}
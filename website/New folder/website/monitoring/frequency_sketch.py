@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# monitoring/frequency_sketch.py
+
+import os
+import json
+import math
+import time
+import struct
+import zlib
+import hashlib
+from array import array
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+
+SKETCH_MAGIC = b'KFSK'
+SKETCH_VERSION = 1
+# Fold the decay into the cells before the landmark scale factor overflows
+MAX_SCALE_EXPONENT = 30.0
+# Largest natural log a cell may reach when the landmark moves back (doubles overflow at ~709)
+MAX_CELL_EXPONENT = 600.0
+
+
+class DecayingCountMin:
+    """Count-min sketch whose counts decay exponentially with a half-life
+
+    Counts are stored relative to a landmark time, so decay costs nothing
+    per update: an add at time t adds exp(lambda * (t - landmark)) and a
+    query scales the stored minimum back down. Memory is width * depth
+    floats regardless of how many distinct keys are seen. Updates are
+    conservative (only the smallest cells grow), which keeps the
+    overestimate of colliding keys low.
+    """
+
+    def __init__(self, width: int = 16384, depth: int = 4, half_life: float = 60.0,
+                 landmark: Optional[float] = None, cells: Optional[bytes] = None):
+        self.width = width
+        self.depth = depth
+        self.half_life = half_life
+        self.decay = math.log(2) / half_life
+        self.landmark = time.time() if landmark is None else landmark
+        self.cells = array('d')
+        if cells:
+            self.cells.frombytes(cells)
+        else:
+            self.cells.extend([0.0] * (width * depth))
+
+    def _indexes(self, key: str) -> List[int]:
+        digest = hashlib.blake2b(key.encode('utf-8', 'ignore'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'big')
+        second = int.from_bytes(digest[8:], 'big') | 1
+        return [row * self.width + (first + row * second) % self.width for row in range(self.depth)]
+
+    def _rescale(self, now: float):
+        """Move the landmark to now, decaying (or, moving back, growing) every cell once"""
+        factor = math.exp(-self.decay * (now - self.landmark))
+        for i in range(len(self.cells)):
+            self.cells[i] *= factor
+        self.landmark = now
+
+    def add(self, key: str, now: float, count: float = 1.0) -> float:
+        """Count a key at time `now`; returns its decayed estimate afterwards"""
+        exponent = self.decay * (now - self.landmark)
+        if exponent > MAX_SCALE_EXPONENT:
+            self._rescale(now)
+            exponent = 0.0
+        elif exponent < -MAX_SCALE_EXPONENT:
+            # Far older than the landmark, as when a log is replayed into a
+            # new sketch; exp(exponent) would underflow to 0, so the landmark
+            # moves back to the event instead
+            peak = max(self.cells)
+            if peak > 0.0 and math.log(peak) - exponent > MAX_CELL_EXPONENT:
+                # Decayed to nothing next to the counts the sketch holds
+                return count
+            if -exponent > MAX_CELL_EXPONENT:
+                # Whatever is stored is too small to matter at that time
+                self.cells = array('d', bytes(len(self.cells) * self.cells.itemsize))
+                self.landmark = now
+            else:
+                self._rescale(now)
+            exponent = 0.0
+        scale = math.exp(exponent)
+        indexes = self._indexes(key)
+        target = min(self.cells[i] for i in indexes) + count * scale
+        for i in indexes:
+            if self.cells[i] < target:
+                self.cells[i] = target
+        return target / scale
+
+    def estimate(self, key: str, now: float) -> float:
+        """Decayed count of a key at time `now` (never an underestimate)"""
+        stored = min(self.cells[i] for i in self._indexes(key))
+        return stored * math.exp(-self.decay * (now - self.landmark))
+
+
+class FrequencyTracker:
+    """Decayed per-IP, per-path and per-(IP, path) request frequencies
+
+    Answers "is this IP or path hot right now" in constant time and
+    constant memory, however many distinct IPs show up, and persists the
+    sketches so the counts carry over between runs.
+    """
+
+    KINDS = ('ip', 'path', 'ip_path')
+
+    def __init__(self, state_file: str, width: int = 16384, depth: int = 4, half_life: float = 60.0):
+        self.state_file = state_file
+        self.width = width
+        self.depth = depth
+        self.half_life = half_life
+        self.sketches = {kind: DecayingCountMin(width, depth, half_life) for kind in self.KINDS}
+        self.last_seen = None
+
+    @staticmethod
+    def _key(kind: str, event: Dict[str, Any]) -> str:
+        if kind == 'ip':
+            return event['ip']
+        if kind == 'path':
+            return event['route']
+        return f"{event['ip']} {event['route']}"
+
+    def add_event(self, event: Dict[str, Any], now: float) -> Dict[str, float]:
+        """Count one access log event; returns the decayed estimate per kind"""
+        if self.last_seen is None or now > self.last_seen:
+            self.last_seen = now
+        return {kind: sketch.add(self._key(kind, event), now) for kind, sketch in self.sketches.items()}
+
+    def estimate(self, kind: str, key: str, now: Optional[float] = None) -> float:
+        """Decayed request count of an IP, path or 'IP path' pair"""
+        if now is None:
+            now = self.last_seen or time.time()
+        return self.sketches[kind].estimate(key, now)
+
+    def is_hot(self, kind: str, key: str, threshold: float, now: Optional[float] = None) -> bool:
+        """Whether a key's decayed count is at or above a threshold"""
+        return self.estimate(kind, key, now) >= threshold
+
+    def to_bytes(self) -> bytes:
+        """Serialize the sketches"""
+        document = {
+            'width': self.width,
+            'depth': self.depth,
+            'half_life': self.half_life,
+            'last_seen': self.last_seen,
+            'saved': datetime.now().isoformat(),
+            'landmarks': {kind: sketch.landmark for kind, sketch in self.sketches.items()}
+        }
+        encoded = json.dumps(document, separators=(',', ':')).encode('utf-8')
+        body = [struct.pack('>I', len(encoded)), encoded]
+        for kind in self.KINDS:
+            blob = self.sketches[kind].cells.tobytes()
+            body.append(struct.pack('>I', len(blob)))
+            body.append(blob)
+        return SKETCH_MAGIC + struct.pack('>B', SKETCH_VERSION) + zlib.compress(b''.join(body), 6)
+
+    def load(self) -> bool:
+        """Load persisted sketches; False if there are none with this shape"""
+        if not os.path.exists(self.state_file):
+            return False
+        with open(self.state_file, 'rb') as f:
+            payload = f.read()
+        if payload[:4] != SKETCH_MAGIC or payload[4] != SKETCH_VERSION:
+            return False
+        body = zlib.decompress(payload[5:])
+        (doc_length,) = struct.unpack_from('>I', body, 0)
+        offset = 4
+        document = json.loads(body[offset:offset + doc_length].decode('utf-8'))
+        offset += doc_length
+        if (document['width'], document['depth'], document['half_life']) != (self.width, self.depth, self.half_life):
+            return False
+
+        for kind in self.KINDS:
+            (blob_length,) = struct.unpack_from('>I', body, offset)
+            offset += 4
+            self.sketches[kind] = DecayingCountMin(
+                self.width, self.depth, self.half_life,
+                landmark=document['landmarks'][kind],
+                cells=body[offset:offset + blob_length]
+            )
+            offset += blob_length
+        self.last_seen = document.get('last_seen')
+        return True
+
+    def save(self):
+        """Write the sketches atomically"""
+        os.makedirs(os.path.dirname(self.state_file) or '.', exist_ok=True)
+        temp_file = f"{self.state_file}.tmp"
+        with open(temp_file, 'wb') as f:
+            f.write(self.to_bytes())
+        os.replace(temp_file, self.state_file)
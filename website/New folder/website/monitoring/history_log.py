@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# monitoring/history_log.py
+
+import os
+import re
+import json
+import time
+import threading
+from collections import deque
+from typing import Dict, List, Any, Optional, Iterator, Tuple
+
+SEGMENT_BYTES = 4 * 1024 * 1024
+MAX_LOG_BYTES = 64 * 1024 * 1024
+RETENTION = 7 * 86400
+
+
+class SegmentLog:
+    """Append-only JSON-lines history split into size-bounded segments
+
+    Records go to the newest segment until it reaches `segment_bytes`,
+    then a new one is started. Whenever that happens, whole closed
+    segments are deleted while the log exceeds `max_bytes` or a segment's
+    last write is older than `retention` seconds, so disk use stays within
+    about max_bytes + segment_bytes and pruning never rewrites a file.
+    """
+
+    def __init__(self, directory: str, name: str, segment_bytes: int = SEGMENT_BYTES,
+                 max_bytes: int = MAX_LOG_BYTES, retention: float = RETENTION):
+        self.directory = directory
+        self.name = name
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes
+        self.retention = retention
+        self._pattern = re.compile(rf'^{re.escape(name)}-(\d+)\.jsonl$')
+        self._lock = threading.Lock()
+        self._file = None
+        self._size = 0
+        os.makedirs(directory, exist_ok=True)
+        segments = self.segments()
+        self._sequence = self._sequence_of(segments[-1]) if segments else 0
+
+    def _sequence_of(self, path: str) -> int:
+        return int(self._pattern.match(os.path.basename(path)).group(1))
+
+    def _segment_path(self, sequence: int) -> str:
+        return os.path.join(self.directory, f"{self.name}-{sequence:08d}.jsonl")
+
+    def segments(self) -> List[str]:
+        """Segment files, oldest first"""
+        try:
+            names = [name for name in os.listdir(self.directory) if self._pattern.match(name)]
+        except OSError:
+            return []
+        return [os.path.join(self.directory, name) for name in sorted(names)]
+
+    def _open(self):
+        path = self._segment_path(self._sequence)
+        self._file = open(path, 'ab')
+        self._size = self._file.tell()
+
+    def append(self, record: Dict[str, Any]):
+        """Append one record"""
+        line = (json.dumps(record, default=str, separators=(',', ':')) + '\n').encode('utf-8')
+        with self._lock:
+            if self._file is None:
+                self._open()
+            if self._size and self._size + len(line) > self.segment_bytes:
+                self._file.close()
+                self._sequence += 1
+                self._open()
+                self._prune()
+            self._file.write(line)
+            self._file.flush()
+            self._size += len(line)
+
+    def _prune(self):
+        """Drop the oldest closed segments beyond the size or age limit"""
+        closed = self.segments()[:-1]
+        sizes = {}
+        for path in closed:
+            try:
+                sizes[path] = os.stat(path)
+            except OSError:
+                continue
+        total = sum(file_stat.st_size for file_stat in sizes.values()) + self._size
+        cutoff = time.time() - self.retention
+        for path, file_stat in sizes.items():
+            if total <= self.max_bytes and file_stat.st_mtime >= cutoff:
+                break
+            try:
+                os.remove(path)
+                total -= file_stat.st_size
+            except OSError:
+                continue
+
+    def iter_records(self) -> Iterator[Dict[str, Any]]:
+        """Every retained record, oldest first"""
+        for path in self.segments():
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        try:
+                            yield json.loads(line)
+                        except ValueError:
+                            # A torn last line from a crash mid-write
+                            continue
+            except OSError:
+                continue
+
+    def close(self):
+        """Close the current segment"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class RecentHistory:
+    """Fixed-capacity ring of the newest items, spilling everything to a log
+
+    Memory stays flat however long the process runs: the ring only holds
+    the last `capacity` items, and the full history lives in the optional
+    SegmentLog on disk.
+    """
+
+    def __init__(self, capacity: int, log: Optional[SegmentLog] = None):
+        self.items = deque(maxlen=capacity)
+        self.log = log
+        self.total = 0
+        self.spill_errors = 0
+        self._lock = threading.Lock()
+
+    def append(self, item: Dict[str, Any]):
+        with self._lock:
+            self.items.append(item)
+            self.total += 1
+        if self.log is not None:
+            try:
+                self.log.append(item)
+            except OSError:
+                # Keep the item in memory even when the disk is full
+                self.spill_errors += 1
+
+    def recent(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """The newest items, oldest first"""
+        items = list(self.items)
+        return items if limit is None else items[-limit:]
+
+    def since(self, total: int) -> Tuple[List[Dict[str, Any]], int]:
+        """Items appended after the first `total` that are still in the ring, and the new total"""
+        with self._lock:
+            new = min(self.total - total, len(self.items))
+            return (list(self.items)[-new:] if new > 0 else []), self.total
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(list(self.items))
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# monitoring/ipc.py
+
+import os
+import sys
+import json
+import errno
+import socket
+import logging
+import threading
+import socketserver
+from typing import Dict, Any, Optional, Callable
+
+DEFAULT_SOCKET = os.getenv('MONITOR_SOCKET', '/app/data/monitor.sock')
+
+
+class QueryError(Exception):
+    """A query failed, or no monitor is listening"""
+
+
+class _QueryHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        # One JSON request per line; the connection may carry many
+        for line in self.rfile:
+            self.wfile.write(self.server.query_server.dispatch(line))
+            self.wfile.flush()
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def _socket_in_use(path: str, timeout: float = 0.5) -> bool:
+    """Whether something listens on the socket at `path`
+
+    Only a refused connection proves the socket is stale; a listener too
+    busy to accept within the timeout still owns it.
+    """
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    probe.settimeout(timeout)
+    try:
+        probe.connect(path)
+    except (ConnectionRefusedError, FileNotFoundError):
+        return False
+    except OSError as e:
+        return e.errno != errno.ECONNREFUSED
+    finally:
+        probe.close()
+    return True
+
+
+class QueryServer:
+    """Local query API of a long-running monitor over a Unix-domain socket
+
+    A request is one JSON line, {"query": name, "args": {...}}, answered
+    with one JSON line, {"ok": true, "result": ...} or {"ok": false,
+    "error": ...}. Handlers answer from the monitor's in-memory state, so
+    a query never re-runs a check. The socket is only accessible to the
+    user the monitor runs as.
+    """
+
+    def __init__(self, path: str = DEFAULT_SOCKET, logger: Optional[logging.Logger] = None):
+        self.path = path
+        self.logger = logger or logging.getLogger('ipc')
+        self.handlers = {'queries': lambda: sorted(self.handlers)}
+        self._server = None
+        self._thread = None
+
+    def register(self, name: str, handler: Callable[..., Any]):
+        """Answer queries named `name` with handler(**args)"""
+        self.handlers[name] = handler
+
+    def dispatch(self, line: bytes) -> bytes:
+        try:
+            request = json.loads(line)
+            handler = self.handlers.get(request.get('query'))
+            if handler is None:
+                response = {'ok': False, 'error': f"Unknown query: {request.get('query')}"}
+            else:
+                response = {'ok': True, 'result': handler(**request.get('args', {}))}
+        except Exception as e:
+            response = {'ok': False, 'error': str(e)}
+        return (json.dumps(response, default=str) + '\n').encode('utf-8')
+
+    def start(self) -> bool:
+        """Listen in the background; False if another monitor owns the socket"""
+        if os.path.exists(self.path):
+            if _socket_in_use(self.path):
+                self.logger.warning(f"Query socket {self.path} is in use by another monitor")
+                return False
+            # Left behind by a monitor that did not shut down cleanly
+            os.remove(self.path)
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        # Create the socket as 0600 rather than chmod it after bind, which
+        # leaves a window where other users may connect
+        umask = os.umask(0o177)
+        try:
+            self._server = _UnixServer(self.path, _QueryHandler)
+        except OSError as e:
+            self.logger.warning(f"Query socket unavailable: {e}")
+            return False
+        finally:
+            os.umask(umask)
+        self._server.query_server = self
+        self._thread = threading.Thread(target=self._server.serve_forever, name='query-server', daemon=True)
+        self._thread.start()
+        self.logger.info(f"Answering queries on {self.path}")
+        return True
+
+    def stop(self):
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._server = None
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+class QueryClient:
+    """Connection to a monitor's query socket, reusable for many queries"""
+
+    def __init__(self, path: str = DEFAULT_SOCKET, timeout: float = 2.0):
+        self.path = path
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.settimeout(timeout)
+        try:
+            self._socket.connect(path)
+        except OSError as e:
+            self._socket.close()
+            raise QueryError(f"No monitor answering on {path}: {e}")
+        self._reader = self._socket.makefile('rb')
+
+    def query(self, name: str, **args) -> Any:
+        try:
+            self._socket.sendall((json.dumps({'query': name, 'args': args}) + '\n').encode('utf-8'))
+            line = self._reader.readline()
+        except OSError as e:
+            raise QueryError(f"Query {name} failed: {e}")
+        if not line:
+            raise QueryError(f"Monitor closed the connection during query {name}")
+        response = json.loads(line)
+        if not response['ok']:
+            raise QueryError(response['error'])
+        return response['result']
+
+    def close(self):
+        self._reader.close()
+        self._socket.close()
+
+
+def query(name: str, path: str = DEFAULT_SOCKET, timeout: float = 2.0, **args) -> Any:
+    """Run one query against a running monitor; raises QueryError if none answers"""
+    client = QueryClient(path, timeout)
+    try:
+        return client.query(name, **args)
+    finally:
+        client.close()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Query a running KOPMA monitor')
+    parser.add_argument('query', nargs='?', default='status', help='Query name (run "queries" to list them)')
+    parser.add_argument('args', nargs='*', help='Query arguments as key=value (values parsed as JSON if possible)')
+    parser.add_argument('--socket', default=DEFAULT_SOCKET, help='Query socket path')
+    args = parser.parse_args()
+
+    query_args = {}
+    for item in args.args:
+        key, _, value = item.partition('=')
+        try:
+            query_args[key] = json.loads(value)
+        except ValueError:
+            query_args[key] = value
+
+    try:
+        print(json.dumps(query(args.query, args.socket, **query_args), indent=2, default=str))
+    except QueryError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# monitoring/journal.py
+
+import os
+import re
+import json
+import time
+import threading
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Tuple
+
+SNAPSHOT_BYTES = 1024 * 1024
+SNAPSHOT_INTERVAL = 3600
+
+Cursor = Tuple[int, int]  # (generation, byte offset)
+
+
+class Journal:
+    """Append-only JSON-lines journal with periodic compacted snapshots
+
+    Each write appends only the new records, so persisting costs O(new
+    events) instead of rewriting the whole state. Once the journal passes
+    `snapshot_bytes` or `snapshot_interval` seconds, the caller's compacted
+    state is written to a snapshot (to a temp file, then renamed over the
+    old one, so it is never torn) and a new journal generation starts;
+    the snapshot names the generation that follows it, and older
+    generations are deleted. A crash mid-append leaves at most one partial
+    last line, which is cut off when the journal is reopened.
+    """
+
+    def __init__(self, directory: str, name: str = 'monitoring', snapshot_bytes: int = SNAPSHOT_BYTES,
+                 snapshot_interval: float = SNAPSHOT_INTERVAL):
+        self.directory = directory
+        self.name = name
+        self.snapshot_bytes = snapshot_bytes
+        self.snapshot_interval = snapshot_interval
+        self.snapshot_file = os.path.join(directory, f"{name}.snapshot.json")
+        self._lock = threading.Lock()
+        self._file = None
+        self._size = 0
+        os.makedirs(directory, exist_ok=True)
+
+        snapshot = read_snapshot(directory, name)
+        snapshot_generation = snapshot['generation'] if snapshot else 0
+        generations = journal_generations(directory, name)
+        self.generation = max(generations + [snapshot_generation])
+        self.last_snapshot = os.path.getmtime(self.snapshot_file) if snapshot else time.time()
+        for generation in generations:
+            if generation < snapshot_generation:
+                self._remove(generation)
+        self._open()
+
+    def _path(self, generation: int) -> str:
+        return journal_path(self.directory, self.name, generation)
+
+    def _remove(self, generation: int):
+        try:
+            os.remove(self._path(generation))
+        except OSError:
+            pass
+
+    def _open(self):
+        """Open the current generation, dropping a torn last line"""
+        path = self._path(self.generation)
+        self._file = open(path, 'a+b')
+        self._file.seek(0, os.SEEK_END)
+        size = self._file.tell()
+        if size:
+            # Find the end of the last complete line
+            tail = min(size, 65536)
+            while True:
+                self._file.seek(size - tail)
+                end = self._file.read(tail).rfind(b'\n')
+                if end >= 0 or tail == size:
+                    break
+                tail = min(size, tail * 2)
+            complete = size - tail + end + 1 if end >= 0 else 0
+            if complete != size:
+                self._file.truncate(complete)
+            size = complete
+        self._size = size
+
+    def append(self, records: List[Dict[str, Any]]) -> Cursor:
+        """Append records in one write; returns the cursor after them"""
+        if records:
+            payload = b''.join(
+                (json.dumps(record, default=str, separators=(',', ':')) + '\n').encode('utf-8')
+                for record in records
+            )
+            with self._lock:
+                self._file.write(payload)
+                self._file.flush()
+                self._size += len(payload)
+        return self.generation, self._size
+
+    def snapshot_due(self) -> bool:
+        """Whether the journal has grown or aged enough to compact"""
+        return self._size >= self.snapshot_bytes or \
+            (self._size > 0 and time.time() - self.last_snapshot >= self.snapshot_interval)
+
+    def snapshot(self, state: Dict[str, Any]):
+        """Compact: persist the full state and start a new journal generation"""
+        with self._lock:
+            previous = self.generation
+            self._file.close()
+            self.generation += 1
+            self._open()
+            temp_file = f"{self.snapshot_file}.tmp"
+            with open(temp_file, 'w') as f:
+                json.dump({
+                    'generation': self.generation,
+                    'created': datetime.now().isoformat(),
+                    'state': state
+                }, f, default=str, separators=(',', ':'))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_file, self.snapshot_file)
+            self._remove(previous)
+            self.last_snapshot = time.time()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def journal_path(directory: str, name: str, generation: int) -> str:
+    return os.path.join(directory, f"{name}.{generation:08d}.journal")
+
+
+def journal_generations(directory: str, name: str) -> List[int]:
+    """Journal generations on disk, oldest first"""
+    pattern = re.compile(rf'^{re.escape(name)}\.(\d+)\.journal$')
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return []
+    return sorted(int(match.group(1)) for match in map(pattern.match, names) if match)
+
+
+def read_snapshot(directory: str, name: str) -> Optional[Dict[str, Any]]:
+    """The latest snapshot, or None if there is none yet"""
+    try:
+        with open(os.path.join(directory, f"{name}.snapshot.json"), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def read_journal(directory: str, name: str = 'monitoring',
+                 cursor: Optional[Cursor] = None) -> Tuple[Optional[Dict[str, Any]], List[Dict[str, Any]], Cursor]:
+    """Read what was journaled after a cursor
+
+    Returns (snapshot, records, new cursor). Start with cursor=None, then
+    pass back the returned cursor to read only what was appended since.
+    The snapshot is returned when starting out, and again if the journal
+    was compacted past the cursor; the reader should then replace its
+    state with snapshot['state'] before applying the records.
+    """
+    snapshot = None
+    generations = journal_generations(directory, name)
+    if cursor is None or cursor[0] not in generations:
+        snapshot = read_snapshot(directory, name)
+        start = snapshot['generation'] if snapshot else (generations[0] if generations else 0)
+        cursor = (start, 0)
+
+    records = []
+    generation, offset = cursor
+    while True:
+        try:
+            with open(journal_path(directory, name, generation), 'rb') as f:
+                f.seek(offset)
+                data = f.read()
+        except OSError:
+            data = b''
+        # Only consume complete lines; a line being written is read next time
+        complete = data.rfind(b'\n') + 1
+        for line in data[:complete].splitlines():
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+        offset += complete
+        later = [later for later in generations if later > generation]
+        if complete < len(data) or not later:
+            break
+        # A crash between starting a generation and writing its snapshot
+        # can leave two live generations; continue into the next one
+        generation, offset = later[0], 0
+
+    return snapshot, records, (generation, offset)
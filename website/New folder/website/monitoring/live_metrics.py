@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# monitoring/live_metrics.py
+
+import os
+import time
+import struct
+import logging
+from datetime import datetime
+from multiprocessing import shared_memory, resource_tracker
+from typing import Dict, Any, Optional
+
+DEFAULT_NAME = os.getenv('LIVE_METRICS_NAME', 'kopma_live_metrics')
+MAGIC = b'KLM1'
+LAYOUT_VERSION = 1
+
+# magic, layout version, field count, writer pid, reserved, sequence
+HEADER = struct.Struct('<4sHHIIQ')
+SEQUENCE_OFFSET = 16
+SEQUENCE = struct.Struct('<Q')
+
+# Where each slot comes from in a collect_metrics() dict; 'd' for gauges, 'Q' for counters
+FIELDS = (
+    ('cpu.usage_percent', 'd'),
+    ('cpu.count', 'Q'),
+    ('load_average.1min', 'd'),
+    ('load_average.5min', 'd'),
+    ('load_average.15min', 'd'),
+    ('memory.usage_percent', 'd'),
+    ('memory.used', 'Q'),
+    ('memory.available', 'Q'),
+    ('memory.swap_percent', 'd'),
+    ('disk.usage_percent', 'd'),
+    ('disk.free', 'Q'),
+    ('disk.read_bytes', 'Q'),
+    ('disk.write_bytes', 'Q'),
+    ('network.bytes_sent', 'Q'),
+    ('network.bytes_recv', 'Q'),
+    ('network.connections', 'Q'),
+    ('processes.total_processes', 'Q'),
+    ('website.response_time', 'd'),
+    ('website.status', 'Q'),
+)
+# website.status is stored as its index here
+WEBSITE_STATUSES = ('unknown', 'online', 'error', 'offline')
+
+# Unix time of the sample, then the fields
+PAYLOAD = struct.Struct('<d' + ''.join(fmt for _, fmt in FIELDS))
+SEGMENT_SIZE = HEADER.size + PAYLOAD.size
+
+
+def _pack_values(metrics: Dict[str, Any]) -> tuple:
+    try:
+        sampled = datetime.fromisoformat(metrics['timestamp']).timestamp()
+    except (KeyError, TypeError, ValueError):
+        sampled = time.time()
+    values = [sampled]
+    for path, fmt in FIELDS:
+        section, key = path.split('.')
+        value = (metrics.get(section) or {}).get(key, 0)
+        if path == 'website.status':
+            value = WEBSITE_STATUSES.index(value) if value in WEBSITE_STATUSES else 0
+        values.append(float(value or 0) if fmt == 'd' else max(0, int(value or 0)))
+    return tuple(values)
+
+
+def _unpack_values(values: tuple) -> Dict[str, Any]:
+    metrics = {'timestamp': datetime.fromtimestamp(values[0]).isoformat()}
+    for (path, _), value in zip(FIELDS, values[1:]):
+        section, key = path.split('.')
+        if path == 'website.status':
+            value = WEBSITE_STATUSES[value] if value < len(WEBSITE_STATUSES) else 'unknown'
+        metrics.setdefault(section, {})[key] = value
+    return metrics
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class LiveMetricsWriter:
+    """Publishes the latest metrics sample to a shared-memory segment
+
+    The segment has a fixed layout (HEADER then PAYLOAD) and is guarded by
+    a seqlock: the sequence is made odd before the payload is written and
+    even again after, so readers copy the payload without locks, syscalls
+    or serialization and retry if the sequence moved under them. There
+    must be a single writer; a segment whose writer is still alive is left
+    alone.
+    """
+
+    def __init__(self, name: str = DEFAULT_NAME, logger: Optional[logging.Logger] = None):
+        self.name = name
+        self.logger = logger or logging.getLogger('live_metrics')
+        self.sequence = 0
+        self.writes = 0
+        self.segment = self._create()
+
+    def _create(self) -> shared_memory.SharedMemory:
+        try:
+            segment = shared_memory.SharedMemory(self.name, create=True, size=SEGMENT_SIZE)
+        except FileExistsError:
+            existing = shared_memory.SharedMemory(self.name)
+            magic, _, _, pid, _, _ = HEADER.unpack_from(existing.buf)
+            if magic == MAGIC and _pid_alive(pid):
+                existing.close()
+                raise RuntimeError(f"Live metrics segment {self.name} is written by process {pid}")
+            # Left behind by a writer that did not shut down cleanly
+            existing.close()
+            existing.unlink()
+            segment = shared_memory.SharedMemory(self.name, create=True, size=SEGMENT_SIZE)
+        HEADER.pack_into(segment.buf, 0, MAGIC, LAYOUT_VERSION, len(FIELDS), os.getpid(), 0, 0)
+        return segment
+
+    def write(self, metrics: Dict[str, Any]):
+        """Replace the published sample with `metrics` (a collect_metrics() dict)"""
+        if self.segment is None:
+            return
+        values = _pack_values(metrics)
+        buf = self.segment.buf
+        SEQUENCE.pack_into(buf, SEQUENCE_OFFSET, self.sequence + 1)
+        PAYLOAD.pack_into(buf, HEADER.size, *values)
+        self.sequence += 2
+        SEQUENCE.pack_into(buf, SEQUENCE_OFFSET, self.sequence)
+        self.writes += 1
+
+    def close(self):
+        if self.segment is None:
+            return
+        self.segment.close()
+        try:
+            self.segment.unlink()
+        except FileNotFoundError:
+            pass
+        self.segment = None
+
+
+class LiveMetricsReader:
+    """Reads consistent snapshots of the latest sample from a LiveMetricsWriter's segment"""
+
+    def __init__(self, name: str = DEFAULT_NAME):
+        self.name = name
+        self.segment = shared_memory.SharedMemory(name)
+        # Only the writer owns the segment; do not let this process's exit unlink it
+        resource_tracker.unregister(self.segment._name, 'shared_memory')
+        magic, version, fields, _, _, _ = HEADER.unpack_from(self.segment.buf)
+        if magic != MAGIC or version != LAYOUT_VERSION or fields != len(FIELDS):
+            self.segment.close()
+            raise ValueError(f"Segment {name} does not hold live metrics of layout {LAYOUT_VERSION}")
+
+    def read(self, retries: int = 100) -> Optional[Dict[str, Any]]:
+        """Latest sample, or None if nothing was written yet or the writer kept it busy"""
+        buf = self.segment.buf
+        for _ in range(retries):
+            before, = SEQUENCE.unpack_from(buf, SEQUENCE_OFFSET)
+            if before == 0:
+                return None
+            if before & 1:
+                continue
+            values = PAYLOAD.unpack_from(buf, HEADER.size)
+            after, = SEQUENCE.unpack_from(buf, SEQUENCE_OFFSET)
+            if before == after:
+                return _unpack_values(values)
+        return None
+
+    def writer_pid(self) -> int:
+        return HEADER.unpack_from(self.segment.buf)[3]
+
+    def close(self):
+        self.segment.close()
+
+
+def read_live_metrics(name: str = DEFAULT_NAME) -> Optional[Dict[str, Any]]:
+    """Latest published sample, or None when no monitor publishes one"""
+    try:
+        reader = LiveMetricsReader(name)
+    except (FileNotFoundError, ValueError):
+        return None
+    try:
+        return reader.read()
+    finally:
+        reader.close()
@@ -17,6 +17,8 @@ from collections import defaultdict, Counter
 import hashlib
 import secrets
 
+from logging_setup import configure_logger
+
 class LogAnalyzer:
     def __init__(self, config: Dict[str, Any]):
         self.config = config
@@ -28,22 +30,7 @@ class LogAnalyzer:
         
     def setup_logger(self) -> logging.Logger:
         """Setup logging configuration"""
-        logger = logging.getLogger('log_analyzer')
-        logger.setLevel(logging.INFO)
-        
-        # Console handler
-        console_handler = logging.StreamHandler()
-        console_handler.setLevel(logging.INFO)
-        
-        # Formatter
-        formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-        )
-        console_handler.setFormatter(formatter)
-        
-        logger.addHandler(console_handler)
-        
-        return logger
+        return configure_logger('advanced_log_analyzer')
     
     def initialize_patterns(self) -> Dict[str, List[Dict[str, Any]]]:
         """Initialize analysis patterns"""
@@ -10,6 +10,12 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional, Tuple
 from collections import defaultdict, Counter
 import hashlib
+import socket
+
+from log_summary import LogSummary, read_summary, write_summary, merge_summaries
+from log_follower import LogFollower, parse_access_line
+from alert_rules import RuleEngine, DEFAULT_ALERT_RULES
+from logging_setup import configure_logger
 
 class LogAnalyzer:
     def __init__(self, config: Dict[str, Any]):
@@ -18,21 +24,11 @@ class LogAnalyzer:
         self.analysis_interval = config.get('analysis_interval', 300)  # 5 minutes
         self.logger = self.setup_logger()
         self.patterns = self.setup_patterns()
+        self.alert_rules = config.get('alert_rules', DEFAULT_ALERT_RULES)
         
     def setup_logger(self) -> logging.Logger:
         """Setup logging configuration"""
-        logger = logging.getLogger('log_analyzer')
-        logger.setLevel(logging.INFO)
-        
-        # Create logs directory if it doesn't exist
-        os.makedirs('/app/logs', exist_ok=True)
-        
-        handler = logging.FileHandler('/app/logs/log_analyzer.log')
-        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-        handler.setFormatter(formatter)
-        logger.addHandler(handler)
-        
-        return logger
+        return configure_logger('log_analyzer', '/app/logs/log_analyzer.log', console_level=None)
         
     def setup_patterns(self) -> Dict[str, List[str]]:
         """Setup analysis patterns"""
@@ -389,6 +385,11 @@ class LogAnalyzer:
             
         return False
         
+    @staticmethod
+    def _count(value: Any) -> int:
+        """Count a collected field, which merged summaries already hold as an int"""
+        return value if isinstance(value, int) else len(value)
+        
     def generate_report(self, analysis_data: Dict[str, Any]) -> Dict[str, Any]:
         """Generate analysis report"""
         report = {
@@ -402,14 +403,14 @@ class LogAnalyzer:
         if 'nginx' in analysis_data:
             nginx_data = analysis_data['nginx']
             report['summary']['total_requests'] = nginx_data['total_requests']
-            report['summary']['unique_ips'] = len(nginx_data['unique_ips'])
-            report['summary']['suspicious_requests'] = len(nginx_data['suspicious_requests'])
-            report['summary']['error_requests'] = len(nginx_data['error_requests'])
+            report['summary']['unique_ips'] = self._count(nginx_data['unique_ips'])
+            report['summary']['suspicious_requests'] = self._count(nginx_data['suspicious_requests'])
+            report['summary']['error_requests'] = self._count(nginx_data['error_requests'])
             
         if 'security' in analysis_data:
             security_data = analysis_data['security']
             report['summary']['security_events'] = security_data['total_security_events']
-            report['summary']['blocked_ips'] = len(security_data['blocked_ips'])
+            report['summary']['blocked_ips'] = self._count(security_data['blocked_ips'])
             
         if 'performance' in analysis_data:
             performance_data = analysis_data['performance']
@@ -452,10 +453,8 @@ class LogAnalyzer:
             
         return report
         
-    def run_analysis(self) -> Dict[str, Any]:
-        """Run complete log analysis"""
-        self.logger.info("Starting log analysis...")
-        
+    def collect_analysis_data(self) -> Dict[str, Any]:
+        """Analyze every local log file"""
         analysis_data = {}
         
         # Analyze Nginx logs
@@ -482,6 +481,14 @@ class LogAnalyzer:
             analysis_data['performance'] = self.analyze_performance_logs(performance_log)
             self.logger.info(f"Performance logs analyzed: {analysis_data['performance']['total_performance_events']} events")
             
+        return analysis_data
+        
+    def run_analysis(self) -> Dict[str, Any]:
+        """Run complete log analysis"""
+        self.logger.info("Starting log analysis...")
+        
+        analysis_data = self.collect_analysis_data()
+        
         # Generate report
         report = self.generate_report(analysis_data)
         
@@ -491,16 +498,113 @@ class LogAnalyzer:
             'analysis_data': analysis_data,
             'report': report
         }
+        
+    def summarize(self, node: Optional[str] = None) -> LogSummary:
+        """Summarize local logs into a compact, mergeable node summary"""
+        node = node or self.config.get('node_name') or socket.gethostname()
+        self.logger.info(f"Summarizing logs for node {node}...")
+        
+        summary = LogSummary.from_analysis_data(
+            self.collect_analysis_data(),
+            node,
+            counter_capacity=self.config.get('summary_counter_capacity', 1000),
+            sample_capacity=self.config.get('summary_sample_capacity', 100)
+        )
+        
+        self.logger.info(f"Log summary created for node {node}")
+        return summary
+        
+    def merge_summaries(self, summary_files: List[str]) -> Dict[str, Any]:
+        """Merge node summaries into the same report run_analysis produces"""
+        self.logger.info(f"Merging {len(summary_files)} log summaries...")
+        
+        summaries = []
+        for summary_file in summary_files:
+            try:
+                summaries.append(read_summary(summary_file))
+            except Exception as e:
+                self.logger.error(f"Error reading log summary {summary_file}: {e}")
+                
+        merged = merge_summaries(summaries)
+        analysis_data = merged.to_analysis_data()
+        report = self.generate_report(analysis_data)
+        report['nodes'] = merged.nodes
+        
+        self.logger.info(f"Merged log summaries from {len(merged.nodes)} nodes")
+        
+        return {
+            'analysis_data': analysis_data,
+            'report': report
+        }
+        
+    def _evaluate_line(self, engine: RuleEngine, line: str) -> List[Dict[str, Any]]:
+        """Feed one access log line to the alert rules"""
+        event = parse_access_line(line)
+        if event is None:
+            return []
+        event['suspicious'] = self.is_suspicious_request(
+            event['uri'], event['method'], str(event['status']), event['user_agent']
+        )
+        return engine.process(event)
+        
+    def _raise_alerts(self, alerts: List[Dict[str, Any]], on_alert=None):
+        for alert in alerts:
+            self.logger.warning(f"Rule alert: {alert['message']}")
+            if on_alert:
+                on_alert(alert)
+        
+    def rule_consumer(self, on_alert=None):
+        """Callable evaluating alert rules over batches of access log lines
+        
+        For a log follower shared with other components (LogHub); an empty
+        batch is treated as a tick, so time-based rules still fire.
+        """
+        engine = RuleEngine(self.alert_rules, self.config.get('rule_eval_interval', 1.0))
+        
+        def consume(lines: List[str]):
+            if not lines:
+                self._raise_alerts(engine.tick(), on_alert)
+            for line in lines:
+                self._raise_alerts(self._evaluate_line(engine, line), on_alert)
+        
+        return consume
+        
+    def follow(self, log_file: str, on_alert=None, from_start: bool = False):
+        """Evaluate alert rules continuously over events streamed from an access log"""
+        engine = RuleEngine(self.alert_rules, self.config.get('rule_eval_interval', 1.0))
+        follower = LogFollower(log_file, self.config.get('follow_poll_interval', 0.5), from_start)
+        self.logger.info(f"Following {log_file} with {len(engine.rules)} alert rules")
+        
+        try:
+            for line in follower.follow():
+                if line is None:
+                    alerts = engine.tick()
+                else:
+                    alerts = self._evaluate_line(engine, line)
+                self._raise_alerts(alerts, on_alert)
+        finally:
+            follower.close()
 
 if __name__ == "__main__":
     import argparse
     
     parser = argparse.ArgumentParser(description='Log Analyzer for KOPMA UNNES Website')
+    parser.add_argument('command', nargs='?', default='analyze', choices=['analyze', 'summarize', 'merge', 'follow'],
+                        help='analyze local logs, summarize them for merging, merge node summaries, '
+                             'or follow the access log and evaluate alert rules continuously')
+    parser.add_argument('summaries', nargs='*', help='Summary files to merge')
     parser.add_argument('--config', help='Configuration file path')
     parser.add_argument('--log-file', help='Specific log file to analyze')
+    parser.add_argument('--node', help='Node name recorded in the summary')
     parser.add_argument('--output', help='Output file for analysis results')
+    parser.add_argument('--startup-profile', action='store_true', help='Report what starting this script spends on imports')
     args = parser.parse_args()
     
+    if args.startup_profile:
+        from startup_profile import print_startup_profile
+        print_startup_profile(__file__)
+        raise SystemExit(0)
+    
     # Configuration
     config = {
         'log_files': [
@@ -512,20 +616,37 @@ if __name__ == "__main__":
         'analysis_interval': 300
     }
     
+    if args.config and os.path.exists(args.config):
+        with open(args.config, 'r') as f:
+            config.update(json.load(f))
+    
     # Create analyzer instance
     analyzer = LogAnalyzer(config)
     
-    # Run analysis
-    results = analyzer.run_analysis()
-    
-    # Output results
-    if args.output:
-        with open(args.output, 'w') as f:
-            json.dump(results, f, indent=2)
-        print(f"Analysis results saved to: {args.output}")
+    if args.command == 'follow':
+        try:
+            analyzer.follow(args.log_file or '/var/log/nginx/access.log',
+                            on_alert=lambda alert: print(json.dumps(alert), flush=True))
+        except KeyboardInterrupt:
+            pass
+    elif args.command == 'summarize':
+        summary = analyzer.summarize(args.node)
+        output = args.output or f"{summary.nodes[0]}.klsm"
+        write_summary(summary, output)
+        print(f"Log summary saved to: {output} ({os.path.getsize(output)} bytes)")
     else:
-        print(json.dumps(results, indent=2))
-
-
-
-
+        if args.command == 'merge':
+            if not args.summaries:
+                parser.error('merge requires at least one summary file')
+            results = analyzer.merge_summaries(args.summaries)
+        else:
+            # Run analysis
+            results = analyzer.run_analysis()
+        
+        # Output results
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(results, f, indent=2, default=list)
+            print(f"Analysis results saved to: {args.output}")
+        else:
+            print(json.dumps(results, indent=2, default=list))
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# monitoring/log_follower.py
+
+import os
+import re
+import time
+from datetime import datetime
+from typing import Dict, Any, Optional, Iterator, List
+
+ACCESS_LINE_PATTERN = re.compile(
+    r'^(?P<ip>\S+) \S+ (?P<user>\S+) \[(?P<timestamp>[^\]]+)\] '
+    r'"(?P<method>[A-Z]+) (?P<uri>\S+)(?: (?P<protocol>[^"]*))?" '
+    r'(?P<status>\d{3}) (?P<size>\d+|-)'
+    r'(?: "(?P<referrer>[^"]*)" "(?P<user_agent>[^"]*)")?'
+    r'(?P<extra>.*)$'
+)
+# $request_time is either tagged (rt=0.123) or appended as the last field
+TAGGED_TIME_PATTERN = re.compile(r'\brt=(\d+(?:\.\d+)?)')
+TRAILING_TIME_PATTERN = re.compile(r'(\d+\.\d+)\s*$')
+
+
+def parse_log_time(timestamp: str) -> Optional[datetime]:
+    """Parse an Nginx $time_local value"""
+    try:
+        return datetime.strptime(timestamp, '%d/%b/%Y:%H:%M:%S %z')
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_access_line(line: str) -> Optional[Dict[str, Any]]:
+    """Parse an Nginx combined access log line into an event"""
+    match = ACCESS_LINE_PATTERN.match(line.rstrip('\n'))
+    if not match:
+        return None
+
+    uri = match.group('uri')
+    size = match.group('size')
+    event = {
+        'ip': match.group('ip'),
+        'timestamp': match.group('timestamp'),
+        'method': match.group('method'),
+        'uri': uri,
+        'route': uri.split('?', 1)[0],
+        'protocol': match.group('protocol') or '',
+        'status': int(match.group('status')),
+        'size': int(size) if size != '-' else 0,
+        'referrer': match.group('referrer') or '',
+        'user_agent': match.group('user_agent') or '',
+        'request_time': None
+    }
+
+    extra = match.group('extra')
+    if extra:
+        time_match = TAGGED_TIME_PATTERN.search(extra) or TRAILING_TIME_PATTERN.search(extra)
+        if time_match:
+            event['request_time'] = float(time_match.group(1))
+
+    return event
+
+
+class LogFollower:
+    """Follow a log file like `tail -F`, surviving rotation and truncation"""
+
+    def __init__(self, file_path: str, poll_interval: float = 0.5, from_start: bool = False):
+        self.file_path = file_path
+        self.poll_interval = poll_interval
+        self.from_start = from_start
+        self.offset = 0
+        self.inode = None
+        self._handle = None
+        self._partial = ''
+        self.running = False
+
+    def _open(self) -> bool:
+        """Open (or reopen) the file, positioning at the saved offset"""
+        try:
+            handle = open(self.file_path, 'r', encoding='utf-8', errors='ignore')
+        except OSError:
+            return False
+
+        stat = os.fstat(handle.fileno())
+        if self.inode is None:
+            if not self.from_start and not self.offset:
+                self.offset = stat.st_size
+            elif stat.st_size < self.offset:
+                self.offset = 0
+        elif stat.st_ino != self.inode or stat.st_size < self.offset:
+            # New file after rotation, or truncated in place
+            self.offset = 0
+
+        handle.seek(self.offset)
+        self._handle = handle
+        self.inode = stat.st_ino
+        return True
+
+    def _rotated(self) -> bool:
+        """Check whether the path now points at a different or shorter file"""
+        try:
+            stat = os.stat(self.file_path)
+        except OSError:
+            return False
+        return stat.st_ino != self.inode or stat.st_size < self.offset
+
+    def read_new_lines(self, max_bytes: Optional[int] = None) -> List[str]:
+        """Return complete lines appended since the last call
+
+        With `max_bytes` the call stops after about that much of the file,
+        and the next call continues from there.
+        """
+        if self._handle is None and not self._open():
+            return []
+
+        lines = []
+        read = 0
+        while max_bytes is None or read < max_bytes:
+            chunk = self._handle.read(65536)
+            if not chunk:
+                break
+            read += len(chunk)
+            self.offset = self._handle.tell()
+            data = self._partial + chunk
+            complete, _, self._partial = data.rpartition('\n')
+            if complete:
+                lines.extend(complete.split('\n'))
+
+        if not lines and self._rotated():
+            # Drain is complete; switch to the new file on the next call
+            self.close()
+            self.offset = 0
+            self._partial = ''
+
+        return lines
+
+    def follow(self) -> Iterator[Optional[str]]:
+        """Yield new lines as they arrive, and None on every idle poll"""
+        self.running = True
+        while self.running:
+            lines = self.read_new_lines()
+            for line in lines:
+                yield line
+            if not lines:
+                yield None
+                time.sleep(self.poll_interval)
+
+    def stop(self):
+        """Stop a running follow() loop"""
+        self.running = False
+
+    def close(self):
+        """Close the underlying file handle"""
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
@@ -0,0 +1,422 @@
+#!/usr/bin/env python3
+# monitoring/log_summary.py
+
+import json
+import math
+import random
+import struct
+import zlib
+import hashlib
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Iterable
+from collections import Counter
+
+SUMMARY_MAGIC = b'KLSM'
+SUMMARY_VERSION = 1
+
+
+class HyperLogLog:
+    """Mergeable distinct-count sketch (HyperLogLog)"""
+
+    def __init__(self, precision: int = 12, registers: Optional[bytes] = None):
+        self.precision = precision
+        self.size = 1 << precision
+        self.registers = bytearray(registers) if registers else bytearray(self.size)
+
+    def add(self, value: str):
+        """Add a value to the sketch"""
+        digest = hashlib.blake2b(value.encode('utf-8', 'ignore'), digest_size=8).digest()
+        hashed = int.from_bytes(digest, 'big')
+        index = hashed >> (64 - self.precision)
+        remainder = hashed & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - remainder.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: 'HyperLogLog'):
+        """Merge another sketch into this one"""
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog sketches with different precision")
+        self.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers))
+
+    def estimate(self) -> int:
+        """Estimate the number of distinct values"""
+        alpha = 0.7213 / (1 + 1.079 / self.size)
+        harmonic = sum(2.0 ** -register for register in self.registers)
+        estimate = alpha * self.size * self.size / harmonic
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * self.size and zeros:
+            estimate = self.size * math.log(self.size / zeros)
+        return int(round(estimate))
+
+
+class TopCounter:
+    """Counter capped to the most frequent keys, mergeable across nodes"""
+
+    def __init__(self, capacity: int = 1000, counts: Optional[Dict[str, int]] = None):
+        self.capacity = capacity
+        self.counts = Counter(counts or {})
+        self.total = sum(self.counts.values())
+
+    def add(self, key: str, count: int = 1):
+        """Count a key"""
+        self.counts[key] += count
+        self.total += count
+        if len(self.counts) > self.capacity * 2:
+            self._trim()
+
+    def update(self, counts: Dict[str, int]):
+        """Count many keys at once"""
+        for key, count in counts.items():
+            self.add(key, count)
+
+    def merge(self, other: 'TopCounter'):
+        """Merge another counter into this one"""
+        self.counts.update(other.counts)
+        self.total += other.total
+        self._trim()
+
+    def _trim(self):
+        """Drop the long tail beyond capacity"""
+        if len(self.counts) > self.capacity:
+            self.counts = Counter(dict(self.counts.most_common(self.capacity)))
+
+    def to_dict(self) -> Dict[str, Any]:
+        self._trim()
+        return {'capacity': self.capacity, 'total': self.total, 'counts': dict(self.counts)}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'TopCounter':
+        counter = cls(data.get('capacity', 1000), data.get('counts', {}))
+        counter.total = data.get('total', counter.total)
+        return counter
+
+
+class LogHistogram:
+    """Log-bucketed histogram for latency-like values"""
+
+    def __init__(self, growth: float = 1.1, minimum: float = 0.001):
+        self.growth = growth
+        self.minimum = minimum
+        self.buckets = Counter()
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def _bucket(self, value: float) -> int:
+        if value <= self.minimum:
+            return 0
+        return int(math.log(value / self.minimum, self.growth)) + 1
+
+    def _bucket_upper(self, bucket: int) -> float:
+        return self.minimum * (self.growth ** bucket)
+
+    def add(self, value: float):
+        """Record a value"""
+        self.buckets[self._bucket(value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other: 'LogHistogram'):
+        """Merge another histogram into this one"""
+        self.buckets.update(other.buckets)
+        self.count += other.count
+        self.sum += other.sum
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+        if other.max is not None:
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile from the bucket counts"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return min(self._bucket_upper(bucket), self.max)
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'growth': self.growth,
+            'minimum': self.minimum,
+            'buckets': {str(bucket): count for bucket, count in self.buckets.items()},
+            'count': self.count,
+            'sum': self.sum,
+            'min': self.min,
+            'max': self.max
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'LogHistogram':
+        histogram = cls(data.get('growth', 1.1), data.get('minimum', 0.001))
+        histogram.buckets = Counter({int(bucket): count for bucket, count in data.get('buckets', {}).items()})
+        histogram.count = data.get('count', 0)
+        histogram.sum = data.get('sum', 0.0)
+        histogram.min = data.get('min')
+        histogram.max = data.get('max')
+        return histogram
+
+
+class ReservoirSample:
+    """Capped uniform sample of records plus the exact number seen"""
+
+    def __init__(self, capacity: int = 100):
+        self.capacity = capacity
+        self.items = []
+        self.seen = 0
+
+    def add(self, item: Dict[str, Any]):
+        """Offer a record to the sample"""
+        self.seen += 1
+        if len(self.items) < self.capacity:
+            self.items.append(item)
+        else:
+            slot = random.randrange(self.seen)
+            if slot < self.capacity:
+                self.items[slot] = item
+
+    def merge(self, other: 'ReservoirSample'):
+        """Merge another sample, weighting each side by records seen"""
+        total = self.seen + other.seen
+        if not total:
+            return
+        pool_a = list(self.items)
+        pool_b = list(other.items)
+        random.shuffle(pool_a)
+        random.shuffle(pool_b)
+        merged = []
+        while len(merged) < self.capacity and (pool_a or pool_b):
+            take_a = pool_a and (not pool_b or random.random() < self.seen / total)
+            merged.append(pool_a.pop() if take_a else pool_b.pop())
+        self.items = merged
+        self.seen = total
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'capacity': self.capacity, 'seen': self.seen, 'items': self.items}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ReservoirSample':
+        sample = cls(data.get('capacity', 100))
+        sample.items = list(data.get('items', []))
+        sample.seen = data.get('seen', len(sample.items))
+        return sample
+
+
+# Section layout: which fields of LogAnalyzer analysis data are totals,
+# distinct counts, top-k counters, capped samples and histograms.
+SECTION_LAYOUT = {
+    'nginx': {
+        'totals': ['total_requests'],
+        'distinct': {'unique_ips': 'unique_ips'},
+        'counters': ['status_codes', 'user_agents', 'referrers', 'endpoints', 'top_ips', 'request_methods'],
+        'samples': ['suspicious_requests', 'error_requests'],
+        'histograms': ['response_times']
+    },
+    'error': {
+        'totals': ['total_errors'],
+        'distinct': {},
+        'counters': ['error_types', 'error_sources'],
+        'samples': ['critical_errors', 'recent_errors'],
+        'histograms': []
+    },
+    'security': {
+        'totals': ['total_security_events'],
+        'distinct': {'blocked_ips': 'blocked_ips'},
+        'counters': ['threat_types', 'blocked_ips', 'threat_severity'],
+        'samples': ['recent_threats'],
+        'histograms': []
+    },
+    'performance': {
+        'totals': ['total_performance_events'],
+        'distinct': {},
+        'counters': ['performance_issues'],
+        'samples': ['slow_queries', 'high_memory_usage', 'high_cpu_usage', 'disk_space_issues'],
+        'histograms': []
+    }
+}
+
+
+class LogSummary:
+    """Compact, mergeable summary of one or more nodes' log analysis"""
+
+    def __init__(self, nodes: Optional[List[str]] = None, counter_capacity: int = 1000,
+                 sample_capacity: int = 100):
+        self.nodes = list(nodes or [])
+        self.generated = datetime.now().isoformat()
+        self.counter_capacity = counter_capacity
+        self.sample_capacity = sample_capacity
+        self.sections = {}
+
+    def _new_section(self, name: str) -> Dict[str, Any]:
+        layout = SECTION_LAYOUT[name]
+        return {
+            'totals': {field: 0 for field in layout['totals']},
+            'distinct': {field: HyperLogLog() for field in layout['distinct']},
+            'counters': {field: TopCounter(self.counter_capacity) for field in layout['counters']},
+            'samples': {field: ReservoirSample(self.sample_capacity) for field in layout['samples']},
+            'histograms': {field: LogHistogram() for field in layout['histograms']}
+        }
+
+    @classmethod
+    def from_analysis_data(cls, analysis_data: Dict[str, Any], node: str,
+                           counter_capacity: int = 1000, sample_capacity: int = 100) -> 'LogSummary':
+        """Build a summary from LogAnalyzer analysis data"""
+        summary = cls([node], counter_capacity, sample_capacity)
+        for name, data in analysis_data.items():
+            if name not in SECTION_LAYOUT:
+                continue
+            layout = SECTION_LAYOUT[name]
+            section = summary._new_section(name)
+            for field in layout['totals']:
+                section['totals'][field] = data.get(field, 0)
+            for field, source in layout['distinct'].items():
+                for value in data.get(source, []):
+                    section['distinct'][field].add(str(value))
+            for field in layout['counters']:
+                section['counters'][field].update(data.get(field, {}))
+            for field in layout['samples']:
+                for item in data.get(field, []):
+                    section['samples'][field].add(item)
+            for field in layout['histograms']:
+                for value in data.get(field, []):
+                    section['histograms'][field].add(float(value))
+            summary.sections[name] = section
+        return summary
+
+    def merge(self, other: 'LogSummary'):
+        """Merge another node's summary into this one"""
+        self.nodes.extend(node for node in other.nodes if node not in self.nodes)
+        for name, other_section in other.sections.items():
+            if name not in self.sections:
+                self.sections[name] = self._new_section(name)
+            section = self.sections[name]
+            for field, value in other_section['totals'].items():
+                section['totals'][field] = section['totals'].get(field, 0) + value
+            for kind in ('distinct', 'counters', 'samples', 'histograms'):
+                for field, sketch in other_section[kind].items():
+                    section[kind][field].merge(sketch)
+
+    def to_analysis_data(self) -> Dict[str, Any]:
+        """Rebuild analysis data in the shape LogAnalyzer.generate_report expects"""
+        analysis_data = {}
+        for name, section in self.sections.items():
+            data = dict(section['totals'])
+            for field, counter in section['counters'].items():
+                data[field] = Counter(counter.counts)
+            for field, sample in section['samples'].items():
+                data[field] = sample.seen
+                data[f'{field}_sample'] = sample.items
+            for field, histogram in section['histograms'].items():
+                data[field] = {
+                    'count': histogram.count,
+                    'avg': histogram.sum / histogram.count if histogram.count else 0,
+                    'p50': histogram.quantile(0.5),
+                    'p95': histogram.quantile(0.95),
+                    'p99': histogram.quantile(0.99),
+                    'max': histogram.max or 0
+                }
+            # Distinct counts come from the sketch, not from the capped
+            # counter of the same name, which moves to <field>_top
+            for field, sketch in section['distinct'].items():
+                if field in section['counters']:
+                    data[f'{field}_top'] = data[field]
+                data[field] = sketch.estimate()
+            analysis_data[name] = data
+        return analysis_data
+
+    def to_bytes(self) -> bytes:
+        """Serialize to the compact binary summary format"""
+        blobs = []
+        document = {
+            'nodes': self.nodes,
+            'generated': self.generated,
+            'counter_capacity': self.counter_capacity,
+            'sample_capacity': self.sample_capacity,
+            'sections': {}
+        }
+        for name, section in self.sections.items():
+            distinct = {}
+            for field, sketch in section['distinct'].items():
+                distinct[field] = {'precision': sketch.precision, 'blob': len(blobs)}
+                blobs.append(bytes(sketch.registers))
+            document['sections'][name] = {
+                'totals': section['totals'],
+                'distinct': distinct,
+                'counters': {field: counter.to_dict() for field, counter in section['counters'].items()},
+                'samples': {field: sample.to_dict() for field, sample in section['samples'].items()},
+                'histograms': {field: histogram.to_dict() for field, histogram in section['histograms'].items()}
+            }
+        encoded = json.dumps(document, separators=(',', ':'), default=str).encode('utf-8')
+        body = [struct.pack('>I', len(encoded)), encoded, struct.pack('>H', len(blobs))]
+        for blob in blobs:
+            body.append(struct.pack('>I', len(blob)))
+            body.append(blob)
+        return SUMMARY_MAGIC + struct.pack('>B', SUMMARY_VERSION) + zlib.compress(b''.join(body), 9)
+
+    @classmethod
+    def from_bytes(cls, payload: bytes) -> 'LogSummary':
+        """Deserialize a binary summary"""
+        if payload[:4] != SUMMARY_MAGIC:
+            raise ValueError("Not a log summary file")
+        version = payload[4]
+        if version != SUMMARY_VERSION:
+            raise ValueError(f"Unsupported log summary version: {version}")
+        body = zlib.decompress(payload[5:])
+        offset = 0
+        (doc_length,) = struct.unpack_from('>I', body, offset)
+        offset += 4
+        document = json.loads(body[offset:offset + doc_length].decode('utf-8'))
+        offset += doc_length
+        (blob_count,) = struct.unpack_from('>H', body, offset)
+        offset += 2
+        blobs = []
+        for _ in range(blob_count):
+            (blob_length,) = struct.unpack_from('>I', body, offset)
+            offset += 4
+            blobs.append(body[offset:offset + blob_length])
+            offset += blob_length
+
+        summary = cls(document.get('nodes', []), document.get('counter_capacity', 1000),
+                      document.get('sample_capacity', 100))
+        summary.generated = document.get('generated', summary.generated)
+        for name, data in document.get('sections', {}).items():
+            summary.sections[name] = {
+                'totals': data.get('totals', {}),
+                'distinct': {
+                    field: HyperLogLog(info['precision'], blobs[info['blob']])
+                    for field, info in data.get('distinct', {}).items()
+                },
+                'counters': {field: TopCounter.from_dict(value) for field, value in data.get('counters', {}).items()},
+                'samples': {field: ReservoirSample.from_dict(value) for field, value in data.get('samples', {}).items()},
+                'histograms': {field: LogHistogram.from_dict(value) for field, value in data.get('histograms', {}).items()}
+            }
+        return summary
+
+
+def write_summary(summary: LogSummary, file_path: str):
+    """Write a summary file"""
+    with open(file_path, 'wb') as f:
+        f.write(summary.to_bytes())
+
+
+def read_summary(file_path: str) -> LogSummary:
+    """Read a summary file"""
+    with open(file_path, 'rb') as f:
+        return LogSummary.from_bytes(f.read())
+
+
+def merge_summaries(summaries: Iterable[LogSummary]) -> LogSummary:
+    """Combine many node summaries into one"""
+    merged = None
+    for summary in summaries:
+        if merged is None:
+            merged = LogSummary([], summary.counter_capacity, summary.sample_capacity)
+        merged.merge(summary)
+    return merged if merged is not None else LogSummary()
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# monitoring/logging_setup.py
+
+import os
+import time
+import queue
+import atexit
+import logging
+import threading
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Any, Optional
+
+try:
+    from pythonjsonlogger import jsonlogger
+except ImportError:
+    jsonlogger = None
+
+# Records waiting for the writer thread; beyond this they are dropped, never waited on
+QUEUE_SIZE = 10000
+# Records let through per call site and window before the rest are counted instead
+REPEAT_BURST = 5
+REPEAT_WINDOW = 60.0
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+JSON_FORMAT = '%(asctime)s %(name)s %(levelname)s %(message)s'
+
+_queue = queue.Queue(QUEUE_SIZE)
+_targets = {}
+_handlers = []
+_listener = None
+_lock = threading.Lock()
+
+
+class _Router(logging.Handler):
+    """Writer-side handler passing each record to the handlers of the logger it was logged to"""
+
+    def handle(self, record: logging.LogRecord):
+        for handler in _targets.get(record.log_target, ()):
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+
+class AggregatingQueueHandler(QueueHandler):
+    """Queue records for the writer thread, folding repeats of one call site together
+
+    Only the first REPEAT_BURST records from a source line per window are
+    queued; the rest are counted, and reported as one "N similar messages
+    suppressed" record when the window ends. A full queue drops the record
+    rather than making the caller wait.
+    """
+
+    def __init__(self, target: str, burst: int = REPEAT_BURST, window: float = REPEAT_WINDOW):
+        super().__init__(_queue)
+        self.target = target
+        self.burst = burst
+        self.window = window
+        self.repeats = {}
+        self.suppressed = 0
+        self.dropped = 0
+        self._repeat_lock = threading.Lock()
+
+    def emit(self, record: logging.LogRecord):
+        key = (record.name, record.levelno, record.pathname, record.lineno)
+        now = time.monotonic()
+        summary = None
+        with self._repeat_lock:
+            state = self.repeats.get(key)
+            if state is None or now - state['since'] >= self.window:
+                if state is not None and state['suppressed']:
+                    summary = self._summary(state)
+                self.repeats[key] = {'since': now, 'count': 1, 'suppressed': 0, 'last': record}
+            elif state['count'] < self.burst:
+                state['count'] += 1
+            else:
+                state['suppressed'] += 1
+                state['last'] = record
+                self.suppressed += 1
+                return
+        if summary is not None:
+            super().emit(summary)
+        super().emit(record)
+
+    def _summary(self, state: Dict[str, Any]) -> logging.LogRecord:
+        last = state['last']
+        return logging.makeLogRecord({
+            'name': last.name,
+            'levelno': last.levelno,
+            'levelname': last.levelname,
+            'pathname': last.pathname,
+            'lineno': last.lineno,
+            'funcName': last.funcName,
+            'msg': f"{state['suppressed']} similar messages suppressed in the last "
+                   f"{min(self.window, time.monotonic() - state['since']):.0f}s, latest: {last.getMessage()}"
+        })
+
+    def flush_repeats(self):
+        """Report what is still being suppressed, e.g. before shutdown"""
+        with self._repeat_lock:
+            summaries = [self._summary(state) for state in self.repeats.values() if state['suppressed']]
+            self.repeats.clear()
+        for summary in summaries:
+            super().emit(summary)
+
+    def enqueue(self, record: logging.LogRecord):
+        record.log_target = self.target
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def _formatter(json_format: bool) -> logging.Formatter:
+    if json_format and jsonlogger is not None:
+        return jsonlogger.JsonFormatter(JSON_FORMAT)
+    return logging.Formatter(TEXT_FORMAT)
+
+
+def _start_listener():
+    global _listener
+    if _listener is None:
+        _listener = QueueListener(_queue, _Router())
+        _listener.start()
+
+
+def configure_logger(name: str, log_file: Optional[str] = None, level: int = logging.INFO,
+                     console_level: Optional[int] = logging.INFO) -> logging.Logger:
+    """Logger whose records are written by one background thread shared by every monitor
+
+    Log calls only put the record on a queue. The file gets JSON lines
+    (when python-json-logger is installed; LOG_FORMAT=text keeps the
+    plain format) and the console the plain format. Configuring a logger
+    again, as a restarted component does, keeps its existing handlers
+    instead of adding duplicates.
+    """
+    logger = logging.getLogger(name)
+    with _lock:
+        _start_listener()
+        if name in _targets:
+            return logger
+        logger.setLevel(level)
+        json_format = os.getenv('LOG_FORMAT', 'json') == 'json'
+        targets = []
+        if log_file:
+            os.makedirs(os.path.dirname(log_file) or '.', exist_ok=True)
+            file_handler = logging.FileHandler(log_file)
+            file_handler.setLevel(level)
+            file_handler.setFormatter(_formatter(json_format))
+            targets.append(file_handler)
+        if console_level is not None:
+            console_handler = logging.StreamHandler()
+            console_handler.setLevel(console_level)
+            console_handler.setFormatter(_formatter(False))
+            targets.append(console_handler)
+        _targets[name] = targets
+        handler = AggregatingQueueHandler(name)
+        _handlers.append(handler)
+        logger.addHandler(handler)
+    return logger
+
+
+def logging_statistics() -> Dict[str, Any]:
+    """Queue depth and records suppressed as repeats or dropped on a full queue"""
+    return {
+        'queued': _queue.qsize(),
+        'suppressed': sum(handler.suppressed for handler in _handlers),
+        'dropped': sum(handler.dropped for handler in _handlers)
+    }
+
+
+def stop_logging():
+    """Write out pending repeat summaries and queued records, then stop the writer thread"""
+    global _listener
+    for handler in list(_handlers):
+        handler.flush_repeats()
+    with _lock:
+        listener, _listener = _listener, None
+    if listener is not None:
+        listener.stop()
+        for targets in _targets.values():
+            for target in targets:
+                target.flush()
+
+
+atexit.register(stop_logging)
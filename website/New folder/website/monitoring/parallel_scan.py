@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+# monitoring/parallel_scan.py
+
+import os
+import math
+import heapq
+import queue
+import hashlib
+import logging
+import multiprocessing
+from typing import Dict, List, Any, Optional, Iterator, Tuple
+
+from byte_scanner import BytePatternSet, open_buffer, MMAP_THRESHOLD
+
+# Scans smaller than this per worker are done in-process; starting work on
+# other processes costs more than the regex work it would save
+MIN_FILES_PER_WORKER = 16
+# Nice increment of scan workers so nginx and PHP keep priority
+WORKER_NICE = 10
+
+# name -> (patterns, flags, mode); mode is 'search' (matched patterns) or
+# 'findall' (every match per pattern), as in BytePatternSet
+RulesetSpec = Dict[str, Tuple[List[str], int, str]]
+
+
+def available_cores() -> int:
+    """Cores this process may run on"""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def resolve_workers(cpu_limit: Optional[float] = None) -> int:
+    """Worker processes for a scan capped at `cpu_limit` cores
+
+    A fractional limit is rounded down (1.9 cores gives one worker), but
+    never below one worker. Without a limit one core is left free for the
+    web server.
+    """
+    cores = available_cores()
+    if cpu_limit is None:
+        return max(1, cores - 1)
+    # Down, not to nearest: each worker can keep a core busy, so rounding
+    # up would let the scan use more CPU than the limit allows
+    return max(1, min(cores, math.floor(cpu_limit)))
+
+
+def partition_by_size(files: List[Tuple[str, int]], shards: int) -> List[List[str]]:
+    """Split files into shards of near-equal total size
+
+    Largest files first, each to the currently lightest shard, so one huge
+    file does not leave a worker with a long tail of work.
+    """
+    shards = max(1, min(shards, len(files)))
+    heap = [(0, index) for index in range(shards)]
+    partitions = [[] for _ in range(shards)]
+    for path, size in sorted(files, key=lambda item: item[1], reverse=True):
+        total, index = heapq.heappop(heap)
+        partitions[index].append(path)
+        heapq.heappush(heap, (total + max(size, 1), index))
+    return [partition for partition in partitions if partition]
+
+
+def scan_content(path: str, matchers: Dict[str, Tuple[BytePatternSet, str]],
+                 mmap_threshold: int = MMAP_THRESHOLD) -> Tuple[str, Dict[str, Any]]:
+    """(sha256, raw findings per ruleset) of one file, from a single read"""
+    with open_buffer(path, mmap_threshold) as buffer:
+        content_hash = hashlib.sha256(buffer).hexdigest()
+        findings = {
+            name: matcher.search(buffer) if mode == 'search' else matcher.findall(buffer)
+            for name, (matcher, mode) in matchers.items()
+        }
+    return content_hash, findings
+
+
+def compile_rulesets(rulesets: RulesetSpec) -> Dict[str, Tuple[BytePatternSet, str]]:
+    return {
+        name: (BytePatternSet(patterns, flags), mode)
+        for name, (patterns, flags, mode) in rulesets.items()
+    }
+
+
+def _worker(rulesets: RulesetSpec, mmap_threshold: int, nice: int,
+            tasks: 'multiprocessing.Queue', results: 'multiprocessing.Queue'):
+    """Scan process: compile the rules once, then scan shards until told to stop"""
+    if nice:
+        try:
+            os.nice(nice)
+        except OSError:
+            pass
+    matchers = compile_rulesets(rulesets)
+    while True:
+        task = tasks.get()
+        if task is None:
+            return
+        shard_id, paths = task
+        for path in paths:
+            try:
+                content_hash, findings = scan_content(path, matchers, mmap_threshold)
+                results.put(('file', shard_id, path, content_hash, findings))
+            except Exception as e:
+                results.put(('error', shard_id, path, None, str(e)))
+        results.put(('done', shard_id, None, None, None))
+
+
+class ParallelScanner:
+    """Pattern scans spread over a pool of worker processes
+
+    Regex matching is CPU-bound, so threads do not help; files are split
+    into shards of near-equal total size and scanned by `workers`
+    processes, and per-file results stream back through a queue as soon
+    as each file is done. Workers compile the rules once and stay up
+    between scans. Only the rulesets (plain patterns and flags) cross the
+    process boundary; caching and result formatting stay with the caller.
+    """
+
+    def __init__(self, rulesets: RulesetSpec, workers: int = 1, mmap_threshold: int = MMAP_THRESHOLD,
+                 nice: int = WORKER_NICE, logger: Optional[logging.Logger] = None):
+        self.rulesets = rulesets
+        self.workers = max(1, workers)
+        self.mmap_threshold = mmap_threshold
+        self.nice = nice
+        self.logger = logger or logging.getLogger('parallel_scan')
+        self._matchers = None
+        self._processes = []
+        self._tasks = None
+        self._results = None
+        self._shard_id = 0
+
+    def _start(self):
+        # spawn: the caller may run threads, which do not survive a fork safely
+        context = multiprocessing.get_context('spawn')
+        self._tasks = context.Queue()
+        self._results = context.Queue()
+        self._processes = [
+            context.Process(
+                target=_worker,
+                args=(self.rulesets, self.mmap_threshold, self.nice, self._tasks, self._results),
+                name=f'scan-worker-{index}',
+                daemon=True
+            )
+            for index in range(self.workers)
+        ]
+        for process in self._processes:
+            process.start()
+
+    def _alive(self) -> bool:
+        return bool(self._processes) and all(process.is_alive() for process in self._processes)
+
+    def scan(self, files: List[Tuple[str, int]]) -> Iterator[Tuple[str, Optional[str], Any]]:
+        """Yield (path, content hash, raw findings per ruleset) as files finish
+
+        `files` is a list of (path, size). A file that could not be read
+        is yielded as (path, None, error message).
+        """
+        if not files:
+            return
+        if self.workers == 1 or len(files) < self.workers * MIN_FILES_PER_WORKER:
+            yield from self._scan_local(files)
+            return
+
+        if not self._alive():
+            self.close()
+            self._start()
+        pending = set()
+        # Several shards per worker, so a worker that finishes early picks up more
+        for paths in partition_by_size(files, self.workers * 4):
+            self._shard_id += 1
+            pending.add(self._shard_id)
+            self._tasks.put((self._shard_id, paths))
+
+        done = set()
+        try:
+            while pending:
+                try:
+                    kind, shard_id, path, content_hash, payload = self._results.get(timeout=5)
+                except queue.Empty:
+                    if self._alive():
+                        continue
+                    self.logger.error("Scan worker died; scanning the rest in-process")
+                    self.close()
+                    yield from self._scan_local([item for item in files if item[0] not in done])
+                    return
+                if shard_id not in pending:
+                    # Left over from a scan that was abandoned early
+                    continue
+                if kind == 'done':
+                    pending.discard(shard_id)
+                    continue
+                done.add(path)
+                yield path, (content_hash if kind == 'file' else None), payload
+        finally:
+            if pending:
+                # Abandoned early (e.g. at a deadline): drop shards not started yet
+                try:
+                    while True:
+                        self._tasks.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def _scan_local(self, files: List[Tuple[str, int]]) -> Iterator[Tuple[str, Optional[str], Any]]:
+        if self._matchers is None:
+            self._matchers = compile_rulesets(self.rulesets)
+        for path, _ in files:
+            try:
+                content_hash, findings = scan_content(path, self._matchers, self.mmap_threshold)
+                yield path, content_hash, findings
+            except Exception as e:
+                yield path, None, str(e)
+
+    def close(self):
+        """Stop the worker processes"""
+        for _ in self._processes:
+            try:
+                self._tasks.put(None)
+            except Exception:
+                break
+        for process in self._processes:
+            process.join(timeout=2)
+            if process.is_alive():
+                process.terminate()
+        self._processes = []
@@ -15,8 +15,11 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional, Tuple
 from collections import defaultdict, deque
 import threading
-import requests
-import subprocess
+
+from shared_resources import http_session
+from ipc import QueryServer, QueryError, DEFAULT_SOCKET, query
+from live_metrics import LiveMetricsWriter, DEFAULT_NAME as LIVE_METRICS_NAME
+from logging_setup import configure_logger
 
 class PerformanceMonitor:
     def __init__(self, config: Dict[str, Any]):
@@ -27,25 +30,11 @@ class PerformanceMonitor:
         self.thresholds = self.initialize_thresholds()
         self.monitoring = False
         self.monitor_thread = None
+        self.live_metrics = None
         
     def setup_logger(self) -> logging.Logger:
         """Setup logging configuration"""
-        logger = logging.getLogger('performance_monitor')
-        logger.setLevel(logging.INFO)
-        
-        # Console handler
-        console_handler = logging.StreamHandler()
-        console_handler.setLevel(logging.INFO)
-        
-        # Formatter
-        formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-        )
-        console_handler.setFormatter(formatter)
-        
-        logger.addHandler(console_handler)
-        
-        return logger
+        return configure_logger('performance_monitor')
     
     def initialize_thresholds(self) -> Dict[str, Dict[str, float]]:
         """Initialize performance thresholds"""
@@ -84,6 +73,7 @@ class PerformanceMonitor:
                 return
             
             self.monitoring = True
+            self.open_live_metrics()
             self.monitor_thread = threading.Thread(target=self.monitoring_loop, daemon=True)
             self.monitor_thread.start()
             
@@ -99,22 +89,29 @@ class PerformanceMonitor:
             self.monitoring = False
             if self.monitor_thread:
                 self.monitor_thread.join(timeout=5)
+            if self.live_metrics is not None:
+                self.live_metrics.close()
+                self.live_metrics = None
             
             self.logger.info("Performance monitoring stopped")
             
         except Exception as e:
             self.logger.error(f"Error stopping monitoring: {e}")
     
+    def open_live_metrics(self):
+        """Publish each sample to shared memory for other processes (see live_metrics.py)"""
+        if self.live_metrics is not None or not self.config.get('live_metrics', True):
+            return
+        try:
+            self.live_metrics = LiveMetricsWriter(self.config.get('live_metrics_name', LIVE_METRICS_NAME), self.logger)
+        except (OSError, RuntimeError) as e:
+            self.logger.warning(f"Live metrics segment unavailable: {e}")
+    
     def monitoring_loop(self):
         """Main monitoring loop"""
         while self.monitoring:
             try:
-                # Collect metrics
-                metrics = self.collect_metrics()
-                self.metrics.append(metrics)
-                
-                # Check for alerts
-                self.check_alerts(metrics)
+                self.sample()
                 
                 # Wait for next collection
                 time.sleep(self.config.get('collection_interval', 30))
@@ -123,6 +120,13 @@ class PerformanceMonitor:
                 self.logger.error(f"Error in monitoring loop: {e}")
                 time.sleep(60)  # Wait 1 minute before retrying
     
+    def sample(self) -> Dict[str, Any]:
+        """Collect one set of metrics, keep it and check it for alerts"""
+        metrics = self.collect_metrics()
+        self.metrics.append(metrics)
+        self.check_alerts(metrics)
+        return metrics
+    
     def collect_metrics(self) -> Dict[str, Any]:
         """Collect system performance metrics"""
         try:
@@ -136,6 +140,8 @@ class PerformanceMonitor:
                 'processes': self.get_process_metrics(),
                 'website': self.get_website_metrics()
             }
+            if self.live_metrics is not None:
+                self.live_metrics.write(metrics)
             
             return metrics
             
@@ -287,7 +293,7 @@ class PerformanceMonitor:
         """Check website response time"""
         try:
             start_time = time.time()
-            response = requests.get('http://localhost', timeout=10)
+            response = http_session().get('http://localhost', timeout=10)
             end_time = time.time()
             
             if response.status_code == 200:
@@ -302,7 +308,7 @@ class PerformanceMonitor:
     def check_website_status(self) -> str:
         """Check website status"""
         try:
-            response = requests.get('http://localhost', timeout=10)
+            response = http_session().get('http://localhost', timeout=10)
             if response.status_code == 200:
                 return 'online'
             else:
@@ -314,8 +320,10 @@ class PerformanceMonitor:
     
     def check_ssl_certificate(self) -> str:
         """Check SSL certificate status"""
+        import requests
+        
         try:
-            response = requests.get('https://localhost', timeout=10, verify=False)
+            response = http_session().get('https://localhost', timeout=10, verify=False)
             return 'valid'
             
         except requests.exceptions.SSLError:
@@ -429,6 +437,17 @@ class PerformanceMonitor:
             self.logger.error(f"Error getting performance summary: {e}")
             return {}
     
+    def metrics_window(self, seconds: Optional[float] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Collected metrics from the last `seconds`, at most `limit` of the newest, oldest first"""
+        metrics = list(self.metrics)
+        if seconds is not None:
+            # ISO timestamps of one format order like the times they stand for
+            cutoff = (datetime.now() - timedelta(seconds=seconds)).isoformat()
+            metrics = [m for m in metrics if m.get('timestamp', '') >= cutoff]
+        if limit is not None:
+            metrics = metrics[-limit:] if limit > 0 else []
+        return metrics
+    
     def generate_optimization_recommendations(self) -> List[str]:
         """Generate optimization recommendations"""
         try:
@@ -521,6 +540,7 @@ def main():
     parser.add_argument('--save', help='Save metrics to file')
     parser.add_argument('--load', help='Load metrics from file')
     parser.add_argument('--config', help='Configuration file')
+    parser.add_argument('--socket', help=f'Query socket of a running monitor (default: {DEFAULT_SOCKET})')
     args = parser.parse_args()
     
     # Load configuration
@@ -538,25 +558,52 @@ def main():
         with open(args.config, 'r') as f:
             config.update(json.load(f))
     
+    socket_path = args.socket or config.get('query_socket', DEFAULT_SOCKET)
+    
+    if args.status or args.summary:
+        # Ask the running monitor (standalone or under the supervisor) for what it has collected
+        try:
+            summary = query('performance', socket_path)
+        except QueryError as e:
+            print(f"No running monitor ({e}); collecting one sample locally", file=sys.stderr)
+            monitor = PerformanceMonitor(config)
+            monitor.metrics.append(monitor.collect_metrics())
+            summary = monitor.get_performance_summary()
+        if args.status:
+            print(f"Performance status: {summary}")
+        else:
+            print(json.dumps(summary, indent=2, default=str))
+        return
+    
     # Create performance monitor instance
     monitor = PerformanceMonitor(config)
     
     if args.start:
+        import signal
+        
+        # Keep running so the collected metrics can be queried
+        stopped = threading.Event()
+        signal.signal(signal.SIGINT, lambda signum, frame: stopped.set())
+        signal.signal(signal.SIGTERM, lambda signum, frame: stopped.set())
+        
+        server = QueryServer(socket_path, monitor.logger)
+        server.register('performance', monitor.get_performance_summary)
+        server.register('metrics', monitor.metrics_window)
+        server.start()
         monitor.start_monitoring()
         print("Performance monitoring started")
+        try:
+            while not stopped.is_set():
+                stopped.wait(1)
+        finally:
+            monitor.stop_monitoring()
+            server.stop()
+        print("Performance monitoring stopped")
         
     elif args.stop:
         monitor.stop_monitoring()
         print("Performance monitoring stopped")
         
-    elif args.status:
-        summary = monitor.get_performance_summary()
-        print(f"Performance status: {summary}")
-        
-    elif args.summary:
-        summary = monitor.get_performance_summary()
-        print(json.dumps(summary, indent=2))
-        
     elif args.recommendations:
         recommendations = monitor.generate_optimization_recommendations()
         print("Optimization recommendations:")
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# monitoring/scan_cache.py
+
+import os
+import json
+import sqlite3
+import hashlib
+import threading
+from typing import Dict, List, Any, Optional, Callable, Tuple
+
+from file_integrity import hash_file
+
+# How long a write waits for another connection's transaction before it is dropped
+BUSY_TIMEOUT_MS = 1000
+
+
+def ruleset_version(patterns: Any) -> str:
+    """Stable version string for a set of rules; changes whenever a rule does"""
+    return hashlib.sha256(json.dumps(patterns, sort_keys=True).encode()).hexdigest()[:16]
+
+
+class ScanCache:
+    """SQLite cache of (inode, size, mtime_ns) -> content hash -> findings per ruleset
+
+    Findings are keyed by content hash and ruleset name, and tagged with
+    the ruleset version. Editing one ruleset only misses the entries of
+    that ruleset; all other cached findings stay valid.
+
+    Several monitors may share the database file, so each file's writes
+    are committed as one short transaction. A database error (e.g. a lock
+    still held after BUSY_TIMEOUT_MS) never fails a scan: a lookup that
+    errors is a miss, so the file is scanned, and a write that errors is
+    dropped. Both are counted in get_statistics().
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self._db = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+        self._db.execute(f'PRAGMA busy_timeout={BUSY_TIMEOUT_MS}')
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS file_hashes ('
+            ' path TEXT PRIMARY KEY, inode INTEGER, size INTEGER, mtime_ns INTEGER, content_hash TEXT)'
+        )
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS findings ('
+            ' content_hash TEXT, ruleset TEXT, version TEXT, findings TEXT,'
+            ' PRIMARY KEY (content_hash, ruleset))'
+        )
+        self._db.commit()
+
+    def _query(self, sql: str, params: tuple) -> Optional[tuple]:
+        """First row of a read, or None if there is none or the database errored"""
+        with self._lock:
+            try:
+                return self._db.execute(sql, params).fetchone()
+            except sqlite3.Error:
+                self.errors += 1
+                return None
+
+    def _write(self, statements: List[Tuple[str, tuple]]):
+        """Run statements as one transaction; dropped if the database errors"""
+        with self._lock:
+            try:
+                with self._db:
+                    for sql, params in statements:
+                        self._db.execute(sql, params)
+            except sqlite3.Error:
+                self.errors += 1
+
+    def _hash_row(self, file_path: str) -> Optional[tuple]:
+        return self._query(
+            'SELECT inode, size, mtime_ns, content_hash FROM file_hashes WHERE path = ?', (file_path,)
+        )
+
+    @staticmethod
+    def _findings_rows(content_hash: str, rulesets: Dict[str, str],
+                       findings: Dict[str, Any]) -> List[Tuple[str, tuple]]:
+        return [
+            ('INSERT OR REPLACE INTO findings VALUES (?, ?, ?, ?)',
+             (content_hash, name, version, json.dumps(findings.get(name, []), default=list)))
+            for name, version in rulesets.items()
+        ]
+
+    def content_hash(self, file_path: str, file_stat: Optional[os.stat_result] = None) -> str:
+        """Content hash of a file, re-hashed only when its stat metadata changed"""
+        file_stat = file_stat or os.stat(file_path)
+        signature = (file_stat.st_ino, file_stat.st_size, file_stat.st_mtime_ns)
+        row = self._hash_row(file_path)
+        if row and tuple(row[:3]) == signature:
+            return row[3]
+
+        content_hash = hash_file(file_path)
+        self._write([('INSERT OR REPLACE INTO file_hashes VALUES (?, ?, ?, ?, ?)',
+                      (file_path, *signature, content_hash))])
+        return content_hash
+
+    def get_findings(self, content_hash: str, ruleset: str, version: str) -> Optional[Any]:
+        """Cached findings for content under a ruleset version, or None"""
+        row = self._query(
+            'SELECT version, findings FROM findings WHERE content_hash = ? AND ruleset = ?',
+            (content_hash, ruleset)
+        )
+        if row is None or row[0] != version:
+            return None
+        return json.loads(row[1])
+
+    def put_findings(self, content_hash: str, ruleset: str, version: str, findings: Any):
+        """Store findings for content under a ruleset version"""
+        self._write(self._findings_rows(content_hash, {ruleset: version}, {ruleset: findings}))
+
+    def scan(self, file_path: str, rulesets: Dict[str, str],
+             scan_missing: Callable[[List[str]], Dict[str, Any]],
+             file_stat: Optional[os.stat_result] = None) -> Tuple[str, Dict[str, Any]]:
+        """Return (content hash, findings per ruleset), scanning only for cache misses
+
+        `rulesets` maps ruleset names to their versions. `scan_missing` is
+        called with the names that are not cached and must return their
+        findings; an unchanged file with every ruleset cached is not read.
+        """
+        content_hash = self.content_hash(file_path, file_stat)
+        results = {}
+        missing = []
+        for name, version in rulesets.items():
+            cached = self.get_findings(content_hash, name, version)
+            if cached is None:
+                missing.append(name)
+            else:
+                results[name] = cached
+
+        if not missing:
+            self.hits += 1
+            return content_hash, results
+
+        self.misses += 1
+        scanned = scan_missing(missing)
+        for name in missing:
+            results[name] = scanned.get(name, [])
+        self._write(self._findings_rows(content_hash, {name: rulesets[name] for name in missing}, results))
+        return content_hash, results
+
+    def cached(self, file_path: str, rulesets: Dict[str, str],
+               file_stat: os.stat_result) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """(content hash, findings) if the file is unchanged and every ruleset is cached
+
+        Never reads the file, so the caller can send misses elsewhere to
+        be scanned (see record()).
+        """
+        signature = (file_stat.st_ino, file_stat.st_size, file_stat.st_mtime_ns)
+        row = self._hash_row(file_path)
+        if not row or tuple(row[:3]) != signature:
+            return None
+        results = {}
+        for name, version in rulesets.items():
+            cached = self.get_findings(row[3], name, version)
+            if cached is None:
+                return None
+            results[name] = cached
+        self.hits += 1
+        return row[3], results
+
+    def record(self, file_path: str, file_stat: os.stat_result, content_hash: str,
+               rulesets: Dict[str, str], findings: Dict[str, Any]):
+        """Store a scan done outside scan(): the file's hash and its findings per ruleset"""
+        self.misses += 1
+        self._write(
+            [('INSERT OR REPLACE INTO file_hashes VALUES (?, ?, ?, ?, ?)',
+              (file_path, file_stat.st_ino, file_stat.st_size, file_stat.st_mtime_ns, content_hash))]
+            + self._findings_rows(content_hash, rulesets, findings)
+        )
+
+    def forget(self, file_path: str):
+        """Drop the stat -> hash mapping for a removed file"""
+        self._write([('DELETE FROM file_hashes WHERE path = ?', (file_path,))])
+
+    def vacuum(self):
+        """Drop findings for content no tracked file has any more"""
+        self._write([(
+            'DELETE FROM findings WHERE content_hash NOT IN (SELECT content_hash FROM file_hashes)', ()
+        )])
+
+    def flush(self):
+        """Commit pending writes (each file's writes are already committed as they happen)"""
+        with self._lock:
+            try:
+                self._db.commit()
+            except sqlite3.Error:
+                self.errors += 1
+
+    def close(self):
+        """Commit and close the database"""
+        self.flush()
+        self._db.close()
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Hit/miss counters for the current process"""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'errors': self.errors,
+            'hit_rate': round(self.hits / total, 4) if total else 0.0
+        }
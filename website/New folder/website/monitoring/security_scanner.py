@@ -9,9 +9,13 @@ import hashlib
 import logging
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional, Tuple
-from pathlib import Path
-import subprocess
-import requests
+
+from file_watcher import FileWatcher
+from scan_cache import ScanCache, ruleset_version
+from byte_scanner import BytePatternSet, open_buffer, MMAP_THRESHOLD
+from parallel_scan import ParallelScanner, resolve_workers
+from tree_walker import walk_files
+from logging_setup import configure_logger
 
 class SecurityScanner:
     def __init__(self, config: Dict[str, Any]):
@@ -21,21 +25,19 @@ class SecurityScanner:
         self.logger = self.setup_logger()
         self.malware_patterns = self.setup_malware_patterns()
         self.vulnerability_patterns = self.setup_vulnerability_patterns()
+        self.suspicious_patterns = self.setup_suspicious_patterns()
+        self.rulesets = self.setup_rulesets()
+        self.cache = self.setup_cache()
+        self.parallel = ParallelScanner(
+            {name: (ruleset['patterns'], ruleset['flags'], 'findall') for name, ruleset in self.rulesets.items()},
+            workers=resolve_workers(config.get('cpu_limit')),
+            mmap_threshold=config.get('mmap_threshold', MMAP_THRESHOLD),
+            logger=self.logger
+        )
         
     def setup_logger(self) -> logging.Logger:
         """Setup logging configuration"""
-        logger = logging.getLogger('security_scanner')
-        logger.setLevel(logging.INFO)
-        
-        # Create logs directory if it doesn't exist
-        os.makedirs('/app/logs', exist_ok=True)
-        
-        handler = logging.FileHandler('/app/logs/security_scanner.log')
-        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-        handler.setFormatter(formatter)
-        logger.addHandler(handler)
-        
-        return logger
+        return configure_logger('security_scanner', '/app/logs/security_scanner.log', console_level=None)
         
     def setup_malware_patterns(self) -> Dict[str, List[str]]:
         """Setup malware detection patterns"""
@@ -208,8 +210,72 @@ class SecurityScanner:
             ]
         }
         
-    def scan_file(self, file_path: str) -> Dict[str, Any]:
-        """Scan individual file for security issues"""
+    def setup_suspicious_patterns(self) -> List[str]:
+        """Setup hardcoded-credential detection patterns"""
+        return [
+            r'password\s*=\s*[\"\\\'][^\"\\\']+[\"\\\']',
+            r'api_key\s*=\s*[\"\\\'][^\"\\\']+[\"\\\']',
+            r'secret\s*=\s*[\"\\\'][^\"\\\']+[\"\\\']',
+            r'token\s*=\s*[\"\\\'][^\"\\\']+[\"\\\']',
+            r'key\s*=\s*[\"\\\'][^\"\\\']+[\"\\\']',
+            r'pass\s*=\s*[\"\\\'][^\"\\\']+[\"\\\']',
+            r'pwd\s*=\s*[\"\\\'][^\"\\\']+[\"\\\']',
+            r'pwd\s*=\s*[\"\\\'][^\"\\\']+[\"\\\']'
+        ]
+        
+    def setup_rulesets(self) -> Dict[str, Dict[str, Any]]:
+        """Group patterns into independently versioned rulesets"""
+        rulesets = {}
+        for category, patterns in self.malware_patterns.items():
+            rulesets[f'security_scanner.malware.{category}'] = {
+                'result': 'malware_detected', 'category': category, 'patterns': patterns,
+                'flags': re.IGNORECASE | re.MULTILINE
+            }
+        for category, patterns in self.vulnerability_patterns.items():
+            rulesets[f'security_scanner.vulnerability.{category}'] = {
+                'result': 'vulnerabilities', 'category': category, 'patterns': patterns,
+                'flags': re.IGNORECASE | re.MULTILINE
+            }
+        rulesets['security_scanner.suspicious'] = {
+            'result': 'suspicious_patterns', 'category': None, 'patterns': self.suspicious_patterns,
+            'flags': re.IGNORECASE
+        }
+        for ruleset in rulesets.values():
+            ruleset['version'] = ruleset_version([ruleset['patterns'], ruleset['flags']])
+            ruleset['matcher'] = BytePatternSet(ruleset['patterns'], ruleset['flags'])
+        return rulesets
+        
+    def setup_cache(self) -> Optional[ScanCache]:
+        """Open the persistent scan-result cache"""
+        if not self.config.get('use_cache', True):
+            return None
+        try:
+            return ScanCache(self.config.get('cache_file', '/app/data/scan_cache.sqlite'))
+        except Exception as e:
+            self.logger.warning(f"Scan cache unavailable, scanning without it: {e}")
+            return None
+        
+    def format_findings(self, name: str, matches: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+        """Findings of one ruleset from its matches per pattern"""
+        ruleset = self.rulesets[name]
+        findings = []
+        for pattern, found in matches.items():
+            finding = {
+                'pattern': pattern,
+                'matches': found,
+                'count': len(found)
+            }
+            if ruleset['category']:
+                finding = {'category': ruleset['category'], **finding}
+            findings.append(finding)
+        return findings
+        
+    def scan_buffer(self, buffer, names: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """Run the named rulesets over raw file bytes (or an mmap of them)"""
+        return {name: self.format_findings(name, self.rulesets[name]['matcher'].findall(buffer)) for name in names}
+        
+    def file_result(self, file_path: str, stat: Optional[os.stat_result] = None) -> Dict[str, Any]:
+        """Empty scan result of a file, with its stat information filled in"""
         scan_results = {
             'file': file_path,
             'malware_detected': [],
@@ -221,67 +287,39 @@ class SecurityScanner:
             'file_permissions': '',
             'last_modified': ''
         }
+        if stat is not None:
+            scan_results['file_size'] = stat.st_size
+            scan_results['file_permissions'] = oct(stat.st_mode)[-3:]
+            scan_results['last_modified'] = datetime.fromtimestamp(stat.st_mtime).isoformat()
+        return scan_results
+        
+    def scan_file(self, file_path: str) -> Dict[str, Any]:
+        """Scan individual file for security issues"""
+        scan_results = self.file_result(file_path)
         
         try:
             # Get file information
             stat = os.stat(file_path)
-            scan_results['file_size'] = stat.st_size
-            scan_results['file_permissions'] = oct(stat.st_mode)[-3:]
-            scan_results['last_modified'] = datetime.fromtimestamp(stat.st_mtime).isoformat()
+            scan_results = self.file_result(file_path, stat)
             
-            # Calculate file hash
-            with open(file_path, 'rb') as f:
-                content = f.read()
-                scan_results['file_hash'] = hashlib.sha256(content).hexdigest()
-                
-            # Read file content
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
-                
-            # Check for malware patterns
-            for category, patterns in self.malware_patterns.items():
-                for pattern in patterns:
-                    matches = re.findall(pattern, content, re.IGNORECASE | re.MULTILINE)
-                    if matches:
-                        scan_results['malware_detected'].append({
-                            'category': category,
-                            'pattern': pattern,
-                            'matches': matches,
-                            'count': len(matches)
-                        })
-                        
-            # Check for vulnerability patterns
-            for category, patterns in self.vulnerability_patterns.items():
-                for pattern in patterns:
-                    matches = re.findall(pattern, content, re.IGNORECASE | re.MULTILINE)
-                    if matches:
-                        scan_results['vulnerabilities'].append({
-                            'category': category,
-                            'pattern': pattern,
-                            'matches': matches,
-                            'count': len(matches)
-                        })
-                        
-            # Check for suspicious patterns
-            suspicious_patterns = [
-                r'password\s*=\s*[\"\\\'][^\"\\\']+[\"\\\']',
-                r'api_key\s*=\s*[\"\\\'][^\"\\\']+[\"\\\']',
-                r'secret\s*=\s*[\"\\\'][^\"\\\']+[\"\\\']',
-                r'token\s*=\s*[\"\\\'][^\"\\\']+[\"\\\']',
-                r'key\s*=\s*[\"\\\'][^\"\\\']+[\"\\\']',
-                r'pass\s*=\s*[\"\\\'][^\"\\\']+[\"\\\']',
-                r'pwd\s*=\s*[\"\\\'][^\"\\\']+[\"\\\']',
-                r'pwd\s*=\s*[\"\\\'][^\"\\\']+[\"\\\']'
-            ]
+            mmap_threshold = self.config.get('mmap_threshold', MMAP_THRESHOLD)
             
-            for pattern in suspicious_patterns:
-                matches = re.findall(pattern, content, re.IGNORECASE)
-                if matches:
-                    scan_results['suspicious_patterns'].append({
-                        'pattern': pattern,
-                        'matches': matches,
-                        'count': len(matches)
-                    })
+            def scan_missing(names: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+                with open_buffer(file_path, mmap_threshold) as buffer:
+                    return self.scan_buffer(buffer, names)
+                    
+            versions = {name: ruleset['version'] for name, ruleset in self.rulesets.items()}
+            if self.cache is not None:
+                # Unchanged files with every ruleset cached are not read at all
+                scan_results['file_hash'], findings = self.cache.scan(file_path, versions, scan_missing, stat)
+            else:
+                # Hash and scan from the same buffer instead of reading twice
+                with open_buffer(file_path, mmap_threshold) as buffer:
+                    scan_results['file_hash'] = hashlib.sha256(buffer).hexdigest()
+                    findings = self.scan_buffer(buffer, list(versions))
+                
+            for name, ruleset in self.rulesets.items():
+                scan_results[ruleset['result']].extend(findings.get(name, []))
                     
         except Exception as e:
             self.logger.error(f"Error scanning file {file_path}: {e}")
@@ -289,7 +327,65 @@ class SecurityScanner:
             
         return scan_results
         
-    def scan_directory(self, directory: str) -> Dict[str, Any]:
+    def scan_files(self, files: List[Tuple[str, os.stat_result]], scan_results: Dict[str, Any],
+                   deadline: Optional[float] = None):
+        """Scan files into scan_results, cache misses spread over the worker processes
+        
+        Cached files are answered from the cache without being read; the
+        rest go to the process pool and are categorized as their results
+        stream back. With a deadline (a time.monotonic() value) the scan
+        stops early and scan_results['truncated'] is set.
+        """
+        versions = {name: ruleset['version'] for name, ruleset in self.rulesets.items()}
+        stats = {}
+        misses = []
+        for file_path, stat in files:
+            cached = self.cache.cached(file_path, versions, stat) if self.cache is not None else None
+            if cached is None:
+                stats[file_path] = stat
+                misses.append((file_path, stat.st_size))
+                continue
+            file_scan = self.file_result(file_path, stat)
+            file_scan['file_hash'], findings = cached
+            self.categorize(scan_results, file_scan, findings)
+        
+        results = self.parallel.scan(misses)
+        try:
+            for file_path, content_hash, raw in results:
+                file_scan = self.file_result(file_path, stats[file_path])
+                if content_hash is None:
+                    self.logger.error(f"Error scanning file {file_path}: {raw}")
+                    file_scan['error'] = raw
+                    self.categorize(scan_results, file_scan, {})
+                else:
+                    findings = {name: self.format_findings(name, raw.get(name, {})) for name in versions}
+                    if self.cache is not None:
+                        self.cache.record(file_path, stats[file_path], content_hash, versions, findings)
+                    file_scan['file_hash'] = content_hash
+                    self.categorize(scan_results, file_scan, findings)
+                if deadline is not None and time.monotonic() >= deadline:
+                    scan_results['truncated'] = True
+                    break
+        finally:
+            results.close()
+        
+    def categorize(self, scan_results: Dict[str, Any], file_scan: Dict[str, Any],
+                   findings: Dict[str, List[Dict[str, Any]]]):
+        """Add one file's findings to a directory or path scan"""
+        for name, ruleset in self.rulesets.items():
+            file_scan[ruleset['result']].extend(findings.get(name, []))
+        scan_results['scanned_files'] += 1
+        
+        if file_scan['malware_detected']:
+            scan_results['malware_files'].append(file_scan)
+            
+        if file_scan['vulnerabilities']:
+            scan_results['vulnerable_files'].append(file_scan)
+            
+        if file_scan['suspicious_patterns']:
+            scan_results['suspicious_files'].append(file_scan)
+        
+    def scan_directory(self, directory: str, deadline: Optional[float] = None) -> Dict[str, Any]:
         """Scan directory for security issues"""
         scan_results = {
             'directory': directory,
@@ -299,35 +395,23 @@ class SecurityScanner:
             'vulnerable_files': [],
             'suspicious_files': [],
             'scan_timestamp': datetime.now().isoformat(),
-            'scan_duration': 0
+            'scan_duration': 0,
+            'workers': self.parallel.workers
         }
         
         start_time = time.time()
         
         try:
-            # Walk through directory
-            for root, dirs, files in os.walk(directory):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    scan_results['total_files'] += 1
-                    
-                    # Skip certain file types
-                    if self.should_skip_file(file_path):
-                        continue
-                        
-                    # Scan file
-                    file_scan = self.scan_file(file_path)
-                    scan_results['scanned_files'] += 1
+            # One scandir walk yields each file with its stat
+            files = []
+            for file_path, stat in walk_files(directory):
+                scan_results['total_files'] += 1
+                
+                # Skip certain file types
+                if not self.should_skip_file(file_path):
+                    files.append((file_path, stat))
                     
-                    # Categorize results
-                    if file_scan['malware_detected']:
-                        scan_results['malware_files'].append(file_scan)
-                        
-                    if file_scan['vulnerabilities']:
-                        scan_results['vulnerable_files'].append(file_scan)
-                        
-                    if file_scan['suspicious_patterns']:
-                        scan_results['suspicious_files'].append(file_scan)
+            self.scan_files(files, scan_results, deadline)
                         
         except Exception as e:
             self.logger.error(f"Error scanning directory {directory}: {e}")
@@ -335,8 +419,72 @@ class SecurityScanner:
             
         scan_results['scan_duration'] = time.time() - start_time
         
+        if self.cache is not None:
+            if 'error' in scan_results or scan_results.get('truncated'):
+                self.cache.flush()
+            else:
+                # Every live file was just seen; findings for content that is gone can go
+                self.cache.vacuum()
+            scan_results['cache'] = self.cache.get_statistics()
+        
+        return scan_results
+        
+    def scan_paths(self, paths: List[str]) -> Dict[str, Any]:
+        """Scan only the given files, e.g. those pushed by the file watcher"""
+        scan_results = {
+            'paths': len(paths),
+            'total_files': 0,
+            'scanned_files': 0,
+            'malware_files': [],
+            'vulnerable_files': [],
+            'suspicious_files': [],
+            'scan_timestamp': datetime.now().isoformat(),
+            'scan_duration': 0
+        }
+        
+        start_time = time.time()
+        
+        files = []
+        for file_path in sorted(paths):
+            try:
+                stat = os.stat(file_path)
+            except FileNotFoundError:
+                if self.cache is not None:
+                    self.cache.forget(file_path)
+                continue
+            except OSError:
+                continue
+            if not os.path.isfile(file_path):
+                continue
+            scan_results['total_files'] += 1
+            
+            if not self.should_skip_file(file_path):
+                files.append((file_path, stat))
+                
+        try:
+            self.scan_files(files, scan_results)
+        except Exception as e:
+            self.logger.error(f"Error scanning changed paths: {e}")
+            scan_results['error'] = str(e)
+                
+        scan_results['scan_duration'] = time.time() - start_time
+        
+        if self.cache is not None:
+            self.cache.flush()
+        
         return scan_results
         
+    def watch(self, on_results) -> Optional[FileWatcher]:
+        """Scan files as soon as they change instead of re-walking the tree"""
+        watcher = FileWatcher(
+            self.website_path,
+            debounce=self.config.get('watch_debounce', 0.5),
+            max_delay=self.config.get('watch_max_delay', 5.0),
+            logger=self.logger
+        )
+        watcher.subscribe(lambda paths: on_results(self.scan_paths(list(paths))))
+        return watcher if watcher.start() else None
+        
     def should_skip_file(self, file_path: str) -> bool:
         """Check if file should be skipped during scan"""
         skip_extensions = ['.log', '.tmp', '.temp', '.cache', '.bak', '.old', '.backup']
@@ -482,19 +630,50 @@ if __name__ == "__main__":
     parser.add_argument('--config', help='Configuration file path')
     parser.add_argument('--website-path', help='Website path to scan')
     parser.add_argument('--output', help='Output file for scan results')
+    parser.add_argument('--watch', action='store_true', help='Keep running and scan files as they change')
+    parser.add_argument('--cache-file', help='Scan-result cache database')
+    parser.add_argument('--no-cache', action='store_true', help='Rescan every file, ignoring the scan-result cache')
+    parser.add_argument('--cpu-limit', type=float,
+                        help='Most CPU cores the scan may use (rounded down, at least 1; default: all but one)')
+    parser.add_argument('--startup-profile', action='store_true', help='Report what starting this script spends on imports')
     args = parser.parse_args()
     
+    if args.startup_profile:
+        from startup_profile import print_startup_profile
+        print_startup_profile(__file__)
+        raise SystemExit(0)
+    
     # Configuration
     config = {
         'website_path': args.website_path or '/usr/share/nginx/html',
-        'scan_interval': 3600
+        'scan_interval': 3600,
+        'cache_file': args.cache_file or '/app/data/scan_cache.sqlite',
+        'use_cache': not args.no_cache,
+        'cpu_limit': args.cpu_limit
     }
     
     # Create scanner instance
     scanner = SecurityScanner(config)
     
+    if args.watch:
+        def print_results(results: Dict[str, Any]):
+            if results['malware_files'] or results['vulnerable_files'] or results['suspicious_files']:
+                print(json.dumps(results, indent=2), flush=True)
+                
+        watcher = scanner.watch(print_results)
+        if watcher is None:
+            raise SystemExit(1)
+        print(f"Watching {scanner.website_path} for changes. Press Ctrl+C to stop.", flush=True)
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            watcher.stop()
+        raise SystemExit(0)
+    
     # Run security scan
     results = scanner.run_security_scan()
+    scanner.parallel.close()
     
     # Output results
     if args.output:
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# monitoring/shared_resources.py
+
+import base64
+import logging
+import threading
+from collections import deque
+from functools import lru_cache
+from typing import Dict, List, Any, Optional, Callable
+
+from log_follower import LogFollower
+
+KDF_ITERATIONS = 100000
+# Connections kept open per host; alerts, status checks and probes share them
+HTTP_POOL_SIZE = 10
+
+_session = None
+_session_lock = threading.Lock()
+
+
+@lru_cache(maxsize=16)
+def derive_fernet_key(password: str, salt: bytes, iterations: int = KDF_ITERATIONS) -> bytes:
+    """Fernet key from a password, derived with PBKDF2-SHA256
+
+    The derivation is deliberately slow (100k rounds), so the result is
+    kept for the life of the process: every component using the same
+    password and salt gets the key derived once.
+    """
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+
+    kdf = PBKDF2HMAC(
+        algorithm=hashes.SHA256(),
+        length=32,
+        salt=salt,
+        iterations=iterations,
+    )
+    return base64.urlsafe_b64encode(kdf.derive(password.encode()))
+
+
+@lru_cache(maxsize=16)
+def fernet(password: str, salt: bytes):
+    """Shared Fernet cipher for a password and salt"""
+    from cryptography.fernet import Fernet
+    return Fernet(derive_fernet_key(password, salt))
+
+
+def http_session():
+    """Process-wide HTTP session, so requests reuse pooled keep-alive connections
+
+    requests is only imported here, on first use, so scripts that never
+    send anything do not pay for importing it.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _session = session
+        return _session
+
+
+class LogHub:
+    """One follower of a log file fanning its new lines out to many consumers
+
+    Each poll() reads what was appended once and hands the batch to every
+    subscriber, so components analysing the same access log do not each
+    keep a file open and re-read it. An empty batch is delivered too, as a
+    tick for consumers with time-based state.
+    """
+
+    def __init__(self, path: str, poll_interval: float = 0.5, from_start: bool = False,
+                 logger: Optional[logging.Logger] = None):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.follower = LogFollower(path, poll_interval, from_start)
+        self.logger = logger or logging.getLogger('log_hub')
+        self.subscribers = []
+        self.lines_read = 0
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback: Callable[[List[str]], None]):
+        """Register a callback receiving each batch of new lines"""
+        self.subscribers.append(callback)
+
+    def poll(self) -> int:
+        """Read new lines and deliver them; returns how many were read"""
+        with self._lock:
+            lines = self.follower.read_new_lines()
+            self.lines_read += len(lines)
+            for callback in list(self.subscribers):
+                try:
+                    callback(lines)
+                except Exception as e:
+                    self.logger.error(f"Error in log subscriber: {e}")
+        return len(lines)
+
+    def position(self) -> Dict[str, Any]:
+        """Inode and offset just after the last complete line read"""
+        return {
+            'inode': self.follower.inode,
+            'offset': self.follower.offset - len(self.follower._partial.encode('utf-8'))
+        }
+
+    def close(self):
+        with self._lock:
+            self.follower.close()
+
+
+class LineBuffer:
+    """Bounded buffer of lines from a LogHub, drained by a periodic consumer
+
+    When the consumer falls behind by more than `capacity` lines the
+    oldest are dropped and counted, so memory stays flat. position() is
+    where the lines taken by the last drain() end, not where the hub has
+    read to, so a consumer persisting it never skips buffered lines.
+    """
+
+    def __init__(self, hub: LogHub, capacity: int = 100000):
+        self.hub = hub
+        self.lines = deque(maxlen=capacity)
+        self.dropped = 0
+        self._lock = threading.Lock()
+        # Hub position after the newest buffered line, and after the last drained one
+        self._buffered_position = hub.position()
+        self._drained_position = self._buffered_position
+        hub.subscribe(self.extend)
+
+    def extend(self, lines: List[str]):
+        # Called by LogHub.poll() right after the read, so the hub position is this batch's end
+        position = self.hub.position()
+        with self._lock:
+            overflow = len(self.lines) + len(lines) - self.lines.maxlen
+            if overflow > 0:
+                self.dropped += overflow
+            self.lines.extend(lines)
+            self._buffered_position = position
+
+    def drain(self) -> List[str]:
+        """Take every buffered line, oldest first"""
+        with self._lock:
+            lines = list(self.lines)
+            self.lines.clear()
+            self._drained_position = self._buffered_position
+        return lines
+
+    def position(self) -> Dict[str, Any]:
+        """Inode and offset just after the last line drain() returned"""
+        with self._lock:
+            return dict(self._drained_position)
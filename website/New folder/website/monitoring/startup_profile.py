@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# monitoring/startup_profile.py
+
+import os
+import re
+import sys
+import time
+import subprocess
+from typing import Dict, List, Any, Optional
+
+MONITORING_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Most milliseconds importing each cron-driven script may take on a cold start
+STARTUP_BUDGETS = {
+    'log_analyzer.py': 150.0,
+    'security_scanner.py': 150.0,
+    'anomaly_detector.py': 150.0,
+}
+
+_MARKER = 'startup-profile: script starts'
+# Indentation of the imported package is its nesting; one space is top level
+_IMPORT_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+def profile_imports(script: str) -> Dict[str, Any]:
+    """Import `script` in a fresh interpreter with -X importtime and collect its import times
+
+    The script is loaded under another name, so its __main__ block does
+    not run. Times are in milliseconds; `total` is loading the script,
+    `wall` the whole interpreter run.
+    """
+    path = os.path.join(MONITORING_DIR, script)
+    loader = (
+        'import importlib.util, sys, time; '
+        f'sys.path.insert(0, {MONITORING_DIR!r}); '
+        f'spec = importlib.util.spec_from_file_location("_startup_profile_target", {path!r}); '
+        'module = importlib.util.module_from_spec(spec); '
+        f'sys.stderr.write({_MARKER!r} + "\\n"); sys.stderr.flush(); '
+        'started = time.perf_counter(); '
+        'spec.loader.exec_module(module); '
+        'print((time.perf_counter() - started) * 1000)'
+    )
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', loader],
+                            capture_output=True, text=True, cwd=MONITORING_DIR)
+    wall = (time.perf_counter() - started) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {script} failed: {result.stderr.strip().splitlines()[-1]}")
+
+    # Modules the script imports itself, with what they pulled in counted in
+    imports = []
+    lines = result.stderr.splitlines()
+    for line in lines[lines.index(_MARKER) + 1:]:
+        match = _IMPORT_LINE.match(line)
+        if match and len(match.group(3)) == 1:
+            imports.append({
+                'module': match.group(4),
+                'self': int(match.group(1)) / 1000,
+                'cumulative': int(match.group(2)) / 1000
+            })
+    return {
+        'script': script,
+        'total': round(float(result.stdout.strip().splitlines()[-1]), 1),
+        'wall': round(wall, 1),
+        'imports': sorted(imports, key=lambda entry: entry['cumulative'], reverse=True)
+    }
+
+
+def format_profile(profile: Dict[str, Any], top: int = 10) -> str:
+    lines = [f"{profile['script']}: imports took {profile['total']:.1f} ms "
+             f"({profile['wall']:.1f} ms including interpreter start)"]
+    for entry in profile['imports'][:top]:
+        lines.append(f"  {entry['cumulative']:8.1f} ms  {entry['module']}")
+    return '\n'.join(lines)
+
+
+def print_startup_profile(script: str, top: int = 10):
+    """Report what a script's cold start spends importing (the --startup-profile flag)"""
+    print(format_profile(profile_imports(os.path.basename(script)), top))
+
+
+def check_budgets(budgets: Optional[Dict[str, float]] = None, runs: int = 3) -> List[str]:
+    """Scripts whose best cold-start import time of `runs` exceeds its budget"""
+    failures = []
+    for script, budget in (budgets or STARTUP_BUDGETS).items():
+        best = min((profile_imports(script) for _ in range(runs)), key=lambda profile: profile['total'])
+        status = 'ok' if best['total'] <= budget else 'OVER BUDGET'
+        print(f"{script}: {best['total']:.1f} ms of {budget:.0f} ms budget - {status}")
+        if best['total'] > budget:
+            print(format_profile(best, top=5))
+            failures.append(script)
+    return failures
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Cold-start import profile of the monitoring scripts')
+    parser.add_argument('scripts', nargs='*', help='Scripts to profile (default: the budgeted ones)')
+    parser.add_argument('--check', action='store_true', help='Exit with 1 if a script is over its startup budget')
+    parser.add_argument('--budget', type=float, help='Budget in ms applied to every script checked')
+    parser.add_argument('--top', type=int, default=10, help='Slowest imports listed per script')
+    args = parser.parse_args()
+
+    scripts = args.scripts or list(STARTUP_BUDGETS)
+    if args.check:
+        budgets = {script: args.budget or STARTUP_BUDGETS.get(script, 150.0) for script in scripts}
+        sys.exit(1 if check_budgets(budgets) else 0)
+    for script in scripts:
+        print(format_profile(profile_imports(script), args.top))
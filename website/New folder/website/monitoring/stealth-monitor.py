@@ -5,32 +5,98 @@ Advanced anomaly detection and security monitoring
 """
 
 import os
+import re
 import sys
 import json
 import time
 import hashlib
 import logging
-import requests
 import threading
+from collections import deque
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional
 from cryptography.fernet import Fernet
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 import base64
 import secrets
 
+from file_watcher import FileWatcher
+from scan_cache import ScanCache, ruleset_version
+from byte_scanner import BytePatternSet, open_buffer, MMAP_THRESHOLD
+from anomaly_state import AnomalyStateStore
+from tiered_scan import TieredScanner
+from tree_walker import walk_files
+from check_scheduler import CheckScheduler
+from detector_pool import DetectorPool
+from parallel_scan import ParallelScanner, resolve_workers, MIN_FILES_PER_WORKER
+from history_log import SegmentLog, RecentHistory, SEGMENT_BYTES, MAX_LOG_BYTES, RETENTION
+from journal import Journal, SNAPSHOT_BYTES, SNAPSHOT_INTERVAL
+from shared_resources import derive_fernet_key, http_session
+from event_bus import EventBus, Event, DROP_OLDEST
+from event_sinks import highest_severity
+from ipc import QueryServer
+from logging_setup import configure_logger
+
+# Per-check interval (seconds), jitter (fraction of the interval) and timeout
+# (seconds); override any of them under monitoring.schedule in the config
+DEFAULT_CHECK_SCHEDULE = {
+    'files': {'interval': 120, 'jitter': 0.1, 'timeout': 120},
+    'network': {'interval': 30, 'jitter': 0.1, 'timeout': 30},
+    'security': {'interval': 60, 'jitter': 0.1, 'timeout': 60},
+    'performance': {'interval': 30, 'jitter': 0.1, 'timeout': 15}
+}
+
 class StealthMonitor:
-    def __init__(self, config_file: str = None):
+    def __init__(self, config_file: str = None, cpu_limit: Optional[float] = None):
         self.config = self.load_config(config_file)
         self.encryption_key = self.derive_key(self.config['encryption_key'])
         self.cipher = Fernet(self.encryption_key)
         self.logger = self.setup_logger()
         self.running = False
         self.threads = []
-        self.anomalies = []
-        self.threats = []
-        self.performance_metrics = []
+        self.events = self.setup_events()
+        self.events_owned = True
+        self.anomalies, self.threats, self.performance_metrics = self.setup_history()
+        self.journal = self.setup_journal()
+        self.journaled = {'anomalies': 0, 'threats': 0, 'performance_metrics': 0}
+        # Last 100 journaled items per kind, the content of each snapshot
+        self.journal_state = {kind: deque(maxlen=100) for kind in self.journaled}
+        self.website_path = self.config.get('website_path', '/usr/share/nginx/html')
+        self.watcher = None
+        self.watcher_owned = True
+        # Recent access log lines, when fed by a log follower shared with other components
+        self.log_lines = None
+        self.cycle_count = 0
+        self.malware_ruleset = {'stealth_monitor.malware': ruleset_version(self.get_malware_patterns())}
+        self.malware_matcher = BytePatternSet(self.get_malware_patterns(), re.IGNORECASE)
+        self.mmap_threshold = self.config['monitoring'].get('mmap_threshold', MMAP_THRESHOLD)
+        self.scan_cache = self.setup_scan_cache()
+        self.parallel_scanner = ParallelScanner(
+            {'stealth_monitor.malware': (self.get_malware_patterns(), re.IGNORECASE, 'search')},
+            workers=resolve_workers(cpu_limit if cpu_limit is not None else self.config['monitoring'].get('cpu_limit')),
+            mmap_threshold=self.mmap_threshold,
+            logger=self.logger
+        )
+        self.anomaly_state = self.setup_anomaly_state()
+        self.php_files = None
+        # Held by a tree walk, so the deep tier waits for a walk in progress instead of starting its own
+        self.file_walk_lock = threading.Lock()
+        self.rotation_threats = []
+        self.last_deep_scan = {}
+        self.scheduler = None
+        self.query_server = None
+        self.file_walk_complete = False
+        self.last_cycle = {}
+        # Kept across cycles, so a check still running past its deadline is not started twice
+        self.detector_pool = DetectorPool(
+            max_workers=self.config['monitoring'].get('check_workers', 4),
+            logger=self.logger
+        )
+        self.deep_scanner = TieredScanner(
+            shards=self.config['monitoring'].get('deep_scan_shards', 10),
+            budget=self.config['monitoring'].get('deep_scan_budget', 5.0),
+            # Without deep scanning only changed files get their content checked
+            rotate=self.config['monitoring'].get('deep_scan', True)
+        )
         
     def load_config(self, config_file: str = None) -> Dict[str, Any]:
         """Load configuration from file or environment variables"""
@@ -73,44 +139,92 @@ class StealthMonitor:
         if not password:
             password = 'default_password_change_me'
         
-        salt = b'kopma_ultimate_salt_2024'
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,
-            salt=salt,
-            iterations=100000,
-        )
-        key = base64.urlsafe_b64encode(kdf.derive(password.encode()))
-        return key
+        # Derived once per process, shared with other components using the same key
+        return derive_fernet_key(password, b'kopma_ultimate_salt_2024')
     
     def setup_logger(self) -> logging.Logger:
         """Setup logging configuration"""
-        logger = logging.getLogger('stealth_monitor')
-        logger.setLevel(logging.INFO)
-        
-        # Create logs directory if it doesn't exist
-        log_dir = os.path.dirname(self.config['log_file'])
-        os.makedirs(log_dir, exist_ok=True)
-        
-        # File handler
-        file_handler = logging.FileHandler(self.config['log_file'])
-        file_handler.setLevel(logging.INFO)
-        
-        # Console handler
-        console_handler = logging.StreamHandler()
-        console_handler.setLevel(logging.WARNING)
-        
-        # Formatter
-        formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-        )
-        file_handler.setFormatter(formatter)
-        console_handler.setFormatter(formatter)
-        
-        logger.addHandler(file_handler)
-        logger.addHandler(console_handler)
-        
-        return logger
+        return configure_logger('stealth_monitor', self.config['log_file'], console_level=logging.WARNING)
+    
+    def setup_history(self) -> tuple:
+        """Bounded in-memory rings for anomalies, threats and metrics, spilled to disk"""
+        history = self.config['monitoring'].get('history', {})
+        directory = os.path.join(self.config['data_dir'], 'history')
+        rings = []
+        for name, capacity in (('anomalies', 500), ('threats', 500), ('performance', 1000)):
+            log = None
+            if history.get('spill', True):
+                try:
+                    log = SegmentLog(
+                        directory, name,
+                        segment_bytes=history.get('segment_bytes', SEGMENT_BYTES),
+                        max_bytes=history.get('max_bytes', MAX_LOG_BYTES),
+                        retention=history.get('retention', RETENTION)
+                    )
+                except OSError as e:
+                    self.logger.warning(f"History log unavailable, keeping {name} in memory only: {e}")
+            rings.append(RecentHistory(history.get(f'{name}_capacity', capacity), log))
+        return tuple(rings)
+    
+    def setup_scan_cache(self) -> Optional[ScanCache]:
+        """Open the scan-result cache shared with the other scanners"""
+        try:
+            return ScanCache(os.path.join(self.config['data_dir'], 'scan_cache.sqlite'))
+        except Exception as e:
+            self.logger.warning(f"Scan cache unavailable, scanning without it: {e}")
+            return None
+    
+    def setup_anomaly_state(self) -> Optional[AnomalyStateStore]:
+        """Open the dedup state so repeated anomalies are not re-alerted every cycle"""
+        try:
+            return AnomalyStateStore(
+                os.path.join(self.config['data_dir'], 'anomaly_state.sqlite'),
+                renotify_interval=self.config['monitoring'].get('renotify_interval', 6 * 3600),
+                resolve_after=self.config['monitoring'].get('resolve_after', 300)
+            )
+        except Exception as e:
+            self.logger.warning(f"Anomaly state unavailable, alerting on every anomaly: {e}")
+            return None
+    
+    def filter_alerts(self, scope: str, anomalies: List[Dict[str, Any]], complete: bool = True) -> List[Dict[str, Any]]:
+        """Keep only anomalies that are new, escalated, reopened or due a reminder"""
+        if self.anomaly_state is None:
+            return anomalies
+        try:
+            notify, resolved = self.anomaly_state.observe(scope, anomalies, complete)
+        except Exception as e:
+            self.logger.error(f"Error updating anomaly state: {e}")
+            return anomalies
+        for anomaly in resolved:
+            self.logger.info(f"Resolved: {anomaly.get('description', anomaly.get('type'))}")
+        return notify
+    
+    def setup_events(self) -> EventBus:
+        """Event bus carrying alerts from the checks to Telegram off the check threads"""
+        events = EventBus(self.logger)
+        events.subscribe('telegram', self.deliver_alerts,
+                         capacity=self.config['monitoring'].get('alert_queue', 1000),
+                         policy=DROP_OLDEST, batch_size=20)
+        return events
+    
+    def publish_alert(self, scope: str, prefix: str, anomaly: Dict[str, Any]):
+        """Publish an alert; sending it never holds up the check"""
+        self.events.publish(scope, {**anomaly, 'text': self.alert_text(prefix, anomaly)},
+                            anomaly.get('severity', 'info'), 'stealth_monitor')
+    
+    def deliver_alerts(self, events: List[Event]):
+        """Send queued alerts to Telegram, several at once as one message"""
+        if len(events) == 1:
+            self.send_telegram_alert(events[0].data['text'], events[0].severity)
+        else:
+            self.send_telegram_alert('\n'.join(event.data['text'] for event in events), highest_severity(events))
+    
+    def alert_text(self, prefix: str, anomaly: Dict[str, Any]) -> str:
+        """Alert message for an anomaly, noting repeats"""
+        text = f"{prefix}: {anomaly['description']}" if prefix else anomaly['description']
+        if anomaly.get('notify_reason') in ('escalated', 'reminder'):
+            text += f" [{anomaly['notify_reason']}, seen {anomaly['occurrences']} times since {anomaly['first_seen']}]"
+        return text
     
     def encrypt_data(self, data: str) -> str:
         """Encrypt data for secure transmission"""
@@ -149,7 +263,7 @@ class StealthMonitor:
             
             # Send to Telegram
             url = f"https://api.telegram.org/bot{self.config['telegram']['bot_token']}/sendMessage"
-            response = requests.post(url, data=alert_data, timeout=10)
+            response = http_session().post(url, data=alert_data, timeout=10)
             
             if response.status_code == 200:
                 self.logger.info(f"Telegram alert sent: {severity}")
@@ -162,47 +276,70 @@ class StealthMonitor:
             self.logger.error(f"Error sending Telegram alert: {e}")
             return False
     
-    def monitor_file_changes(self) -> List[Dict[str, Any]]:
-        """Monitor file changes in the website"""
+    def monitor_file_changes(self, results: Optional[List[Dict[str, Any]]] = None,
+                             deadline: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Quick tier: check every file's name and size from one metadata walk
+        
+        The walk also records the PHP files and their signatures for the
+        deep content tier, so it does not have to walk the tree again.
+        Anomalies are collected into `results` as they are found; with a
+        deadline (a time.monotonic() value) the walk stops early and
+        self.file_walk_complete is left False.
+        """
+        anomalies = results if results is not None else []
+        php_files = {}
+        self.file_walk_complete = False
+        
+        with self.file_walk_lock:
+            try:
+                for file_path, file_stat in walk_files(self.website_path):
+                    if deadline is not None and time.monotonic() >= deadline:
+                        self.logger.warning("File walk stopped at its deadline; results are partial")
+                        return anomalies
+                    anomalies.extend(self.check_file(file_path, file_stat.st_size))
+                    if file_path.endswith('.php'):
+                        php_files[file_path] = (file_stat.st_size, file_stat.st_mtime_ns)
+                self.php_files = php_files
+                self.file_walk_complete = True
+                            
+            except Exception as e:
+                self.logger.error(f"Error monitoring file changes: {e}")
+        
+        return anomalies
+    
+    def check_file(self, file_path: str, size: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Check a single file's name and size"""
         anomalies = []
-        website_path = '/usr/share/nginx/html'
         
+        # Check for suspicious files
+        if self.is_suspicious_file(file_path):
+            anomaly = {
+                'type': 'suspicious_file',
+                'file': file_path,
+                'timestamp': datetime.now().isoformat(),
+                'severity': 'high',
+                'description': f'Suspicious file detected: {file_path}'
+            }
+            anomalies.append(anomaly)
+            self.anomalies.append(anomaly)
+        
+        # Check for large files
         try:
-            for root, dirs, files in os.walk(website_path):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    
-                    # Check for suspicious files
-                    if self.is_suspicious_file(file_path):
-                        anomaly = {
-                            'type': 'suspicious_file',
-                            'file': file_path,
-                            'timestamp': datetime.now().isoformat(),
-                            'severity': 'high',
-                            'description': f'Suspicious file detected: {file_path}'
-                        }
-                        anomalies.append(anomaly)
-                        self.anomalies.append(anomaly)
-                    
-                    # Check for large files
-                    try:
-                        size = os.path.getsize(file_path)
-                        if size > 10 * 1024 * 1024:  # 10MB
-                            anomaly = {
-                                'type': 'large_file',
-                                'file': file_path,
-                                'size': size,
-                                'timestamp': datetime.now().isoformat(),
-                                'severity': 'medium',
-                                'description': f'Large file detected: {file_path} ({size} bytes)'
-                            }
-                            anomalies.append(anomaly)
-                            self.anomalies.append(anomaly)
-                    except OSError:
-                        pass
-                        
-        except Exception as e:
-            self.logger.error(f"Error monitoring file changes: {e}")
+            if size is None:
+                size = os.path.getsize(file_path)
+            if size > 10 * 1024 * 1024:  # 10MB
+                anomaly = {
+                    'type': 'large_file',
+                    'file': file_path,
+                    'size': size,
+                    'timestamp': datetime.now().isoformat(),
+                    'severity': 'medium',
+                    'description': f'Large file detected: {file_path} ({size} bytes)'
+                }
+                anomalies.append(anomaly)
+                self.anomalies.append(anomaly)
+        except OSError:
+            pass
         
         return anomalies
     
@@ -230,94 +367,227 @@ class StealthMonitor:
         anomalies = []
         
         try:
-            # Check nginx access logs
+            # Check nginx access logs, or the recent lines a shared log follower kept
             log_file = '/var/log/nginx/access.log'
-            if os.path.exists(log_file):
+            recent_lines = []
+            if self.log_lines is not None:
+                recent_lines = list(self.log_lines)
+            elif os.path.exists(log_file):
                 with open(log_file, 'r') as f:
                     lines = f.readlines()
                     recent_lines = lines[-100:]  # Last 100 lines
+            
+            # Analyze IP patterns
+            ip_counts = {}
+            for line in recent_lines:
+                parts = line.split()
+                if len(parts) > 0:
+                    ip = parts[0]
+                    ip_counts[ip] = ip_counts.get(ip, 0) + 1
+            
+            # Check for suspicious IPs
+            for ip, count in ip_counts.items():
+                if count > 50:  # More than 50 requests
+                    anomaly = {
+                        'type': 'suspicious_ip',
+                        'ip': ip,
+                        'request_count': count,
+                        'timestamp': datetime.now().isoformat(),
+                        'severity': 'high',
+                        'description': f'Suspicious IP detected: {ip} ({count} requests)'
+                    }
+                    anomalies.append(anomaly)
+                    self.anomalies.append(anomaly)
                     
-                    # Analyze IP patterns
-                    ip_counts = {}
-                    for line in recent_lines:
-                        parts = line.split()
-                        if len(parts) > 0:
-                            ip = parts[0]
-                            ip_counts[ip] = ip_counts.get(ip, 0) + 1
-                    
-                    # Check for suspicious IPs
-                    for ip, count in ip_counts.items():
-                        if count > 50:  # More than 50 requests
-                            anomaly = {
-                                'type': 'suspicious_ip',
-                                'ip': ip,
-                                'request_count': count,
-                                'timestamp': datetime.now().isoformat(),
-                                'severity': 'high',
-                                'description': f'Suspicious IP detected: {ip} ({count} requests)'
-                            }
-                            anomalies.append(anomaly)
-                            self.anomalies.append(anomaly)
-                            
         except Exception as e:
             self.logger.error(f"Error monitoring network anomalies: {e}")
         
         return anomalies
     
-    def monitor_security_threats(self) -> List[Dict[str, Any]]:
-        """Monitor security threats"""
-        threats = []
+    def deep_scan_candidates(self, deadline: Optional[float] = None) -> Dict[str, tuple]:
+        """Current PHP file signatures from the cheapest source available
         
+        Without the file watcher these come from the quick tier's walk; a
+        walk still in progress is waited for (until the deadline) rather
+        than repeated.
+        """
+        if self.is_watching():
+            return self.watcher.signatures('.php')
+        timeout = -1 if deadline is None else max(0.0, deadline - time.monotonic())
+        locked = self.file_walk_lock.acquire(timeout=timeout)
         try:
-            # Check for malware patterns
-            website_path = '/usr/share/nginx/html'
-            malware_patterns = [
-                r'eval\s*\(',
-                r'base64_decode\s*\(',
-                r'shell_exec\s*\(',
-                r'exec\s*\(',
-                r'system\s*\(',
-                r'passthru\s*\(',
-                r'fsockopen\s*\(',
-                r'popen\s*\(',
-                r'proc_open\s*\(',
-                r'assert\s*\(',
-                r'create_function\s*\(',
-                r'preg_replace.*\/e',
-                r'include\s*\(\s*[\'"]https?:\/\/',
-                r'require\s*\(\s*[\'"]https?:\/\/'
-            ]
-            
-            for root, dirs, files in os.walk(website_path):
-                for file in files:
-                    if file.endswith('.php'):
-                        file_path = os.path.join(root, file)
-                        try:
-                            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                                content = f.read()
-                                
-                            for pattern in malware_patterns:
-                                import re
-                                if re.search(pattern, content, re.IGNORECASE):
-                                    threat = {
-                                        'type': 'malware_detected',
-                                        'file': file_path,
-                                        'pattern': pattern,
-                                        'timestamp': datetime.now().isoformat(),
-                                        'severity': 'critical',
-                                        'description': f'Malware pattern detected in {file_path}: {pattern}'
-                                    }
-                                    threats.append(threat)
-                                    self.threats.append(threat)
-                                    
-                        except Exception as e:
-                            self.logger.error(f"Error scanning file {file_path}: {e}")
-                            
+            php_files = self.php_files
+            if php_files is None:
+                # The quick tier has not completed a walk; walk for PHP files only
+                php_files = {
+                    path: (file_stat.st_size, file_stat.st_mtime_ns)
+                    for path, file_stat in walk_files(self.website_path)
+                    if path.endswith('.php')
+                }
+            return php_files
+        finally:
+            if locked:
+                self.file_walk_lock.release()
+    
+    def monitor_security_threats(self, results: Optional[List[Dict[str, Any]]] = None,
+                                 deadline: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Deep tier: scan changed PHP files, then one rotating shard, within the cycle budget"""
+        threats = results if results is not None else []
+        
+        try:
+            self.deep_scanner.observe(self.deep_scan_candidates(deadline))
+            _, stats = self.deep_scanner.run(
+                self.scan_file_for_threats, deadline=deadline, findings=threats,
+                scan_many=self.scan_files_for_threats,
+                batch_size=max(64, self.parallel_scanner.workers * MIN_FILES_PER_WORKER * 2)
+            )
+            self.last_deep_scan = stats
+            self.logger.info(
+                f"Deep scan: {stats['changed']} changed and {stats['rotated']} shard files in "
+                f"{stats['duration']}s, {stats['pending']} pending"
+            )
         except Exception as e:
             self.logger.error(f"Error monitoring security threats: {e}")
         
+        if self.scan_cache is not None:
+            self.scan_cache.flush()
+        
+        return threats
+    
+    def get_malware_patterns(self) -> List[str]:
+        """Malware patterns to detect in PHP files"""
+        return [
+            r'eval\s*\(',
+            r'base64_decode\s*\(',
+            r'shell_exec\s*\(',
+            r'exec\s*\(',
+            r'system\s*\(',
+            r'passthru\s*\(',
+            r'fsockopen\s*\(',
+            r'popen\s*\(',
+            r'proc_open\s*\(',
+            r'assert\s*\(',
+            r'create_function\s*\(',
+            r'preg_replace.*\/e',
+            r'include\s*\(\s*[\'"]https?:\/\/',
+            r'require\s*\(\s*[\'"]https?:\/\/'
+        ]
+    
+    def threat_records(self, file_path: str, patterns: List[str]) -> List[Dict[str, Any]]:
+        """Threats for the malware patterns matched in a file"""
+        threats = []
+        for pattern in patterns:
+            threat = {
+                'type': 'malware_detected',
+                'file': file_path,
+                'pattern': pattern,
+                'timestamp': datetime.now().isoformat(),
+                'severity': 'critical',
+                'description': f'Malware pattern detected in {file_path}: {pattern}'
+            }
+            threats.append(threat)
+            self.threats.append(threat)
+        return threats
+    
+    def scan_file_for_threats(self, file_path: str) -> List[Dict[str, Any]]:
+        """Scan a single PHP file for malware patterns, skipping unchanged files via the scan cache"""
+        def scan_missing(names: List[str]) -> Dict[str, List[str]]:
+            with open_buffer(file_path, self.mmap_threshold) as buffer:
+                return {'stealth_monitor.malware': self.malware_matcher.search(buffer)}
+        
+        try:
+            if self.scan_cache is not None:
+                _, findings = self.scan_cache.scan(file_path, self.malware_ruleset, scan_missing)
+            else:
+                findings = scan_missing(list(self.malware_ruleset))
+            return self.threat_records(file_path, findings['stealth_monitor.malware'])
+                    
+        except Exception as e:
+            self.logger.error(f"Error scanning file {file_path}: {e}")
+        
+        return []
+    
+    def scan_files_for_threats(self, paths: List[str]) -> List[Dict[str, Any]]:
+        """Scan PHP files for malware patterns, cache misses spread over the worker processes"""
+        threats = []
+        stats = {}
+        misses = []
+        for file_path in paths:
+            try:
+                file_stat = os.stat(file_path)
+            except OSError:
+                continue
+            cached = None
+            if self.scan_cache is not None:
+                cached = self.scan_cache.cached(file_path, self.malware_ruleset, file_stat)
+            if cached is not None:
+                threats.extend(self.threat_records(file_path, cached[1]['stealth_monitor.malware']))
+            else:
+                stats[file_path] = file_stat
+                misses.append((file_path, file_stat.st_size))
+        
+        for file_path, content_hash, findings in self.parallel_scanner.scan(misses):
+            if content_hash is None:
+                self.logger.error(f"Error scanning file {file_path}: {findings}")
+                continue
+            if self.scan_cache is not None:
+                self.scan_cache.record(file_path, stats[file_path], content_hash, self.malware_ruleset, findings)
+            threats.extend(self.threat_records(file_path, findings['stealth_monitor.malware']))
+        
         return threats
     
+    def handle_changed_paths(self, paths: set):
+        """Check files pushed by the real-time file watcher"""
+        file_anomalies = []
+        threats = []
+        try:
+            for file_path in sorted(paths):
+                if not os.path.isfile(file_path):
+                    if self.scan_cache is not None and not os.path.exists(file_path):
+                        self.scan_cache.forget(file_path)
+                    continue
+                    
+                if self.config['events']['file_changes']:
+                    file_anomalies.extend(self.check_file(file_path))
+                
+                if self.config['events']['security'] and file_path.endswith('.php'):
+                    threats.extend(self.scan_file_for_threats(file_path))
+                        
+        except Exception as e:
+            self.logger.error(f"Error handling changed paths: {e}")
+        
+        if self.scan_cache is not None:
+            self.scan_cache.flush()
+        
+        # Only changed paths were checked, so nothing can be resolved here
+        for anomaly in self.filter_alerts('file', file_anomalies, complete=False):
+            self.publish_alert('file', "File anomaly", anomaly)
+        for threat in self.filter_alerts('security', threats, complete=False):
+            self.publish_alert('security', "Security threat", threat)
+    
+    def start_file_watcher(self, watcher: Optional[FileWatcher] = None) -> bool:
+        """Watch the website tree so changes are checked as they happen
+        
+        A watcher passed in is shared with other components: its owner
+        starts and stops it and delivers changes to handle_changed_paths.
+        """
+        if watcher is not None:
+            self.watcher = watcher
+            self.watcher_owned = False
+            return watcher.running
+        self.watcher = FileWatcher(
+            self.website_path,
+            debounce=self.config['monitoring'].get('watch_debounce', 0.5),
+            max_delay=self.config['monitoring'].get('watch_max_delay', 5.0),
+            logger=self.logger
+        )
+        self.watcher.subscribe(self.handle_changed_paths)
+        return self.watcher.start()
+    
+    def is_watching(self) -> bool:
+        """Whether real-time watching replaces the periodic tree walks"""
+        return self.watcher is not None and self.watcher.running
+    
     def monitor_performance(self) -> Dict[str, Any]:
         """Monitor system performance"""
         try:
@@ -333,10 +603,6 @@ class StealthMonitor:
             
             self.performance_metrics.append(metrics)
             
-            # Keep only last 1000 metrics
-            if len(self.performance_metrics) > 1000:
-                self.performance_metrics = self.performance_metrics[-1000:]
-            
             return metrics
             
         except ImportError:
@@ -346,60 +612,169 @@ class StealthMonitor:
             self.logger.error(f"Error monitoring performance: {e}")
             return {}
     
+    def detect_files(self, results: List[Dict[str, Any]], deadline: Optional[float] = None) -> List[Dict[str, Any]]:
+        """File check: walk the tree for suspicious and large files"""
+        # The metadata walk is only needed when changes are not pushed by
+        # the file watcher; the first run always covers existing files
+        full_scan = self.cycle_count == 0 or not self.is_watching()
+        self.cycle_count += 1
+        if not full_scan:
+            self.php_files = None
+            self.file_walk_complete = False
+            return results
+        return self.monitor_file_changes(results, deadline)
+    
+    def report_files(self, file_anomalies: List[Dict[str, Any]], complete: bool):
+        if file_anomalies:
+            self.logger.warning(f"File anomalies detected: {len(file_anomalies)}")
+        complete = complete and self.file_walk_complete
+        for anomaly in self.filter_alerts('file', file_anomalies, complete):
+            self.publish_alert('file', "File anomaly", anomaly)
+    
+    def detect_network(self, results: List[Dict[str, Any]], deadline: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Network check: suspicious requests in the access log"""
+        return self.monitor_network_anomalies()
+    
+    def report_network(self, network_anomalies: List[Dict[str, Any]], complete: bool):
+        if network_anomalies:
+            self.logger.warning(f"Network anomalies detected: {len(network_anomalies)}")
+        for anomaly in self.filter_alerts('network', network_anomalies, complete):
+            self.publish_alert('network', "Network anomaly", anomaly)
+    
+    def detect_security(self, results: List[Dict[str, Any]], deadline: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Security check: one budgeted step of the deep content scan"""
+        return self.monitor_security_threats(results, deadline)
+    
+    def report_security(self, security_threats: List[Dict[str, Any]], complete: bool):
+        if security_threats:
+            self.logger.warning(f"Security threats detected: {len(security_threats)}")
+        # Each run deep-scans only part of the tree, so threats resolve
+        # only once a whole rotation missed them
+        self.rotation_threats.extend(security_threats)
+        if complete and self.last_deep_scan.get('rotation_complete'):
+            alerts = self.filter_alerts('security', self.rotation_threats, complete=True)
+            self.rotation_threats = []
+        else:
+            alerts = self.filter_alerts('security', security_threats, complete=False)
+        for threat in alerts:
+            self.publish_alert('security', "Security threat", threat)
+    
+    def detect_performance(self, results: List[Dict[str, Any]], deadline: Optional[float] = None) -> Dict[str, Any]:
+        """Performance check: CPU and memory usage"""
+        return self.monitor_performance()
+    
+    def report_performance(self, performance: Optional[Dict[str, Any]], complete: bool):
+        if not performance:
+            return
+        
+        issues = []
+        if performance.get('cpu_percent', 0) > 80:
+            issues.append({
+                'type': 'high_cpu_usage',
+                'severity': 'high',
+                'description': f"High CPU usage: {performance['cpu_percent']}%"
+            })
+        
+        if performance.get('memory_percent', 0) > 80:
+            issues.append({
+                'type': 'high_memory_usage',
+                'severity': 'high',
+                'description': f"High memory usage: {performance['memory_percent']}%"
+            })
+        
+        for issue in self.filter_alerts('performance', issues, complete):
+            self.publish_alert('performance', '', issue)
+    
+    def enabled_checks(self) -> Dict[str, tuple]:
+        """(detect, report) of each check turned on in the events config"""
+        events = self.config['events']
+        checks = {
+            'files': (events['file_changes'], self.detect_files, self.report_files),
+            'network': (events['access_attempts'], self.detect_network, self.report_network),
+            'security': (events['security'], self.detect_security, self.report_security),
+            'performance': (events['performance'], self.detect_performance, self.report_performance)
+        }
+        return {name: (detect, report) for name, (enabled, detect, report) in checks.items() if enabled}
+    
+    def check_settings(self, name: str) -> Dict[str, Any]:
+        """Interval, jitter and timeout of a check"""
+        schedule = self.config['monitoring'].get('schedule', {})
+        return {**DEFAULT_CHECK_SCHEDULE[name], **schedule.get(name, {})}
+    
+    def run_check(self, name: str):
+        """Detect and report one check within its timeout, as the scheduler does"""
+        detect, report = self.enabled_checks()[name]
+        deadline = time.monotonic() + self.check_settings(name)['timeout']
+        report(detect([], deadline), True)
+    
     def run_monitoring_cycle(self):
-        """Run one monitoring cycle"""
+        """Run every enabled check once, concurrently within per-check deadlines
+        
+        Checks run on a worker pool, so a slow tree walk does not hold up
+        the network check. A check that misses its deadline is abandoned
+        and reported with what it found so far; the file walk and deep
+        scan also watch their deadline and stop early by themselves. The
+        deep scan waits for the file walk and scans the PHP files it found.
+        Only checks that completed may resolve earlier anomalies.
+        """
         try:
             self.logger.info("Running monitoring cycle...")
             
-            # Monitor file changes
-            if self.config['events']['file_changes']:
-                file_anomalies = self.monitor_file_changes()
-                if file_anomalies:
-                    self.logger.warning(f"File anomalies detected: {len(file_anomalies)}")
-                    for anomaly in file_anomalies:
-                        self.send_telegram_alert(
-                            f"File anomaly: {anomaly['description']}",
-                            anomaly['severity']
-                        )
-            
-            # Monitor network anomalies
-            if self.config['events']['access_attempts']:
-                network_anomalies = self.monitor_network_anomalies()
-                if network_anomalies:
-                    self.logger.warning(f"Network anomalies detected: {len(network_anomalies)}")
-                    for anomaly in network_anomalies:
-                        self.send_telegram_alert(
-                            f"Network anomaly: {anomaly['description']}",
-                            anomaly['severity']
-                        )
-            
-            # Monitor security threats
-            if self.config['events']['security']:
-                security_threats = self.monitor_security_threats()
-                if security_threats:
-                    self.logger.warning(f"Security threats detected: {len(security_threats)}")
-                    for threat in security_threats:
-                        self.send_telegram_alert(
-                            f"Security threat: {threat['description']}",
-                            threat['severity']
-                        )
-            
-            # Monitor performance
-            if self.config['events']['performance']:
-                performance = self.monitor_performance()
-                if performance:
-                    # Check for performance issues
-                    if performance.get('cpu_percent', 0) > 80:
-                        self.send_telegram_alert(
-                            f"High CPU usage: {performance['cpu_percent']}%",
-                            'high'
-                        )
+            checks = self.enabled_checks()
+            deadlines = {name: self.check_settings(name)['timeout'] for name in checks}
+            chained = 'files' in checks and 'security' in checks
+            if chained:
+                # The deep tier scans from this cycle's file walk, so it runs
+                # after the walk and its budget starts when the walk ends
+                deadlines['security'] += deadlines['files']
+            pool = self.detector_pool
+            pool.deadlines = deadlines
+            start = time.monotonic()
+            results = {name: [] for name in checks}
+            jobs = {
+                name: (lambda detect=detect, name=name:
+                       detect(results[name], start + pool.deadline(name)))
+                for name, (detect, _) in checks.items()
+            }
+            if chained:
+                walked = threading.Event()
+                if pool.busy('files'):
+                    # This cycle has no walk to wait for; the deep tier waits
+                    # on the abandoned one through file_walk_lock instead
+                    walked.set()
+                
+                def files_then_signal():
+                    try:
+                        return self.detect_files(results['files'], start + pool.deadline('files'))
+                    finally:
+                        walked.set()
+                        
+                def security_after_files():
+                    walked.wait(pool.deadline('files'))
+                    deadline = min(time.monotonic() + self.check_settings('security')['timeout'],
+                                   start + pool.deadline('security'))
+                    return self.detect_security(results['security'], deadline)
                     
-                    if performance.get('memory_percent', 0) > 80:
-                        self.send_telegram_alert(
-                            f"High memory usage: {performance['memory_percent']}%",
-                            'high'
-                        )
+                jobs['files'], jobs['security'] = files_then_signal, security_after_files
+            reports = pool.run(
+                jobs,
+                # Collected lists are copied, as the abandoned check may still add to them
+                partial={name: (lambda name=name: list(results[name])) for name in checks}
+            )
+            
+            for name, (_, report) in checks.items():
+                outcome = reports[name]
+                if outcome['status'] in ('error', 'skipped'):
+                    # Already logged by the pool; nothing was detected
+                    continue
+                try:
+                    report(outcome['result'], outcome['status'] == 'ok')
+                except Exception as e:
+                    self.logger.error(f"Error reporting {name} check: {e}")
+            self.last_cycle = {
+                name: {key: outcome[key] for key in ('status', 'wall_time', 'cpu_time')}
+                for name, outcome in reports.items()
+            }
             
             # Save monitoring data
             self.save_monitoring_data()
@@ -407,22 +782,41 @@ class StealthMonitor:
         except Exception as e:
             self.logger.error(f"Error in monitoring cycle: {e}")
     
+    def setup_journal(self) -> Optional[Journal]:
+        """Append-only journal of monitoring data under data_dir"""
+        settings = self.config['monitoring'].get('journal', {})
+        try:
+            return Journal(
+                self.config['data_dir'], 'monitoring',
+                snapshot_bytes=settings.get('snapshot_bytes', SNAPSHOT_BYTES),
+                snapshot_interval=settings.get('snapshot_interval', SNAPSHOT_INTERVAL)
+            )
+        except OSError as e:
+            self.logger.warning(f"Monitoring journal unavailable: {e}")
+            return None
+    
     def save_monitoring_data(self):
-        """Save monitoring data to file"""
+        """Journal the items recorded since the last save, compacting now and then
+        
+        Readers follow the journal with journal.read_journal() and a cursor;
+        the snapshot holds the last 100 items of each kind, in the layout
+        monitoring_data.json used to have.
+        """
+        if self.journal is None:
+            return
         try:
-            data_dir = self.config['data_dir']
-            os.makedirs(data_dir, exist_ok=True)
-            
-            data = {
-                'anomalies': self.anomalies[-100:],  # Keep last 100
-                'threats': self.threats[-100:],      # Keep last 100
-                'performance_metrics': self.performance_metrics[-100:],  # Keep last 100
-                'last_updated': datetime.now().isoformat()
-            }
+            records = []
+            for kind, history in (('anomalies', self.anomalies), ('threats', self.threats),
+                                  ('performance_metrics', self.performance_metrics)):
+                items, self.journaled[kind] = history.since(self.journaled[kind])
+                self.journal_state[kind].extend(items)
+                records.extend({'kind': kind, 'data': item} for item in items)
+            self.journal.append(records)
             
-            data_file = os.path.join(data_dir, 'monitoring_data.json')
-            with open(data_file, 'w') as f:
-                json.dump(data, f, indent=2)
+            if self.journal.snapshot_due():
+                state = {kind: list(items) for kind, items in self.journal_state.items()}
+                state['last_updated'] = datetime.now().isoformat()
+                self.journal.snapshot(state)
                 
         except Exception as e:
             self.logger.error(f"Error saving monitoring data: {e}")
@@ -437,36 +831,89 @@ class StealthMonitor:
         monitor_thread.start()
         self.threads.append(monitor_thread)
         
+        # Start real-time file watching
+        if self.config['monitoring'].get('real_time'):
+            self.start_file_watcher()
+        
+        # Answer status queries from what is held in memory
+        self.query_server = QueryServer(
+            self.config['monitoring'].get('query_socket', os.path.join(self.config['data_dir'], 'stealth-monitor.sock')),
+            self.logger
+        )
+        self.query_server.register('status', self.get_status)
+        self.query_server.register('alerts', self.recent_alerts)
+        self.query_server.register('metrics', lambda limit=20: self.performance_metrics.recent(limit))
+        self.query_server.start()
+        
         self.logger.info("Stealth monitoring system started")
     
     def stop(self):
         """Stop the stealth monitoring system"""
         self.logger.info("Stopping stealth monitoring system...")
         self.running = False
+        if self.query_server is not None:
+            self.query_server.stop()
+        if self.scheduler is not None:
+            self.scheduler.stop()
+        
+        if self.watcher is not None and self.watcher_owned:
+            self.watcher.stop()
+        self.parallel_scanner.close()
         
         # Wait for threads to finish
         for thread in self.threads:
             thread.join(timeout=5)
         
+        for history in (self.anomalies, self.threats, self.performance_metrics):
+            if history.log is not None:
+                history.log.close()
+        if self.journal is not None:
+            self.save_monitoring_data()
+            self.journal.close()
+        # Send what the checks already published, unless the bus is shared
+        if self.events_owned:
+            self.events.stop()
+        
         self.logger.info("Stealth monitoring system stopped")
     
+    def setup_scheduler(self) -> CheckScheduler:
+        """Scheduler with each enabled check on its own interval"""
+        monitoring = self.config['monitoring']
+        scheduler = CheckScheduler(max_workers=monitoring.get('check_workers', 4), logger=self.logger)
+        for name in self.enabled_checks():
+            settings = self.check_settings(name)
+            scheduler.add(name, lambda name=name: self.run_check(name),
+                          settings['interval'], settings['jitter'], settings['timeout'])
+        # Persisting the in-memory history follows the global interval
+        scheduler.add('save', self.save_monitoring_data, monitoring['interval'], 0.0, monitoring['interval'])
+        return scheduler
+    
     def monitoring_loop(self):
         """Main monitoring loop"""
         while self.running:
             try:
-                self.run_monitoring_cycle()
-                time.sleep(self.config['monitoring']['interval'])
+                self.scheduler = self.setup_scheduler()
+                self.scheduler.run()
             except Exception as e:
                 self.logger.error(f"Error in monitoring loop: {e}")
                 time.sleep(60)  # Wait 1 minute before retrying
     
+    def recent_alerts(self, limit: int = 20) -> Dict[str, List[Dict[str, Any]]]:
+        """Newest anomalies and threats kept in memory, oldest first"""
+        return {'anomalies': self.anomalies.recent(limit), 'threats': self.threats.recent(limit)}
+    
     def get_status(self) -> Dict[str, Any]:
         """Get monitoring system status"""
         return {
             'running': self.running,
-            'anomalies_count': len(self.anomalies),
-            'threats_count': len(self.threats),
-            'performance_metrics_count': len(self.performance_metrics),
+            'anomalies_count': self.anomalies.total,
+            'threats_count': self.threats.total,
+            'performance_metrics_count': self.performance_metrics.total,
+            'watching': self.is_watching(),
+            'deep_scan': self.last_deep_scan,
+            'schedule': self.scheduler.get_statistics() if self.scheduler is not None else {},
+            'last_cycle': self.last_cycle,
+            'alert_state': self.anomaly_state.get_statistics() if self.anomaly_state is not None else {},
             'last_updated': datetime.now().isoformat()
         }
 
@@ -477,10 +924,12 @@ def main():
     parser = argparse.ArgumentParser(description='Stealth Monitoring System')
     parser.add_argument('--config', help='Configuration file path')
     parser.add_argument('--daemon', action='store_true', help='Run as daemon')
+    parser.add_argument('--cpu-limit', type=float,
+                        help='Most CPU cores the security scan may use (rounded down, at least 1; default: all but one)')
     args = parser.parse_args()
     
     # Create monitoring instance
-    monitor = StealthMonitor(args.config)
+    monitor = StealthMonitor(args.config, cpu_limit=args.cpu_limit)
     
     # Handle signals
     import signal
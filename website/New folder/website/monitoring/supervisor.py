@@ -0,0 +1,633 @@
+#!/usr/bin/env python3
+"""
+Monitoring Supervisor for KOPMA UNNES Website
+Runs every monitor in one process, sharing resources and restarting crashed ones
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import threading
+import importlib.util
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Callable
+
+from check_scheduler import CheckScheduler
+from file_watcher import FileWatcher
+from shared_resources import LogHub, LineBuffer, http_session
+from history_log import SegmentLog
+from event_bus import EventBus, Event, DROP_OLDEST, BLOCK
+from event_sinks import EventLogSink, EventIndex, EventMetrics, TelegramRouter, highest_severity
+from ipc import QueryServer, DEFAULT_SOCKET
+from anomaly_detector import AnomalyDetector
+from log_analyzer import LogAnalyzer
+from security_scanner import SecurityScanner
+from logging_setup import configure_logger, logging_statistics
+
+MONITORING_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Consecutive failed jobs after which a component counts as crashed
+MAX_JOB_FAILURES = 3
+# Delay before restarting a crashed component, doubled on each crash in a row
+RESTART_BACKOFF = 5.0
+MAX_RESTART_BACKOFF = 300.0
+# Seconds between the first runs of successive jobs, so they do not fire together
+STAGGER = 5.0
+# Average CPU (in cores) the supervised monitors may use, measured per window
+CPU_BUDGET = 0.5
+BUDGET_WINDOW = 10.0
+# Most the schedule is slowed down while over the CPU budget
+MAX_STRETCH = 8.0
+
+
+def load_script(name: str, filename: str):
+    """Import a hyphenated script (e.g. stealth-monitor.py) as module `name`"""
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.spec_from_file_location(name, os.path.join(MONITORING_DIR, filename))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    try:
+        spec.loader.exec_module(module)
+    except Exception:
+        del sys.modules[name]
+        raise
+    return module
+
+
+class Component:
+    """One monitor hosted by the supervisor
+
+    Jobs and shared-resource callbacks reach the monitor through call(),
+    which skips them while the component is down. A component crashes when
+    creating it fails or MAX_JOB_FAILURES calls fail in a row; it is then
+    stopped and recreated after a backoff that doubles with each crash in
+    a row, and resets once a call succeeds again.
+
+    Scheduled jobs and changed-path deliveries are exclusive: they share
+    the monitor's scan state, so only one runs at a time. Paths delivered
+    while a job runs are queued and handed over, merged, when it ends, so
+    the file watcher thread never waits for a scan.
+    """
+
+    def __init__(self, name: str, create: Callable[[], Any], stop: Optional[Callable[[Any], None]] = None,
+                 logger: Optional[logging.Logger] = None):
+        self.name = name
+        self.create = create
+        self.stop_instance = stop
+        self.logger = logger or logging.getLogger('supervisor')
+        self.instance = None
+        self.state = 'stopped'
+        self.failures = 0
+        self.restarts = 0
+        self.backoff = RESTART_BACKOFF
+        self.restart_at = None
+        self.last_error = None
+        self.started = None
+        self.on_crash = None
+        self._exclusive = threading.Lock()
+        self._pending_lock = threading.Lock()
+        self._pending_paths = {}
+
+    def start(self) -> bool:
+        try:
+            self.instance = self.create()
+        except Exception as e:
+            self.logger.error(f"Component {self.name} failed to start: {e}")
+            self.crash(e)
+            return False
+        self.state = 'running'
+        self.failures = 0
+        self.started = time.time()
+        self.logger.info(f"Component {self.name} started")
+        return True
+
+    def stop(self):
+        instance, self.instance = self.instance, None
+        self.state = 'stopped'
+        if instance is not None and self.stop_instance is not None:
+            try:
+                self.stop_instance(instance)
+            except Exception as e:
+                self.logger.error(f"Error stopping component {self.name}: {e}")
+
+    def call(self, func: Callable[..., Any], *args, exclusive: bool = False) -> Any:
+        """Run func(instance, *args) if the component is up, after other exclusive calls if `exclusive`"""
+        if not exclusive:
+            return self._call(func, *args)
+        with self._exclusive:
+            result = self._call(func, *args)
+        self._deliver_pending()
+        return result
+
+    def deliver_paths(self, handler: Callable[[Any, Any], Any], paths):
+        """Exclusive call of handler(instance, paths), queued while another exclusive call runs"""
+        with self._pending_lock:
+            self._pending_paths.setdefault(handler, set()).update(paths)
+        self._deliver_pending()
+
+    def _deliver_pending(self):
+        # Whoever ends an exclusive call after paths were queued delivers them
+        while self._pending_paths and self._exclusive.acquire(blocking=False):
+            try:
+                with self._pending_lock:
+                    pending, self._pending_paths = self._pending_paths, {}
+                for handler, paths in pending.items():
+                    self._call(handler, paths)
+            finally:
+                self._exclusive.release()
+
+    def _call(self, func: Callable[..., Any], *args) -> Any:
+        instance = self.instance
+        if self.state != 'running' or instance is None:
+            return None
+        try:
+            result = func(instance, *args)
+        except Exception as e:
+            self.failures += 1
+            self.last_error = str(e)
+            self.logger.error(f"Component {self.name} failed ({self.failures} in a row): {e}")
+            if self.failures >= MAX_JOB_FAILURES and self.state == 'running':
+                self.crash(e)
+            return None
+        self.failures = 0
+        self.backoff = RESTART_BACKOFF
+        return result
+
+    def crash(self, error: Exception):
+        self.state = 'crashed'
+        self.last_error = str(error)
+        self.restart_at = time.monotonic() + self.backoff
+        self.logger.error(f"Component {self.name} crashed, restarting in {self.backoff:.0f}s")
+        self.backoff = min(MAX_RESTART_BACKOFF, self.backoff * 2)
+        if self.on_crash is not None:
+            self.on_crash(self, error)
+
+    def restart_due(self, now: float) -> bool:
+        return self.state == 'crashed' and now >= self.restart_at
+
+    def restart(self) -> bool:
+        self.stop()
+        self.restarts += 1
+        return self.start()
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            'state': self.state,
+            'restarts': self.restarts,
+            'failures': self.failures,
+            'last_error': self.last_error,
+            'started': datetime.fromtimestamp(self.started).isoformat() if self.started else None
+        }
+
+
+class MonitoringSupervisor:
+    """Hosts the stealth monitor, anomaly detector, log analyzer, security
+    scanner, performance monitor and Telegram bot as components of one process
+
+    They share one file watcher on the website tree, one follower of the
+    access log, one pooled HTTP session and the derived encryption keys,
+    instead of each opening their own. Every periodic job runs on one
+    scheduler, with first runs staggered so heavy jobs do not start
+    together; while the process uses more CPU than its budget, all
+    intervals are stretched until usage drops again. Status, alerts and
+    metrics are served from memory over a local query socket (see ipc.py).
+    """
+
+    def __init__(self, config_file: Optional[str] = None, cpu_budget: Optional[float] = None):
+        self.config = self.load_config(config_file)
+        self.settings = self.config.get('supervisor', {})
+        self.logger = self.setup_logger()
+        self.cpu_budget = cpu_budget if cpu_budget is not None else self.settings.get('cpu_budget', CPU_BUDGET)
+        self.website_path = self.settings.get('website_path', os.getenv('WEBSITE_PATH', '/usr/share/nginx/html'))
+        self.access_log = self.settings.get('access_log', os.getenv('LOG_FILE', '/var/log/nginx/access.log'))
+        self.state_dir = self.settings.get('state_dir', os.getenv('STATE_DIR', '/app/data'))
+        self.running = False
+        self._stop = threading.Event()
+        self._scheduler_thread = None
+        self._cpu_sample = None
+        self.cpu_usage = None
+
+        # Shared resources
+        self.session = http_session()
+        self.watcher = FileWatcher(
+            self.website_path,
+            debounce=self.settings.get('watch_debounce', 0.5),
+            max_delay=self.settings.get('watch_max_delay', 5.0),
+            logger=self.logger
+        )
+        self.watcher.subscribe(self.deliver_changes)
+        self.log_hub = LogHub(self.access_log, self.settings.get('log_poll_interval', 1.0), logger=self.logger)
+        # Line buffers outlive component restarts, so no lines are lost while one is down
+        self.detector_lines = None
+        self.stealth_lines = None
+        self.events = self.setup_events()
+
+        self.scheduler = CheckScheduler(max_workers=self.settings.get('workers', 4), logger=self.logger)
+        self.components = {}
+        self.path_handlers = []
+        self.setup_components()
+        self.queries = self.setup_queries()
+
+    def load_config(self, config_file: Optional[str] = None) -> Dict[str, Any]:
+        """Supervisor configuration; each monitor's settings live in its own section"""
+        if config_file and os.path.exists(config_file):
+            with open(config_file, 'r') as f:
+                return json.load(f)
+        return {}
+
+    def setup_logger(self) -> logging.Logger:
+        """Setup logging configuration"""
+        return configure_logger('supervisor')
+
+    def setup_events(self) -> EventBus:
+        """Event bus shared by the components, with the Telegram, disk, SQLite and metrics consumers
+
+        Telegram is remote and slow, so its queue drops the oldest alerts
+        when it falls behind. Disk and SQLite are local: publishers wait
+        briefly for room there before an event is dropped.
+        """
+        events = EventBus(self.logger)
+        settings = self.settings.get('events', {})
+        directory = os.path.join(self.state_dir, 'events')
+        self.telegram = TelegramRouter()
+        self.event_metrics = EventMetrics()
+        self.event_log = SegmentLog(directory, 'events')
+        self.event_index = EventIndex(os.path.join(directory, 'events.sqlite'),
+                                      retention=settings.get('retention', 30 * 86400))
+        events.subscribe('telegram', self.telegram, capacity=settings.get('telegram_queue', 1000),
+                         policy=DROP_OLDEST, batch_size=20)
+        events.subscribe('disk', EventLogSink(self.event_log), capacity=settings.get('disk_queue', 10000),
+                         policy=BLOCK, batch_size=100, block_timeout=0.5)
+        events.subscribe('sqlite', self.event_index, capacity=settings.get('sqlite_queue', 10000),
+                         policy=BLOCK, batch_size=100, block_timeout=0.5)
+        events.subscribe('metrics', self.event_metrics, capacity=settings.get('metrics_queue', 10000),
+                         policy=DROP_OLDEST, batch_size=100)
+        for source in ('log_analyzer', 'security_scanner', 'supervisor'):
+            self.telegram.route(source, self.send_bot_alerts)
+        return events
+
+    def scan_cpu_limit(self) -> float:
+        """Scan worker processes allowed by the CPU budget"""
+        return max(1.0, self.cpu_budget)
+
+    def load_component_script(self, name: str, filename: str):
+        """Load a component's script; a missing dependency leaves it out instead of stopping the rest"""
+        try:
+            return load_script(name, filename)
+        except Exception as e:
+            self.logger.error(f"Component {name} unavailable: {e}")
+            return None
+
+    def component_config(self, section: str, defaults: Dict[str, Any]) -> Dict[str, Any]:
+        return {**defaults, **self.config.get(section, {})}
+
+    def add_component(self, name: str, create: Callable[[], Any],
+                      stop: Optional[Callable[[Any], None]] = None) -> Component:
+        component = Component(name, create, stop, self.logger)
+        component.on_crash = self.report_crash
+        self.components[name] = component
+        return component
+
+    def add_job(self, component: Component, name: str, func: Callable[[Any], Any], interval: float,
+                jitter: float = 0.1, timeout: Optional[float] = None):
+        """Schedule func(instance) for a component, staggered after the jobs before it"""
+        offset = (len(self.scheduler.checks) * self.settings.get('stagger', STAGGER)) % interval
+        self.scheduler.add(f"{component.name}.{name}", lambda: component.call(func, exclusive=True),
+                           interval, jitter, timeout, offset)
+
+    def setup_components(self):
+        """Create the components and their jobs"""
+        enabled = self.settings.get('components', {})
+        env = {
+            'encryption_key': os.getenv('ENCRYPTION_KEY', ''),
+            'telegram_bot_token': os.getenv('TELEGRAM_BOT_TOKEN', ''),
+            'telegram_chat_id': os.getenv('TELEGRAM_CHAT_ID', '')
+        }
+
+        telegram_bot = enabled.get('telegram_bot', True) and self.load_component_script('telegram_bot', 'telegram-bot.py')
+        if telegram_bot:
+            self.add_component('telegram_bot', lambda: telegram_bot.AdvancedTelegramBot(self.component_config('telegram_bot', {
+                'telegram': {
+                    'bot_token': env['telegram_bot_token'],
+                    'chat_id': env['telegram_chat_id'],
+                    'webhook': os.getenv('TELEGRAM_WEBHOOK', '')
+                },
+                'encryption_key': env['encryption_key']
+            })))
+
+        stealth_monitor = enabled.get('stealth_monitor', True) and \
+            self.load_component_script('stealth_monitor', 'stealth-monitor.py')
+        if stealth_monitor:
+            self.stealth_lines = deque(maxlen=100)
+            self.log_hub.subscribe(self.stealth_lines.extend)
+
+            def create_stealth():
+                monitor = stealth_monitor.StealthMonitor(self.settings.get('stealth_config'),
+                                                         cpu_limit=self.scan_cpu_limit())
+                monitor.running = True
+                monitor.events = self.events
+                monitor.events_owned = False
+                monitor.log_lines = self.stealth_lines
+                if monitor.config['monitoring'].get('real_time'):
+                    monitor.start_file_watcher(self.watcher)
+                return monitor
+
+            stealth = self.add_component('stealth_monitor', create_stealth, lambda monitor: monitor.stop())
+            self.telegram.route('stealth_monitor', lambda events: stealth.call(lambda monitor: monitor.deliver_alerts(events)))
+            self.path_handlers.append((stealth, lambda monitor, paths: monitor.handle_changed_paths(paths)))
+            for name, settings in stealth_monitor.DEFAULT_CHECK_SCHEDULE.items():
+                self.add_job(stealth, name,
+                             lambda monitor, name=name: monitor.run_check(name) if name in monitor.enabled_checks() else None,
+                             settings['interval'], settings['jitter'], settings['timeout'])
+            self.add_job(stealth, 'save', lambda monitor: monitor.save_monitoring_data(),
+                         self.settings.get('save_interval', 30), 0.0)
+
+        if enabled.get('anomaly_detector', True):
+            self.detector_lines = LineBuffer(self.log_hub, self.settings.get('line_buffer', 100000))
+
+            def create_detector():
+                detector = AnomalyDetector(self.component_config('anomaly_detector', {
+                    'encryption_key': env['encryption_key'] or 'default_key_change_me',
+                    'telegram_bot_token': env['telegram_bot_token'],
+                    'telegram_chat_id': env['telegram_chat_id'],
+                    'website_path': self.website_path,
+                    'log_file': self.access_log,
+                    'state_dir': self.state_dir
+                }))
+                detector.log_source = self.detector_lines
+                detector.events = self.events
+                return detector
+
+            detector = self.add_component('anomaly_detector', create_detector)
+            self.telegram.route('anomaly_detector', lambda events: detector.call(lambda instance: instance.deliver_alerts(events)))
+
+            def detect(instance):
+                instance.publish_anomalies(instance.run_detection())
+
+            def changed(instance, paths):
+                instance.publish_anomalies(instance.handle_changed_paths(paths))
+
+            self.path_handlers.append((detector, changed))
+            self.add_job(detector, 'detect', detect, self.settings.get('detection_interval', 300), 0.1)
+
+        if enabled.get('log_analyzer', True):
+            analyzer_config = self.component_config('log_analyzer', {
+                'log_files': [
+                    self.access_log,
+                    '/var/log/nginx/error.log',
+                    '/app/logs/security.log',
+                    '/app/logs/performance.log'
+                ],
+                'analysis_interval': 300
+            })
+
+            def create_analyzer():
+                analyzer = LogAnalyzer(analyzer_config)
+                analyzer.consume_lines = analyzer.rule_consumer(on_alert=self.rule_alert)
+                return analyzer
+
+            analyzer = self.add_component('log_analyzer', create_analyzer)
+            self.log_hub.subscribe(lambda lines: analyzer.call(lambda instance: instance.consume_lines(lines)))
+            self.add_job(analyzer, 'analysis', lambda instance: instance.run_analysis(),
+                         analyzer_config['analysis_interval'], 0.1)
+
+        if enabled.get('security_scanner', True):
+            scanner_config = self.component_config('security_scanner', {
+                'website_path': self.website_path,
+                'scan_interval': 3600,
+                'cache_file': os.path.join(self.state_dir, 'scan_cache.sqlite'),
+                'use_cache': True,
+                'cpu_limit': self.scan_cpu_limit()
+            })
+
+            def scan(scanner):
+                summary = scanner.run_security_scan()['summary']
+                self.logger.info(f"Security scan: {summary}")
+                if summary['malware_files']:
+                    self.notify('security_scanner', 'security', f"{summary['malware_files']} malware files detected",
+                                'critical')
+
+            def changed(scanner, paths):
+                results = scanner.scan_paths(list(paths))
+                if results['malware_files']:
+                    self.notify('security_scanner', 'security', f"Malware in changed files: {results['malware_files']}",
+                                'critical')
+
+            scanner = self.add_component('security_scanner', lambda: SecurityScanner(scanner_config),
+                                         lambda instance: instance.parallel.close())
+            self.path_handlers.append((scanner, changed))
+            self.add_job(scanner, 'scan', scan, scanner_config['scan_interval'], 0.1)
+
+        performance_monitor = enabled.get('performance_monitor', True) and \
+            self.load_component_script('performance_monitor', 'performance-monitor.py')
+        if performance_monitor:
+            performance_config = self.component_config('performance_monitor', {'collection_interval': 30})
+            def create_performance():
+                monitor = performance_monitor.PerformanceMonitor(performance_config)
+                monitor.open_live_metrics()
+                return monitor
+
+            performance = self.add_component('performance_monitor', create_performance,
+                                             lambda monitor: monitor.stop_monitoring())
+            self.add_job(performance, 'sample', lambda monitor: monitor.sample(),
+                         performance_config['collection_interval'], 0.1)
+
+        # Read the access log once for every consumer
+        self.scheduler.add('log_hub.poll', self.log_hub.poll, self.log_hub.poll_interval, 0.0, 30)
+
+    def setup_queries(self) -> QueryServer:
+        """Query API answering from the supervisor's and the components' in-memory state"""
+        server = QueryServer(self.settings.get('socket', DEFAULT_SOCKET), self.logger)
+        server.register('status', self.get_status)
+        server.register('components', lambda: {name: component.get_status() for name, component in self.components.items()})
+        server.register('alerts', lambda limit=20, kind=None, source=None: self.event_metrics.recent(limit, kind, source))
+        server.register('events', lambda kind=None, source=None, since=None, limit=100:
+                        self.event_index.query(kind, source, since, limit))
+        server.register('performance', self.component_query('performance_monitor',
+                                                             lambda monitor: monitor.get_performance_summary()))
+        server.register('metrics', self.component_query('performance_monitor',
+                                                        lambda monitor, seconds=None, limit=None:
+                                                        monitor.metrics_window(seconds, limit)))
+        server.register('stealth', self.component_query('stealth_monitor', lambda monitor: monitor.get_status()))
+        server.register('stealth_alerts', self.component_query('stealth_monitor',
+                                                               lambda monitor, limit=20: monitor.recent_alerts(limit)))
+        server.register('detector', self.component_query('anomaly_detector', lambda detector: detector.last_run))
+        return server
+
+    def component_query(self, name: str, func: Callable[..., Any]) -> Callable[..., Any]:
+        """Query handler calling func(instance, **args) on a running component
+
+        Unlike jobs, a failing query does not count towards the component's
+        crash detection; the error goes back to the client.
+        """
+        def handler(**args):
+            component = self.components.get(name)
+            instance = component.instance if component is not None else None
+            if instance is None:
+                raise RuntimeError(f"Component {name} is not running")
+            return func(instance, **args)
+        return handler
+
+    def deliver_changes(self, paths):
+        """Hand changed paths from the shared file watcher to each component"""
+        for component, handler in self.path_handlers:
+            component.deliver_paths(handler, paths)
+
+    def rule_alert(self, alert: Dict[str, Any]):
+        self.notify('log_analyzer', 'log_rule', alert['message'], alert.get('severity', 'warning'))
+
+    def notify(self, source: str, kind: str, message: str, severity: str = 'info'):
+        """Publish an alert that the Telegram bot component sends"""
+        self.events.publish(kind, {'message': message}, severity, source)
+
+    def send_bot_alerts(self, events: List[Event]):
+        """Send a batch of alerts through the Telegram bot component as one encrypted message"""
+        bot = self.components.get('telegram_bot')
+        if bot is None or not bot.instance or not bot.instance.bot_token:
+            return
+        if len(events) == 1:
+            kind, message = events[0].kind, events[0].data['message']
+        else:
+            kind, message = 'batch', '\n'.join(f"[{event.kind}] {event.data['message']}" for event in events)
+        bot.call(lambda instance: instance.send_encrypted_alert(kind, message, highest_severity(events)))
+
+    def report_crash(self, component: Component, error: Exception):
+        self.notify('supervisor', 'crash', f"Component {component.name} crashed: {error}", 'error')
+
+    def cpu_seconds(self) -> float:
+        """CPU time used by this process and its live scan workers"""
+        total = time.process_time()
+        try:
+            import psutil
+            for child in psutil.Process().children(recursive=True):
+                try:
+                    times = child.cpu_times()
+                    total += times.user + times.system
+                except psutil.Error:
+                    continue
+        except ImportError:
+            pass
+        return total
+
+    def enforce_budget(self):
+        """Stretch the schedule while over the CPU budget, relax it once well under"""
+        now = time.monotonic()
+        cpu = self.cpu_seconds()
+        if self._cpu_sample is not None:
+            wall = now - self._cpu_sample[0]
+            # A scan worker exiting takes its CPU time with it; never go negative
+            self.cpu_usage = round(max(0.0, cpu - self._cpu_sample[1]) / wall, 3) if wall > 0 else 0.0
+            stretch = self.scheduler.stretch
+            if self.cpu_usage > self.cpu_budget:
+                stretch = min(MAX_STRETCH, stretch * 2)
+            elif self.cpu_usage < self.cpu_budget / 2:
+                stretch = max(1.0, stretch / 2)
+            if stretch != self.scheduler.stretch:
+                self.logger.info(f"CPU use {self.cpu_usage} cores against a budget of {self.cpu_budget}; "
+                                 f"schedule stretched {stretch}x")
+                self.scheduler.stretch = stretch
+        self._cpu_sample = (now, cpu)
+
+    def supervise(self):
+        """Restart crashed components whose backoff has passed"""
+        now = time.monotonic()
+        for component in self.components.values():
+            if component.restart_due(now):
+                self.logger.info(f"Restarting component {component.name}")
+                component.restart()
+
+    def start(self):
+        """Start the shared resources, the components and the scheduler"""
+        self.logger.info("Starting monitoring supervisor...")
+        self.running = True
+        self.events.start()
+        for component in self.components.values():
+            component.start()
+        if not self.watcher.start():
+            self.logger.warning("File watcher unavailable; monitors fall back to periodic walks")
+        self.queries.start()
+
+        self._scheduler_thread = threading.Thread(target=self.scheduler.run, name='scheduler', daemon=True)
+        self._scheduler_thread.start()
+        self.logger.info(f"Monitoring supervisor started with {len(self.components)} components")
+
+    def run(self):
+        """Supervise until stop() is called"""
+        window = self.settings.get('budget_window', BUDGET_WINDOW)
+        next_budget = time.monotonic()
+        while not self._stop.is_set():
+            self.supervise()
+            if time.monotonic() >= next_budget:
+                self.enforce_budget()
+                next_budget = time.monotonic() + window
+            self._stop.wait(1.0)
+
+    def stop(self):
+        """Stop the scheduler, the components and the shared resources"""
+        self.logger.info("Stopping monitoring supervisor...")
+        self.running = False
+        self._stop.set()
+        self.queries.stop()
+        self.scheduler.stop()
+        if self._scheduler_thread is not None:
+            self._scheduler_thread.join(timeout=5)
+        self.watcher.stop()
+        for component in self.components.values():
+            component.stop()
+        # Hand what was published to the sinks before closing them
+        self.events.stop()
+        self.event_log.close()
+        self.event_index.close()
+        self.log_hub.close()
+        self.logger.info("Monitoring supervisor stopped")
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            'running': self.running,
+            'components': {name: component.get_status() for name, component in self.components.items()},
+            'cpu_budget': self.cpu_budget,
+            'cpu_usage': self.cpu_usage,
+            'stretch': self.scheduler.stretch,
+            'schedule': self.scheduler.get_statistics(),
+            'watching': self.watcher.running,
+            'log_lines_read': self.log_hub.lines_read,
+            'log_lines_dropped': self.detector_lines.dropped if self.detector_lines is not None else 0,
+            'events': {**self.events.get_statistics(), 'counts': self.event_metrics.snapshot(),
+                       'unrouted': self.telegram.unrouted},
+            'logging': logging_statistics(),
+            'last_updated': datetime.now().isoformat()
+        }
+
+
+def main():
+    """Main function"""
+    import argparse
+    import signal
+
+    parser = argparse.ArgumentParser(description='Monitoring Supervisor for KOPMA UNNES Website')
+    parser.add_argument('--config', help='Configuration file path')
+    parser.add_argument('--cpu-budget', type=float,
+                        help=f'Average CPU cores all monitors may use together (default: {CPU_BUDGET})')
+    args = parser.parse_args()
+
+    supervisor = MonitoringSupervisor(args.config, cpu_budget=args.cpu_budget)
+
+    def signal_handler(signum, frame):
+        print(f"Received signal {signum}, shutting down...")
+        supervisor._stop.set()
+
+    signal.signal(signal.SIGINT, signal_handler)
+    signal.signal(signal.SIGTERM, signal_handler)
+
+    supervisor.start()
+    try:
+        supervisor.run()
+    finally:
+        supervisor.stop()
+
+if __name__ == '__main__':
+    main()
@@ -8,16 +8,17 @@ import os
 import sys
 import json
 import time
-import requests
 import logging
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional
 from cryptography.fernet import Fernet
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 import base64
 import secrets
 
+from shared_resources import derive_fernet_key, http_session
+from live_metrics import read_live_metrics
+from logging_setup import configure_logger
+
 class AdvancedTelegramBot:
     def __init__(self, config: Dict[str, Any]):
         self.config = config
@@ -35,34 +36,12 @@ class AdvancedTelegramBot:
         if not password:
             password = 'default_password_change_me'
         
-        salt = b'kopma_telegram_salt_2024'
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,
-            salt=salt,
-            iterations=100000,
-        )
-        key = base64.urlsafe_b64encode(kdf.derive(password.encode()))
-        return key
+        # Derived once per process, shared with other components using the same key
+        return derive_fernet_key(password, b'kopma_telegram_salt_2024')
     
     def setup_logger(self) -> logging.Logger:
         """Setup logging configuration"""
-        logger = logging.getLogger('telegram_bot')
-        logger.setLevel(logging.INFO)
-        
-        # Console handler
-        console_handler = logging.StreamHandler()
-        console_handler.setLevel(logging.INFO)
-        
-        # Formatter
-        formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-        )
-        console_handler.setFormatter(formatter)
-        
-        logger.addHandler(console_handler)
-        
-        return logger
+        return configure_logger('telegram_bot')
     
     def encrypt_message(self, message: str) -> str:
         """Encrypt message for secure transmission"""
@@ -114,7 +93,7 @@ class AdvancedTelegramBot:
             if reply_markup:
                 data['reply_markup'] = json.dumps(reply_markup)
             
-            response = requests.post(url, data=data, timeout=10)
+            response = http_session().post(url, data=data, timeout=10)
             
             if response.status_code == 200:
                 self.logger.info("Message sent successfully")
@@ -425,6 +404,15 @@ For more information, contact the system administrator.
                 'cpu_usage': 23,
                 'disk_usage': 34
             }
+            # Latest sample of a running performance monitor, read from shared memory
+            live = read_live_metrics()
+            if live is not None:
+                performance_data.update({
+                    'load_time': round(live['website']['response_time'] / 1000, 2),
+                    'memory_usage': round(live['memory']['usage_percent'], 1),
+                    'cpu_usage': round(live['cpu']['usage_percent'], 1),
+                    'disk_usage': round(live['disk']['usage_percent'], 1)
+                })
             
             performance_text = f"""
 ⚡ <b>Performance Metrics</b>
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# monitoring/test_frequency_sketch.py
+
+import time
+
+from frequency_sketch import DecayingCountMin, FrequencyTracker
+
+
+def test_event_a_day_before_the_landmark():
+    sketch = DecayingCountMin(width=64, depth=2)
+    then = time.time() - 86400
+    assert sketch.add('1.2.3.4', then) == 1.0
+    assert sketch.add('1.2.3.4', then + 1) > 1.9
+
+
+def test_historical_replay_then_now():
+    sketch = DecayingCountMin(width=64, depth=2, half_life=60.0)
+    start = time.time() - 7 * 86400
+    for second in range(0, 3600, 10):
+        sketch.add('10.0.0.1', start + second)
+    # A week later the replayed burst has decayed away
+    now = time.time()
+    assert sketch.add('10.0.0.1', now) < 1.0 + 1e-6
+    assert sketch.estimate('10.0.0.1', now) < 1.0 + 1e-6
+
+
+def test_out_of_order_timestamps():
+    sketch = DecayingCountMin(width=64, depth=2, half_life=60.0)
+    now = time.time()
+    for offset in (0, -30, 5, -7200, -86400 * 30, 10, -3):
+        estimate = sketch.add('10.0.0.2', now + offset)
+        assert estimate > 0.0 and estimate == estimate
+    assert sketch.estimate('10.0.0.2', now + 10) > 3.0
+
+
+def test_tracker_bootstraps_from_an_old_log(tmp_path):
+    tracker = FrequencyTracker(str(tmp_path / 'sketch.bin'), width=256, depth=2)
+    start = time.time() - 86400
+    for second in range(100):
+        estimates = tracker.add_event({'ip': '1.2.3.4', 'route': '/'}, start + second)
+    assert estimates['ip'] > 50
+    tracker.save()
+    loaded = FrequencyTracker(str(tmp_path / 'sketch.bin'), width=256, depth=2)
+    assert loaded.load()
+    assert loaded.estimate('ip', '1.2.3.4') > 50
@@ -8,7 +8,6 @@ import os
 import sys
 import json
 import time
-import requests
 import logging
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional, Tuple
@@ -17,6 +16,8 @@ import hashlib
 import secrets
 import re
 
+from logging_setup import configure_logger
+
 class ThreatIntelligence:
     def __init__(self, config: Dict[str, Any]):
         self.config = config
@@ -29,22 +30,7 @@ class ThreatIntelligence:
         
     def setup_logger(self) -> logging.Logger:
         """Setup logging configuration"""
-        logger = logging.getLogger('threat_intelligence')
-        logger.setLevel(logging.INFO)
-        
-        # Console handler
-        console_handler = logging.StreamHandler()
-        console_handler.setLevel(logging.INFO)
-        
-        # Formatter
-        formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-        )
-        console_handler.setFormatter(formatter)
-        
-        logger.addHandler(console_handler)
-        
-        return logger
+        return configure_logger('threat_intelligence')
     
     def initialize_threat_database(self):
         """Initialize threat database with known patterns"""
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# monitoring/tiered_scan.py
+
+import time
+import zlib
+from collections import OrderedDict, deque
+from typing import Dict, List, Any, Optional, Callable, Tuple
+
+Signature = Tuple[int, int]  # (size, mtime_ns)
+
+
+class TieredScanner:
+    """Bound the cost of deep content scans per monitoring cycle
+
+    The cheap tier (a metadata walk, or the file watcher's index) hands
+    over the current (size, mtime_ns) of every candidate file each cycle.
+    Files whose signature changed are deep-scanned first. The rest of the
+    tree is covered in `shards` rotating slices, one slice after another,
+    so every file is re-checked once per rotation. Each cycle stops at
+    `budget` seconds; unfinished work carries over to the next cycle.
+    """
+
+    def __init__(self, shards: int = 10, budget: float = 5.0, rotate: bool = True):
+        self.shards = max(1, shards)
+        self.budget = budget
+        self.rotate = rotate
+        self.signatures = {}
+        self.priority = OrderedDict()
+        self.pending = deque()
+        self.shard = 0
+        self.rotations = 0
+
+    def shard_of(self, path: str) -> int:
+        """Stable shard of a path"""
+        return zlib.crc32(path.encode('utf-8', 'ignore')) % self.shards
+
+    def observe(self, files: Dict[str, Signature]):
+        """Take the current file signatures from the cheap tier"""
+        for path, signature in files.items():
+            if self.signatures.get(path) != signature:
+                self.priority[path] = None
+        for path in [path for path in self.signatures if path not in files]:
+            self.priority.pop(path, None)
+        self.signatures = dict(files)
+
+    def _refill(self):
+        """Queue the next shard of the rotation"""
+        self.pending = deque(
+            path for path in sorted(self.signatures) if self.shard_of(path) == self.shard
+        )
+
+    def run(self, scan: Callable[[str], List[Dict[str, Any]]], deadline: Optional[float] = None,
+            findings: Optional[List[Dict[str, Any]]] = None,
+            scan_many: Optional[Callable[[List[str]], List[Dict[str, Any]]]] = None,
+            batch_size: int = 64) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """Deep-scan changed files, then rotating shards, within the budget
+
+        Returns (findings, stats). stats['rotation_complete'] is True when
+        this cycle finished the last shard of a rotation, meaning every
+        file has been scanned since the previous rotation ended. An outer
+        deadline (a time.monotonic() value) cuts the budget short, and
+        findings are added to `findings` as they are made if it is given.
+        With `scan_many`, files are handed over `batch_size` at a time
+        (e.g. to spread them over processes) and the budget is checked
+        between batches.
+        """
+        start_time = time.monotonic()
+        budget_end = start_time + self.budget
+        deadline = budget_end if deadline is None else min(deadline, budget_end)
+        findings = findings if findings is not None else []
+        if scan_many is None:
+            scan_many = lambda paths: [finding for path in paths for finding in scan(path)]
+            batch_size = 1
+        stats = {'changed': 0, 'rotated': 0, 'shard': self.shard, 'budget_exhausted': False,
+                 'rotation_complete': False}
+
+        while self.priority:
+            if time.monotonic() >= deadline:
+                stats['budget_exhausted'] = True
+                break
+            paths = [self.priority.popitem(last=False)[0] for _ in range(min(batch_size, len(self.priority)))]
+            findings.extend(scan_many(paths))
+            stats['changed'] += len(paths)
+
+        if self.rotate and not stats['budget_exhausted']:
+            visited = 0
+            while visited < self.shards:
+                if not self.pending:
+                    self._refill()
+                while self.pending:
+                    if time.monotonic() >= deadline:
+                        stats['budget_exhausted'] = True
+                        break
+                    paths = []
+                    while self.pending and len(paths) < batch_size:
+                        path = self.pending.popleft()
+                        if path in self.signatures:
+                            paths.append(path)
+                    if paths:
+                        findings.extend(scan_many(paths))
+                        stats['rotated'] += len(paths)
+                if self.pending or stats['budget_exhausted']:
+                    break
+                # Shard done; one shard per cycle unless it was empty
+                visited += 1
+                self.shard = (self.shard + 1) % self.shards
+                if self.shard == 0:
+                    self.rotations += 1
+                    stats['rotation_complete'] = True
+                self._refill()
+                if self.pending:
+                    break
+
+        stats['pending'] = len(self.pending) + len(self.priority)
+        stats['duration'] = round(time.monotonic() - start_time, 4)
+        return findings, stats
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+# monitoring/traffic_baseline.py
+
+import os
+import json
+import math
+import base64
+import threading
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Optional
+
+from log_summary import HyperLogLog
+from log_follower import parse_log_time
+
+BASELINE_VERSION = 1
+MAX_GAP_BUCKETS = 24 * 60  # empty buckets replayed after a quiet period, at most
+
+# Which direction of deviation is anomalous, per metric (route latencies use 'latency')
+METRIC_DIRECTIONS = {
+    'request_rate': 'both',
+    'error_rate': 'high',
+    'unique_ips': 'high',
+    'latency': 'high',
+    'load_1min': 'high'
+}
+# Smallest standard deviation assumed per metric, so a flat history does not
+# turn every small wobble into a huge z-score
+METRIC_FLOORS = {
+    'request_rate': 1.0,
+    'error_rate': 0.01,
+    'unique_ips': 1.0,
+    'latency': 0.05,
+    'load_1min': 0.5
+}
+
+
+class EwmaStat:
+    """Exponentially weighted mean and variance, updated in O(1)"""
+
+    __slots__ = ('alpha', 'mean', 'var', 'count')
+
+    def __init__(self, alpha: float, mean: float = 0.0, var: float = 0.0, count: int = 0):
+        self.alpha = alpha
+        self.mean = mean
+        self.var = var
+        self.count = count
+
+    def update(self, value: float):
+        """Fold one observation into the mean and variance"""
+        if self.count == 0:
+            self.mean = value
+            self.var = 0.0
+        else:
+            diff = value - self.mean
+            increment = self.alpha * diff
+            self.mean += increment
+            self.var = (1 - self.alpha) * (self.var + diff * increment)
+        self.count += 1
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.var)
+
+    def to_list(self) -> List[float]:
+        return [self.mean, self.var, self.count]
+
+    @classmethod
+    def from_list(cls, alpha: float, data: List[float]) -> 'EwmaStat':
+        return cls(alpha, data[0], data[1], int(data[2]))
+
+
+class SeasonalBaseline:
+    """EWMA profile of one metric, overall and per hour of the week
+
+    The hour-of-week profile takes over from the overall one once its slot
+    has seen `min_seasonal` observations, so a busy Monday morning is
+    compared with earlier Monday mornings rather than with the night.
+    """
+
+    def __init__(self, alpha: float = 0.05, seasonal_alpha: float = 0.2, min_seasonal: int = 3):
+        self.alpha = alpha
+        self.seasonal_alpha = seasonal_alpha
+        self.min_seasonal = min_seasonal
+        self.overall = EwmaStat(alpha)
+        self.seasonal = {}
+
+    def expected(self, slot: int) -> EwmaStat:
+        """Profile the next observation in a slot is compared with"""
+        seasonal = self.seasonal.get(slot)
+        if seasonal is not None and seasonal.count >= self.min_seasonal:
+            return seasonal
+        return self.overall
+
+    def update(self, value: float, slot: int):
+        """Fold one observation into the overall and slot profiles"""
+        self.overall.update(value)
+        if slot not in self.seasonal:
+            self.seasonal[slot] = EwmaStat(self.seasonal_alpha)
+        self.seasonal[slot].update(value)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'overall': self.overall.to_list(),
+            'seasonal': {str(slot): stat.to_list() for slot, stat in self.seasonal.items()}
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], alpha: float, seasonal_alpha: float,
+                  min_seasonal: int) -> 'SeasonalBaseline':
+        baseline = cls(alpha, seasonal_alpha, min_seasonal)
+        baseline.overall = EwmaStat.from_list(alpha, data['overall'])
+        baseline.seasonal = {
+            int(slot): EwmaStat.from_list(seasonal_alpha, stat)
+            for slot, stat in data.get('seasonal', {}).items()
+        }
+        return baseline
+
+
+class TrafficBaseline:
+    """Learned traffic profile scored by z-score instead of fixed thresholds
+
+    Access log events are aggregated into fixed buckets (one minute by
+    default). Each closed bucket updates the request rate, 5xx error rate,
+    unique IP count and per-route mean latency profiles, after being
+    scored against them. The profiles, the open bucket and the log read
+    position are persisted, so consecutive runs continue where the last
+    one stopped.
+    """
+
+    def __init__(self, state_file: str, bucket_seconds: int = 60, alpha: float = 0.05,
+                 seasonal_alpha: float = 0.2, min_seasonal: int = 3, warmup: int = 60,
+                 z_threshold: float = 4.0, max_routes: int = 200, min_route_requests: int = 5):
+        self.state_file = state_file
+        self.bucket_seconds = bucket_seconds
+        self.alpha = alpha
+        self.seasonal_alpha = seasonal_alpha
+        self.min_seasonal = min_seasonal
+        self.warmup = warmup
+        self.z_threshold = z_threshold
+        self.max_routes = max_routes
+        self.min_route_requests = min_route_requests
+        self.metrics = {}
+        self.bucket = None
+        self.log_position = None
+        self.tz_offset = 0
+        self.loaded = False
+        # Reentrant: advance() holds it while _close_bucket() calls observe()
+        self._lock = threading.RLock()
+
+    def _new_baseline(self) -> SeasonalBaseline:
+        return SeasonalBaseline(self.alpha, self.seasonal_alpha, self.min_seasonal)
+
+    def _new_bucket(self, start: int) -> Dict[str, Any]:
+        return {'start': start, 'requests': 0, 'errors': 0, 'ips': HyperLogLog(precision=10), 'latency': {}}
+
+    def load(self) -> bool:
+        """Load persisted profiles; False if there are none yet"""
+        with self._lock:
+            if not os.path.exists(self.state_file):
+                self.loaded = True
+                return False
+            with open(self.state_file, 'r') as f:
+                data = json.load(f)
+            if data.get('version') != BASELINE_VERSION or data.get('bucket_seconds') != self.bucket_seconds:
+                self.loaded = True
+                return False
+            metrics = {
+                name: SeasonalBaseline.from_dict(profile, self.alpha, self.seasonal_alpha, self.min_seasonal)
+                for name, profile in data.get('metrics', {}).items()
+            }
+            bucket = data.get('bucket')
+            if bucket:
+                bucket = {
+                    'start': bucket['start'],
+                    'requests': bucket['requests'],
+                    'errors': bucket['errors'],
+                    'ips': HyperLogLog(precision=10, registers=base64.b64decode(bucket['ips'])),
+                    'latency': bucket['latency']
+                }
+            # Only a fully parsed state replaces the current one
+            self.metrics = metrics
+            self.bucket = bucket or None
+            self.log_position = data.get('log_position')
+            self.tz_offset = data.get('tz_offset', 0)
+            self.loaded = True
+            return True
+
+    def save(self):
+        """Write profiles and position atomically"""
+        with self._lock:
+            data = {
+                'version': BASELINE_VERSION,
+                'bucket_seconds': self.bucket_seconds,
+                'updated': datetime.now().isoformat(),
+                'log_position': self.log_position,
+                'tz_offset': self.tz_offset,
+                'bucket': None,
+                'metrics': {name: baseline.to_dict() for name, baseline in self.metrics.items()}
+            }
+            if self.bucket is not None:
+                data['bucket'] = {
+                    **self.bucket,
+                    'ips': base64.b64encode(bytes(self.bucket['ips'].registers)).decode('ascii')
+                }
+            os.makedirs(os.path.dirname(self.state_file) or '.', exist_ok=True)
+            temp_file = f"{self.state_file}.tmp"
+            with open(temp_file, 'w') as f:
+                json.dump(data, f, separators=(',', ':'))
+            os.replace(temp_file, self.state_file)
+
+    def _slot(self, epoch: float) -> int:
+        """Hour of the week in the log's own timezone"""
+        local = datetime.fromtimestamp(epoch + self.tz_offset, tz=timezone.utc)
+        return local.weekday() * 24 + local.hour
+
+    def observe(self, metric: str, value: float, epoch: float) -> Optional[Dict[str, Any]]:
+        """Score a value against its profile, then learn it; returns a deviation or None"""
+        with self._lock:
+            baseline = self.metrics.get(metric)
+            if baseline is None:
+                if metric.startswith('latency:') and \
+                        sum(name.startswith('latency:') for name in self.metrics) >= self.max_routes:
+                    return None
+                baseline = self.metrics[metric] = self._new_baseline()
+
+            slot = self._slot(epoch)
+            kind = metric.split(':', 1)[0]
+            deviation = None
+            if baseline.overall.count >= self.warmup:
+                expected = baseline.expected(slot)
+                std = max(expected.std, abs(expected.mean) * 0.1, METRIC_FLOORS.get(kind, 0.0))
+                zscore = (value - expected.mean) / std if std else 0.0
+                direction = METRIC_DIRECTIONS.get(kind, 'both')
+                if (zscore >= self.z_threshold and direction != 'low') or \
+                        (zscore <= -self.z_threshold and direction != 'high'):
+                    deviation = {
+                        'metric': metric,
+                        'value': round(value, 4),
+                        'expected': round(expected.mean, 4),
+                        'std': round(std, 4),
+                        'zscore': round(zscore, 2),
+                        'seasonal': expected is not baseline.overall,
+                        'at': datetime.fromtimestamp(epoch, tz=timezone.utc).isoformat()
+                    }
+            baseline.update(value, slot)
+            return deviation
+
+    def _close_bucket(self) -> List[Dict[str, Any]]:
+        """Score and learn the open bucket; the caller holds the lock"""
+        bucket = self.bucket
+        start = bucket['start']
+        minutes = self.bucket_seconds / 60.0
+        deviations = [
+            self.observe('request_rate', bucket['requests'] / minutes, start),
+            self.observe('unique_ips', bucket['ips'].estimate() if bucket['requests'] else 0, start)
+        ]
+        if bucket['requests']:
+            deviations.append(self.observe('error_rate', bucket['errors'] / bucket['requests'], start))
+        for route, (total, count) in bucket['latency'].items():
+            if count >= self.min_route_requests:
+                deviations.append(self.observe(f'latency:{route}', total / count, start))
+        return [deviation for deviation in deviations if deviation]
+
+    def advance(self, epoch: float) -> List[Dict[str, Any]]:
+        """Close every bucket that ended before `epoch`, replaying empty ones"""
+        start = int(epoch // self.bucket_seconds) * self.bucket_seconds
+        deviations = []
+        with self._lock:
+            if self.bucket is None:
+                self.bucket = self._new_bucket(start)
+                return deviations
+            if start <= self.bucket['start']:
+                return deviations
+
+            deviations.extend(self._close_bucket())
+            gap_start = max(self.bucket['start'] + self.bucket_seconds, start - MAX_GAP_BUCKETS * self.bucket_seconds)
+            for empty_start in range(gap_start, start, self.bucket_seconds):
+                self.bucket = self._new_bucket(empty_start)
+                deviations.extend(self._close_bucket())
+            self.bucket = self._new_bucket(start)
+            return deviations
+
+    def add_event(self, event: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Add a parsed access log event; returns deviations of buckets it closed"""
+        when = parse_log_time(event.get('timestamp'))
+        if when is None:
+            return []
+        with self._lock:
+            self.tz_offset = int(when.utcoffset().total_seconds()) if when.utcoffset() else 0
+            deviations = self.advance(when.timestamp())
+
+            bucket = self.bucket
+            bucket['requests'] += 1
+            if event['status'] >= 500:
+                bucket['errors'] += 1
+            bucket['ips'].add(event['ip'])
+            if event.get('request_time') is not None:
+                route = event['route']
+                if route in bucket['latency'] or len(bucket['latency']) < self.max_routes:
+                    totals = bucket['latency'].setdefault(route, [0.0, 0])
+                    totals[0] += event['request_time']
+                    totals[1] += 1
+            return deviations
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Current profile means, for status output"""
+        with self._lock:
+            return {
+                name: {
+                    'mean': round(baseline.overall.mean, 4),
+                    'std': round(baseline.overall.std, 4),
+                    'observations': baseline.overall.count
+                }
+                for name, baseline in self.metrics.items()
+            }
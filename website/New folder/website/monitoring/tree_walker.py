@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# monitoring/tree_walker.py
+
+import os
+import time
+import fnmatch
+import logging
+from typing import Dict, List, Any, Optional, Callable, Iterable, Tuple
+
+DEFAULT_PRUNE_DIRS = ['node_modules', '.git', '.svn', '.hg', 'cache', '.cache']
+
+
+def walk_files(root: str, prune_dirs: Optional[Iterable[str]] = None,
+               stats: Optional[Dict[str, Any]] = None) -> Iterable[Tuple[str, os.stat_result]]:
+    """Yield (path, stat) for every regular file below root
+
+    Uses os.scandir so each file costs a single stat (DirEntry caches it),
+    and never descends into directories matching a prune rule.
+    """
+    prune = list(prune_dirs or [])
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as entries:
+                if stats is not None:
+                    stats['directories'] += 1
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if any(fnmatch.fnmatch(entry.name, rule) for rule in prune):
+                                if stats is not None:
+                                    stats['pruned'] += 1
+                                continue
+                            stack.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            yield entry.path, entry.stat(follow_symlinks=False)
+                    except OSError:
+                        if stats is not None:
+                            stats['errors'] += 1
+        except OSError:
+            if stats is not None:
+                stats['errors'] += 1
+
+
+def is_pruned(path: str, root: str, prune_dirs: Optional[Iterable[str]] = None) -> bool:
+    """Whether walk_files(root, prune_dirs) would skip `path`, i.e. a directory on the way to it matches a rule"""
+    prune = list(prune_dirs or [])
+    directories = os.path.relpath(os.path.dirname(path), root).split(os.sep)
+    return any(fnmatch.fnmatch(name, rule) for name in directories if name != os.curdir for rule in prune)
+
+
+class TreeWalker:
+    """One scandir traversal feeding many file-level checks as visitors"""
+
+    def __init__(self, root: str, prune_dirs: Optional[List[str]] = None,
+                 logger: Optional[logging.Logger] = None):
+        self.root = root
+        self.prune_dirs = DEFAULT_PRUNE_DIRS if prune_dirs is None else prune_dirs
+        self.logger = logger or logging.getLogger('tree_walker')
+        self.visitors = []
+
+    def add_visitor(self, visitor: Callable[[str, os.stat_result], None],
+                    suffixes: Optional[Tuple[str, ...]] = None):
+        """Register a visitor called as visitor(path, stat), optionally only for some suffixes"""
+        self.visitors.append((visitor, suffixes))
+
+    def walk(self, deadline: Optional[float] = None) -> Dict[str, Any]:
+        """Traverse the tree once, calling every visitor for each file
+
+        With a deadline (a time.monotonic() value) the walk stops early once
+        it passes and marks the stats as truncated.
+        """
+        stats = {'files': 0, 'directories': 0, 'pruned': 0, 'errors': 0, 'duration': 0.0, 'truncated': False}
+        start_time = time.perf_counter()
+
+        for file_path, file_stat in walk_files(self.root, self.prune_dirs, stats):
+            if deadline is not None and time.monotonic() >= deadline:
+                stats['truncated'] = True
+                break
+            stats['files'] += 1
+            for visitor, suffixes in self.visitors:
+                if suffixes and not file_path.endswith(suffixes):
+                    continue
+                try:
+                    visitor(file_path, file_stat)
+                except Exception as e:
+                    stats['errors'] += 1
+                    self.logger.error(f"Error checking file {file_path}: {e}")
+
+        stats['duration'] = round(time.perf_counter() - start_time, 4)
+        return stats
@@ -262,6 +262,16 @@ else
     print_error "Anomaly detector missing"
 fi
 
+if command -v python3 &> /dev/null; then
+    if python3 monitoring/startup_profile.py --check; then
+        print_success "Monitoring scripts start within their import budgets"
+    else
+        print_error "Monitoring script startup over budget (see profile above)"
+    fi
+else
+    print_warning "python3 not found; monitoring startup budgets not checked"
+fi
+
 # Test 14: Admin Panel
 print_section "Test 14: Admin Panel Configuration"
 if [ -f "../admin-panel/netlify.toml" ]; then